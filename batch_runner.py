@@ -0,0 +1,256 @@
+"""
+Toplu (Batch) Test Üretim Betiği
+Bu betik, arayüz olmadan bir dizindeki (veya paketteki) tüm Python modülleri
+için test üretir. Her modül ayrı bir süreçte, Otonom Ajan (AutoTestAgent) veya
+Genetik Algoritma (GeneticOptimizer) ile işlenir; aynı anda en fazla
+--paralel kadar modül çalışır.
+
+Çıktı dizini:
+- <cikti>/<modülün dizini>/test_<modül>.py: Üretilen en iyi test kodu
+  ('from app import' satırları modülün gerçek adına çevrilir)
+- <cikti>/ozet.jsonl: Her modül için bir satır (durum, coverage, deneme sayısı,
+  süre, LLM çağrı özeti); modüller bittikçe yazılır
+
+Atlanan dosyalar: test_*.py / *_test.py, gizli dizinler, sanal ortamlar,
+fonksiyon veya sınıf tanımı olmayan modüller (ör. boş __init__.py).
+
+Not: Her modül kendi başına (app.py olarak) test edilir; paket içi göreli
+importlar (from . import x) test sandbox'ında çözülemez.
+
+Kullanım:
+    python batch_runner.py <dizin> [--mod ajan|ga] [--paralel 2] [--cikti batch_sonuc]
+                           [--deneme 5] [--nesil 10] [--populasyon 4] [--dal]
+"""
+
+import argparse
+import ast
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Taranmayacak dizinler (gizli dizinler de atlanır)
+ATLANAN_DIZINLER = {"__pycache__", "venv", "env", "node_modules", "build", "dist", "site-packages"}
+
+# Başarılı (testleri geçen) ajan adımlarının durumları
+BASARILI_DURUMLAR = ("Mükemmel", "Gelişme", "Gerileme", "Sabit")
+
+# Üretilen testlerdeki 'app' importları (coverage sandbox'ında kaynak kod app.py'dir)
+APP_IMPORT = re.compile(r"^(\s*)(from\s+app\s+import\b|import\s+app\b)(\s+as\b)?", re.MULTILINE)
+
+
+def modulleri_bul(kok):
+    """
+    Dizindeki (alt dizinler dahil) test edilecek Python modüllerini bulur.
+
+    Args:
+        kok (str): Dizin, paket veya tek bir .py dosyası
+
+    Returns:
+        list: Köke göre göreli dosya yolları (sıralı)
+    """
+    if os.path.isfile(kok):
+        return [os.path.basename(kok)]
+
+    moduller = []
+    for dizin, alt_dizinler, dosyalar in os.walk(kok):
+        alt_dizinler[:] = sorted(d for d in alt_dizinler if not d.startswith(".") and d not in ATLANAN_DIZINLER)
+        for dosya in sorted(dosyalar):
+            if not dosya.endswith(".py") or dosya.startswith("test_") or dosya.endswith("_test.py"):
+                continue
+            moduller.append(os.path.relpath(os.path.join(dizin, dosya), kok))
+    return moduller
+
+
+def modul_adi(kok, goreli_yol):
+    """
+    Dosyanın import edilebilir (noktalı) adını bulur. Kök dizin bir paketse
+    (__init__.py içeriyorsa) paket adı başa eklenir.
+
+    Örnek: kok="proje/pkg", goreli_yol="alt/hesap.py" -> "pkg.alt.hesap"
+    """
+    parcalar = os.path.splitext(goreli_yol)[0].split(os.sep)
+    if parcalar[-1] == "__init__":
+        parcalar.pop()
+    if os.path.isdir(kok) and os.path.exists(os.path.join(kok, "__init__.py")):
+        parcalar.insert(0, os.path.basename(os.path.abspath(kok)))
+    return ".".join(parcalar)
+
+
+def importlari_duzelt(test_kodu, ad):
+    """Üretilen testteki 'from app import ...' ve 'import app' satırlarını modülün gerçek adına çevirir."""
+    if not ad:
+        return test_kodu
+
+    def degistir(eslesme):
+        girinti, ifade, takma_ad = eslesme.groups()
+        if ifade.startswith("from"):
+            return f"{girinti}from {ad} import"
+        return f"{girinti}import {ad}{takma_ad or ' as app'}"
+
+    return APP_IMPORT.sub(degistir, test_kodu)
+
+
+def _paylastir(sinir, paralel):
+    """Anahtar başına kotayı süreçlere böler; 0 (sınırsız) olduğu gibi kalır."""
+    return max(1, sinir // paralel) if sinir > 0 else sinir
+
+
+def _isci_baslat(paralel):
+    """
+    Her işçi sürecinde bir kez çalışır. Süreçler kendi coverage havuzunu ve
+    hız sınırlayıcısını kurar: Havuz CPU'ları, anahtar başına dakikalık kota
+    da süreçler arasında paylaştırılır (toplam kota aşılmasın).
+    """
+    from modules.env import ensure_dotenv
+    ensure_dotenv()
+    os.environ.setdefault("COVERAGE_POOL_SIZE", str(max(1, (os.cpu_count() or 1) // paralel)))
+
+    import modules.llm_client as llm_client
+    llm_client.DEFAULT_RPM_PER_KEY = _paylastir(llm_client.DEFAULT_RPM_PER_KEY, paralel)
+    llm_client.DEFAULT_TPM_PER_KEY = _paylastir(llm_client.DEFAULT_TPM_PER_KEY, paralel)
+
+
+def _ajan_calistir(kaynak, ayarlar):
+    """Ajanı çalıştırır; (en_iyi_kod, coverage, deneme_sayısı, başarılı_mı) döner."""
+    from modules.agent import AutoTestAgent
+
+    agent = AutoTestAgent(kaynak, max_retries=ayarlar["deneme"], incremental=True, branch=ayarlar["dal"])
+    _, history = agent.run()
+    basarili = [step for step in history if step["status"] in BASARILI_DURUMLAR]
+    en_iyi = max(basarili, key=lambda step: step["coverage"]) if basarili else history[-1]
+    return en_iyi["code"], en_iyi["coverage"] if basarili else 0, len(history), bool(basarili)
+
+
+def _ga_calistir(kaynak, ayarlar):
+    """Genetik algoritmayı çalıştırır; (en_iyi_kod, coverage, nesil_sayısı, başarılı_mı) döner."""
+    from modules.genetic_brain import GeneticOptimizer
+
+    optimizer = GeneticOptimizer(kaynak, "", ayarlar["populasyon"], ayarlar["nesil"], incremental=True,
+                                 branch=ayarlar["dal"])
+    (kod, skor), history = optimizer.evolve()
+    return kod, max(0, skor), len(history), skor >= 0
+
+
+def modulu_isle(kok, goreli_yol, cikti, ayarlar):
+    """
+    Tek bir modül için test üretir ve test dosyasını yazar (işçi süreçte çalışır).
+
+    Args:
+        kok (str): Taranan dizin (veya dosya)
+        goreli_yol (str): Modülün köke göre yolu
+        cikti (str): Çıktı dizini
+        ayarlar (dict): mod, deneme, nesil, populasyon, dal
+
+    Returns:
+        dict: Özet kaydı (module, status, coverage, attempts, wall_seconds, llm, test_file, error)
+    """
+    from modules.llm_metrics import capture_llm_calls, summarize_llm_calls
+
+    yol = kok if os.path.isfile(kok) else os.path.join(kok, goreli_yol)
+    kayit = {"module": goreli_yol.replace(os.sep, "/"), "mode": ayarlar["mod"], "status": "", "coverage": 0,
+             "attempts": 0, "wall_seconds": 0.0, "llm": summarize_llm_calls([]), "test_file": None, "error": None}
+    baslangic = time.perf_counter()
+    try:
+        with open(yol, "r", encoding="utf-8") as f:
+            kaynak = f.read()
+        agac = ast.parse(kaynak)
+        if not any(isinstance(d, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) for d in agac.body):
+            kayit["status"] = "atlandi"
+            kayit["error"] = "Fonksiyon veya sınıf tanımı yok"
+            return kayit
+
+        calistir = _ga_calistir if ayarlar["mod"] == "ga" else _ajan_calistir
+        with capture_llm_calls() as cagrilar:
+            kod, coverage, deneme, basarili = calistir(kaynak, ayarlar)
+        kayit.update(status="ok" if basarili else "basarisiz", coverage=coverage, attempts=deneme,
+                     llm=summarize_llm_calls(cagrilar))
+
+        dizin, dosya = os.path.split(goreli_yol)
+        test_yolu = os.path.join(cikti, dizin, f"test_{os.path.splitext(dosya)[0]}.py")
+        os.makedirs(os.path.dirname(test_yolu), exist_ok=True)
+        with open(test_yolu, "w", encoding="utf-8") as f:
+            f.write(importlari_duzelt(kod, modul_adi(kok, goreli_yol)))
+        kayit["test_file"] = os.path.relpath(test_yolu, cikti).replace(os.sep, "/")
+    except SyntaxError as e:
+        kayit["status"] = "hata"
+        kayit["error"] = f"Yazım Hatası (Satır {e.lineno}): {e.msg}"
+    except Exception as e:
+        kayit["status"] = "hata"
+        kayit["error"] = f"Hata: {e}"
+    finally:
+        kayit["wall_seconds"] = round(time.perf_counter() - baslangic, 3)
+    return kayit
+
+
+def toplu_calistir(kok, cikti, ayarlar, paralel=2):
+    """
+    Bulunan tüm modülleri işçi süreç havuzunda işler ve özetleri yazar.
+
+    Args:
+        kok (str): Taranacak dizin, paket veya dosya
+        cikti (str): Test dosyalarının ve ozet.jsonl'in yazılacağı dizin
+        ayarlar (dict): mod, deneme, nesil, populasyon, dal
+        paralel (int): Aynı anda işlenecek en fazla modül sayısı
+
+    Returns:
+        list: Bitiş sırasıyla özet kayıtları
+    """
+    moduller = modulleri_bul(kok)
+    os.makedirs(cikti, exist_ok=True)
+    ozet_yolu = os.path.join(cikti, "ozet.jsonl")
+    print(f"{len(moduller)} modül bulundu | mod: {ayarlar['mod']} | paralel: {paralel} | çıktı: {cikti}")
+
+    kayitlar = []
+    # spawn: İşçiler ana sürecin thread'lerini/olay döngülerini kopyalamaz (tüm platformlarda aynı davranış)
+    baglam = multiprocessing.get_context("spawn")
+    with open(ozet_yolu, "w", encoding="utf-8") as ozet, \
+            ProcessPoolExecutor(max_workers=paralel, mp_context=baglam, initializer=_isci_baslat,
+                                initargs=(paralel,)) as havuz:
+        isler = [havuz.submit(modulu_isle, kok, yol, cikti, ayarlar) for yol in moduller]
+        for sira, is_ in enumerate(as_completed(isler), 1):
+            kayit = is_.result()
+            kayitlar.append(kayit)
+            ozet.write(json.dumps(kayit, ensure_ascii=False) + "\n")
+            ozet.flush()
+            print(f"[{sira}/{len(moduller)}] {kayit['module']}: {kayit['status']} | coverage: %{kayit['coverage']} | "
+                  f"deneme: {kayit['attempts']} | {kayit['wall_seconds']} sn | LLM çağrısı: {kayit['llm']['calls']}"
+                  + (f" | {kayit['error']}" if kayit["error"] else ""))
+    return kayitlar
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bir dizindeki tüm Python modülleri için toplu test üretir.")
+    parser.add_argument("kok", help="Taranacak dizin, paket veya .py dosyası")
+    parser.add_argument("--mod", choices=("ajan", "ga"), default="ajan",
+                        help="ajan: Otonom Ajan (RL), ga: Genetik Algoritma")
+    parser.add_argument("--paralel", type=int, default=2, help="Aynı anda işlenecek en fazla modül (süreç) sayısı")
+    parser.add_argument("--cikti", default="batch_sonuc", help="Test dosyaları ve ozet.jsonl için çıktı dizini")
+    parser.add_argument("--deneme", type=int, default=5, help="Ajan: Modül başına en fazla deneme")
+    parser.add_argument("--nesil", type=int, default=10, help="GA: Nesil sayısı")
+    parser.add_argument("--populasyon", type=int, default=4, help="GA: Popülasyon büyüklüğü")
+    parser.add_argument("--dal", action="store_true", help="Dal (branch) coverage'ını da hedefle")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.kok):
+        parser.error(f"Bulunamadı: {args.kok}")
+    ayarlar = {"mod": args.mod, "deneme": args.deneme, "nesil": args.nesil, "populasyon": args.populasyon,
+               "dal": args.dal}
+
+    baslangic = time.perf_counter()
+    kayitlar = toplu_calistir(args.kok, args.cikti, ayarlar, paralel=max(1, args.paralel))
+
+    sayilar = {durum: sum(1 for k in kayitlar if k["status"] == durum) for durum in ("ok", "basarisiz", "atlandi", "hata")}
+    olculen = [k["coverage"] for k in kayitlar if k["status"] in ("ok", "basarisiz")]
+    ortalama = sum(olculen) / len(olculen) if olculen else 0
+    print(f"Bitti: {time.perf_counter() - baslangic:.1f} sn | " + " | ".join(f"{d}: {n}" for d, n in sayilar.items())
+          + f" | ortalama coverage: %{ortalama:.2f}")
+    # Hata alan modül varsa sıfırdan farklı çıkış kodu (CI için)
+    sys.exit(1 if sayilar["hata"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Coverage Veri Toplayıcı Karşılaştırma (Benchmark) Betiği
+Bu betik, coverage ölçümünde kullanılan iki veri toplayıcının hızını
+karşılaştırır:
+- coverage.py (settrace / C tracer tabanlı)
+- sys.monitoring (PEP 669) tabanlı MonitoringCollector (Python 3.12+)
+
+İş yükü, temp_files/app.py kaynak kodu ve bu kodu girdi tabloları üzerinde
+döngüyle çağıran (GA'nın ürettiği testlere benzer) bir test dosyasıdır.
+Her toplayıcı aynı işi birkaç kez çalıştırır; en iyi ve ortalama süreler
+ile hızlanma oranı yazdırılır.
+
+Kullanım:
+    python benchmark_tracer.py [--tekrar 5] [--satir 20000]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "modules"))
+import coverage_worker  # noqa: E402
+
+KAYNAK_DOSYA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp_files", "app.py")
+
+# Girdi tablosu üzerinde dönen test (tüm dallar ve hata yolları dahil)
+TEST_SABLONU = """
+import unittest
+from app import Urun, Kullanici, SiparisYoneticisi
+
+TABLO = [
+    (fiyat, adet, vip)
+    for fiyat in (10, 99.9, 250, 1200, 5000)
+    for adet in (-1, 0, 1, 3, 50)
+    for vip in (False, True)
+]
+
+class TestTablo(unittest.TestCase):
+    def test_tablo(self):
+        yonetici = SiparisYoneticisi()
+        for _ in range({tekrar}):
+            for fiyat, adet, vip in TABLO:
+                urun = Urun("Kalem", fiyat, 10)
+                kullanici = Kullanici("Ali", is_vip=vip)
+                try:
+                    kayit = yonetici.siparis_olustur(kullanici, urun, adet)
+                    self.assertEqual(kayit["durum"], "ONAYLANDI")
+                except ValueError:
+                    self.assertLessEqual(adet, 0)
+                except Exception:
+                    self.assertGreater(adet, 10)
+"""
+
+
+def calistir(toplayici, tekrar_sayisi, satir):
+    """
+    Aynı işi verilen toplayıcıyla 'tekrar_sayisi' kez çalıştırır.
+
+    Args:
+        toplayici (str): "coverage" veya "auto" (sys.monitoring varsa onu kullanır)
+        tekrar_sayisi (int): Ölçüm tekrarı
+        satir (int): Test içindeki tablo turu sayısı (iş yükü büyüklüğü)
+
+    Returns:
+        tuple: (süreler listesi, son sonuç sözlüğü)
+    """
+    with open(KAYNAK_DOSYA, "r", encoding="utf-8") as f:
+        kaynak = f.read()
+
+    sureler = []
+    sonuc = None
+    for _ in range(tekrar_sayisi):
+        klasor = tempfile.mkdtemp(prefix="bench_")
+        try:
+            with open(os.path.join(klasor, "app.py"), "w", encoding="utf-8") as f:
+                f.write(kaynak)
+            with open(os.path.join(klasor, "test_app.py"), "w", encoding="utf-8") as f:
+                f.write(TEST_SABLONU.format(tekrar=satir // 50))
+
+            baslangic = time.perf_counter()
+            cevap = coverage_worker.run_job({"work_dir": klasor, "collector": toplayici})
+            sureler.append(time.perf_counter() - baslangic)
+            sonuc = cevap["result"]
+            if sonuc is None:
+                raise RuntimeError(cevap["error"])
+        finally:
+            shutil.rmtree(klasor, ignore_errors=True)
+    return sureler, sonuc
+
+
+def main():
+    parser = argparse.ArgumentParser(description="coverage.py ve sys.monitoring toplayıcılarını karşılaştırır.")
+    parser.add_argument("--tekrar", type=int, default=5, help="Her toplayıcı için ölçüm tekrarı")
+    parser.add_argument("--satir", type=int, default=20000, help="Test içinde çalıştırılacak sipariş sayısı")
+    args = parser.parse_args()
+
+    print(f"Python {sys.version.split()[0]} | sys.monitoring: {'var' if coverage_worker.MONITORING_AVAILABLE else 'yok'}")
+
+    sonuclar = {}
+    toplayicilar = ("coverage", "auto") if coverage_worker.MONITORING_AVAILABLE else ("coverage",)
+    for toplayici in toplayicilar:
+        sureler, sonuc = calistir(toplayici, args.tekrar, args.satir)
+        sonuclar[sonuc["collector"]] = (min(sureler), sum(sureler) / len(sureler), sonuc)
+        print(f"{sonuc['collector']:<11} en iyi: {min(sureler):.3f} sn | ortalama: {sum(sureler) / len(sureler):.3f} sn"
+              f" | coverage: %{sonuc['coverage_percent']} | eksik satırlar: {sonuc['missed_lines']}")
+
+    if "monitoring" in sonuclar:
+        hizlanma = sonuclar["coverage"][0] / sonuclar["monitoring"][0]
+        ayni = sonuclar["coverage"][2]["missed_lines"] == sonuclar["monitoring"][2]["missed_lines"]
+        print(f"Hızlanma (en iyi süreler): {hizlanma:.2f}x | Sonuçlar aynı: {'evet' if ayni else 'HAYIR'}")
+    else:
+        print("Bu Python sürümünde sys.monitoring yok; sadece coverage.py ölçüldü.")
+
+
+if __name__ == "__main__":
+    main()
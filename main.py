@@ -1,20 +1,18 @@
 import streamlit as st
-import os
-from dotenv import load_dotenv
-import pandas as pd
+import sys
 import ast  # SÖZDİZİMİ KONTROLÜ İÇİN
 
-# --- MODÜLLERİN İMPORT EDİLMESİ ---
-from modules.ai_generator import generate_test_code_from_gemini
-from modules.metrics import calculate_metrics
-from modules.coverage_tool import run_coverage_analysis
-from modules.visualizer import create_call_graph
-from modules.agent import AutoTestAgent 
-# YENİ EKLENEN MODÜL
-from modules.genetic_brain import GeneticOptimizer 
+from modules.env import ensure_dotenv
+from modules.lazy_import import lazy_module
+
+# .env dosyasını yükle (süreç başına bir kez; modüller ayarlarını içe aktarılırken okur)
+ensure_dotenv()
 
-# .env dosyasını yükle
-load_dotenv()
+# --- MODÜLLERİN İMPORT EDİLMESİ ---
+# Streamlit her etkileşimde betiği baştan çalıştırır. Modüller (ve Gemini SDK, networkx,
+# matplotlib gibi ağır kütüphaneler) sadece onları kullanan sayfada içe aktarılır;
+# böylece ilk açılış ve sayfa geçişleri kullanılmayan kütüphaneleri beklemez.
+pd = lazy_module("pandas")
 
 # --- YARDIMCI FONKSİYON: GÜVENLİK KONTROLÜ ---
 def is_valid_python(code):
@@ -27,6 +25,46 @@ def is_valid_python(code):
     except SyntaxError as e:
         return False, f"Yazım Hatası (Satır {e.lineno}): {e.msg}"
 
+# --- YARDIMCI FONKSİYON: AJAN ADIMININ GÖSTERİMİ ---
+def ajan_adimini_goster(step):
+    """Ajanın bir adımını (strateji, sonuç, süreler ve üretilen kod) açılır kutu olarak gösterir."""
+    durum_ikonu = "✅" if step['status'] == "Mükemmel" else "⚠️" if step['status'] == "İyileştirilmeli" else "❌"
+    with st.expander(f"Adım {step['attempt']} - Seçilen Strateji: {step['action']} -> Sonuç: {durum_ikonu} {step['status']}"):
+        st.write(f"**Detay:** {step['details']}")
+        llm = step.get('llm') or {}
+        st.caption(f"LLM: {llm.get('llm_seconds', 0)} sn (kota beklemesi: {llm.get('queue_wait', 0)} sn, "
+                   f"tekrar: {llm.get('retries', 0)}) | Değerlendirme: {step.get('eval_seconds', 0)} sn")
+        st.markdown("**Üretilen Kod:**")
+        st.code(step['code'], language='python')
+
+# --- YARDIMCI FONKSİYON: EVRİM TABLOSU ---
+def evrim_tablosu(history):
+    """GA nesil kayıtlarını tablo satırlarına çevirir (kapsama, gelişim durumu ve süreler)."""
+    history_data = []
+    previous_score = 0
+    
+    for h in history:
+        score = h['best_score']
+        improvement = score - previous_score
+        
+        if score >= 100:
+            status = "🏆 ZİRVE"
+        elif improvement > 0:
+            status = f"↗️ Gelişti (+%{improvement:.1f})"
+        else:
+            status = "➡️ Sabit"
+        
+        history_data.append({
+            "Nesil": h['generation'],
+            "Kapsama Oranı": f"%{score:.2f}",
+            "Durum": status,
+            "LLM (sn)": h['llm']['llm_seconds'],
+            "Kota Beklemesi (sn)": h['llm']['queue_wait'],
+            "Değerlendirme (sn)": h['eval_seconds']
+        })
+        previous_score = score
+    return history_data
+
 # Sayfa Ayarları
 st.set_page_config(page_title="AI Test Otomasyonu (RL + GA)", layout="wide")
 
@@ -39,10 +77,34 @@ secim = st.sidebar.radio("Modül Seçin:", [
     "Modül 4: Genetik Algoritma Laboratuvarı 🧬"  # <-- YENİ SEÇENEK
 ])
 
+# API anahtarlarının durumu (kota hatası alan anahtarlar soğuma süresi bitene kadar kullanılmaz).
+# Bu süreçte henüz LLM kullanılmadıysa gösterilecek istatistik yoktur; LLM modülleri içe aktarılmaz.
+llm_kullanildi = "modules.ai_generator" in sys.modules
+if llm_kullanildi:
+    from modules.ai_generator import get_key_stats
+    from modules.llm_metrics import get_llm_metrics
+
+anahtar_durumlari = get_key_stats() if llm_kullanildi else []
+if anahtar_durumlari:
+    with st.sidebar.expander("🔑 API Anahtarları"):
+        st.dataframe(pd.DataFrame(anahtar_durumlari), hide_index=True)
+
+# Son LLM çağrılarının süreleri (kota beklemesi, ilk parça, toplam), token ve tekrar sayıları
+son_cagrilar = get_llm_metrics().recent(20) if llm_kullanildi else []
+if son_cagrilar:
+    with st.sidebar.expander("⏱️ LLM Çağrıları"):
+        st.json(get_llm_metrics().summary())
+        st.dataframe(pd.DataFrame(son_cagrilar)[["outcome", "key_index", "retries", "queue_wait", "ttfb", "latency",
+                                                 "input_tokens", "output_tokens"]], hide_index=True)
+
 # ==============================================================================
 # MODÜL 1: KOD ÜRETİMİ & ANALİZ (Test Case Modu Aktif)
 # ==============================================================================
 if secim == "Modül 1: Kod Üretimi & Analiz":
+    from modules.ai_generator import generate_test_code_from_gemini
+    # Aynı kod için metrikler ve çizilmiş call graph (PNG) tekrar hesaplanmaz
+    from modules.ui_cache import cached_metrics, cached_call_graph_png
+
     st.header("📝 Modül 1: Test Case'den Kod Üretimi")
     st.info("Aşağıya yapılandırılmış Test Case'inizi (Adımlar ve Beklenen Sonuçlar) giriniz.")
 
@@ -86,7 +148,7 @@ Beklenen Sonuç:
 
                     with col2:
                         st.subheader("📊 Analiz Raporu")
-                        df_metrics, error_metrics = calculate_metrics(generated_code)
+                        df_metrics, error_metrics = cached_metrics(generated_code)
                         metrics_list_for_graph = []
 
                         if error_metrics:
@@ -102,18 +164,21 @@ Beklenen Sonuç:
                     st.subheader("🕸️ Fonksiyon Çağrı Akışı (Call Graph)")
 
                     try:
-                        fig = create_call_graph(
+                        png = cached_call_graph_png(
                             user_scenario="Test Case Analizi",
                             generated_code=generated_code,
-                            metrics=metrics_list_for_graph
+                            metrics=tuple(metrics_list_for_graph)
                         )
-                        st.pyplot(fig)
+                        st.image(png, use_container_width=True)
                     except Exception as e:
                         st.error(f"Grafik oluşturulurken bir hata oluştu: {e}")
 # ==============================================================================
 # MODÜL 2: COVERAGE (AYNEN KORUNDU)
 # ==============================================================================
 elif secim == "Modül 2: Test Kapsamı (Coverage)":
+    # Aynı kaynak/test çifti için tamamlanmış ölçüm tekrar çalıştırılmaz
+    from modules.ui_cache import cached_coverage
+
     st.header("📊 Modül 2: Test Coverage Analizi")
     st.markdown("Test kodunuzun, kaynak kodun ne kadarını kapsadığını ölçün.")
 
@@ -145,6 +210,9 @@ elif secim == "Modül 2: Test Kapsamı (Coverage)":
         else:
             test_code_input = st.text_area("Veya kodu buraya yapıştırın:", value=default_test, height=250, key="test_code")
 
+    branch_mode = st.checkbox("🌿 Dal (Branch) Coverage'ını da ölç", value=False, key="branch_cov",
+                              help="if/else gibi karar noktalarının her iki yönünün de test edilip edilmediğini gösterir.")
+
     if st.button("Coverage Analizini Başlat", type="primary"):
         valid_src, msg_src = is_valid_python(source_code_input)
         valid_test, msg_test = is_valid_python(test_code_input)
@@ -155,7 +223,7 @@ elif secim == "Modül 2: Test Kapsamı (Coverage)":
             st.error(f"❌ Test Kodu Hatalı: {msg_test}")
         else:
             with st.spinner("Coverage hesaplanıyor..."):
-                result, error = run_coverage_analysis(source_code_input, test_code_input)
+                result, error = cached_coverage(source_code_input, test_code_input, branch=branch_mode)
 
                 if error:
                     st.error(f"⚠️ Analiz sırasında mantıksal bir hata oluştu: {error}")
@@ -167,17 +235,46 @@ elif secim == "Modül 2: Test Kapsamı (Coverage)":
                     m2.metric("Durum", "Başarılı" if result['success'] else "Hatalı")
                     m3.metric("Test Edilmeyen Satır Sayısı", len(result['missed_lines']))
                     st.progress(cov_percent)
+
+                    # --- DAL (BRANCH) COVERAGE ---
+                    if result.get('branch_percent') is not None:
+                        b1, b2 = st.columns(2)
+                        b1.metric("Dal Kapsama Oranı (Branch)", f"%{result['branch_percent']}")
+                        b2.metric("Test Edilmeyen Dal Sayısı", len(result['missed_arcs']))
+                        if result['missed_arcs']:
+                            st.warning("⚠️ Çalıştırılmayan dallar (kaynak satır → hedef satır, negatif hedef: fonksiyondan çıkış): "
+                                       + ", ".join(f"{a} → {b}" for a, b in result['missed_arcs']))
+
+                    # --- TEST BAZLI SONUÇLAR (En yavaş test en üstte) ---
+                    if result.get('tests'):
+                        st.subheader("🧪 Test Sonuçları")
+                        df_tests = pd.DataFrame([
+                            {
+                                "Test": t['id'],
+                                "Sonuç": t['outcome'],
+                                "Süre (sn)": t['duration'],
+                                "Hata": f"{t['exception_type']}: {t['message']}" if t['exception_type'] else "",
+                            }
+                            for t in result['tests']
+                        ]).sort_values("Süre (sn)", ascending=False)
+                        st.dataframe(df_tests, use_container_width=True)
+
                     st.markdown("---")
                     st.subheader("🔍 Detaylı Satır Analizi")
 
-                    if result['missed_lines']:
+                    if result['missed_lines'] or result.get('missed_arcs'):
                         st.warning(f"⚠️ Dikkat: Kodunuzun {len(result['missed_lines'])} satırı test edilmedi.")
                         with st.expander("Test Edilmeyen Satırları Kod Üzerinde Gör", expanded=True):
                             src_lines = source_code_input.split('\n')
+                            partial = {}  # Bir yönü hiç çalışmamış karar satırları
+                            for kaynak, hedef in result.get('missed_arcs', []):
+                                partial.setdefault(kaynak, []).append(hedef)
                             annotated_code = []
                             for i, line in enumerate(src_lines, 1):
                                 if i in result['missed_lines']:
                                     annotated_code.append(f"{line:<50}  # <--- 🔴 TEST EDİLMEDİ (Satır {i})")
+                                elif i in partial:
+                                    annotated_code.append(f"{line:<50}  # <--- 🟡 KISMİ DAL (Çalışmayan hedef: {partial[i]})")
                                 else:
                                     annotated_code.append(f"{line:<50}  # 🟢 OK")
                             st.code("\n".join(annotated_code), language="python")
@@ -189,6 +286,9 @@ elif secim == "Modül 2: Test Kapsamı (Coverage)":
 # MODÜL 3: OTONOM AJAN (RL + LLM HİBRİT) (AYNEN KORUNDU)
 # ==============================================================================
 elif secim == "Modül 3: Otonom Ajan (RL & LLM)":
+    from modules.agent import AutoTestAgent
+    from modules.background import BackgroundRun
+
     st.header("🧠 Modül 3: RL Destekli Otonom Ajan")
     st.markdown("""
     Bu modül, **Reinforcement Learning (Q-Learning)** kullanarak en iyi prompt stratejisini öğrenir 
@@ -201,19 +301,59 @@ elif secim == "Modül 3: Otonom Ajan (RL & LLM)":
         placeholder="Python fonksiyonunuzu buraya yapıştırın..."
     )
 
-    if st.button("Ajanı Başlat 🚀"):
+    branch_mode_rl = st.checkbox("🌿 Dal (Branch) Coverage hedefle", value=False, key="branch_rl",
+                                 help="Ajan, satırlarla birlikte tüm dallar da çalışana kadar devam eder.")
+
+    # Ajan arka planda çalışır: Adımlar geldikçe gösterilir, sayfa yenilense de iş kesilmez
+    # ve iş bitmeden aynı oturumdan ikinci bir çalıştırma başlatılamaz
+    ajan_isi = st.session_state.get("ajan_isi")  # (AutoTestAgent, BackgroundRun)
+    ajan_calisiyor = ajan_isi is not None and ajan_isi[1].running
+
+    if st.button("Ajanı Başlat 🚀", disabled=ajan_calisiyor):
         if not source_code.strip():
             st.error("Lütfen kaynak kod girin.")
         else:
-            agent = AutoTestAgent(source_code, max_retries=5)
-            status_container = st.container()
-            
-            with st.spinner("RL Ajanı devrede... Stratejiler (Actions) deneniyor..."):
-                final_result, history = agent.run()
-            
-            st.success("İşlem Tamamlandı!")
-            
-            # --- 1. Q-TABLE GÖRSELLEŞTİRME ---
+            agent = AutoTestAgent(source_code, max_retries=5, incremental=True, branch=branch_mode_rl)
+            ajan_isi = (agent, BackgroundRun(agent.run, name="otonom-ajan").start())
+            st.session_state["ajan_isi"] = ajan_isi
+
+    if ajan_isi is not None:
+        agent, job = ajan_isi
+        canli = job.running  # Sonuç ekranı bu çalıştırmada mı tamamlandı (balon sadece bir kez)
+        if canli and st.button("⏹️ Durdur", key="ajan_iptal", help="Ajan, sürmekte olan adımı bitirince durur."):
+            job.cancel()
+
+        # --- 1. ADIM ADIM GEÇMİŞ (CANLI) ---
+        st.subheader("🕵️‍♂️ Ajanın Karar Süreci")
+        ilerleme = st.progress(0.0)
+        durum_text = st.empty()
+        adimlar = st.container()
+        gosterilen = 0
+        while True:
+            yeni_adimlar = job.wait_for_events(gosterilen, timeout=0.5)
+            with adimlar:
+                for step in yeni_adimlar:
+                    ajan_adimini_goster(step)
+            gosterilen += len(yeni_adimlar)
+            ilerleme.progress(min(gosterilen / agent.max_retries, 1.0))
+            if not yeni_adimlar and not job.running:
+                break
+            if job.running:
+                iptal_notu = " (durduruluyor...)" if job.cancel_event.is_set() else ""
+                durum_text.info(f"RL Ajanı devrede... Adım {gosterilen + 1}/{agent.max_retries} deneniyor "
+                                f"({job.elapsed:.0f} sn){iptal_notu}")
+        durum_text.empty()
+
+        if job.error:
+            st.error(job.error)
+        else:
+            final_result, history = job.result
+            if agent.cancelled:
+                st.warning(f"Ajan durduruldu ({len(history)} adım tamamlandı, {job.elapsed:.0f} sn).")
+            else:
+                st.success(f"İşlem Tamamlandı! ({job.elapsed:.0f} sn)")
+
+            # --- 2. Q-TABLE GÖRSELLEŞTİRME ---
             st.subheader("🧠 Q-Learning Hafızası (Q-Table)")
             st.info("Ajanın deneyimlerine göre hangi durumda hangi stratejiye (Action) kaç puan verdiğini gösterir.")
             
@@ -236,22 +376,16 @@ elif secim == "Modül 3: Otonom Ajan (RL & LLM)":
             else:
                 st.write("Henüz öğrenilmiş veri yok.")
 
-            # --- 2. ADIM ADIM GEÇMİŞ ---
-            st.subheader("🕵️‍♂️ Ajanın Karar Süreci")
-            for step in history:
-                durum_ikonu = "✅" if step['status'] == "Mükemmel" else "⚠️" if step['status'] == "İyileştirilmeli" else "❌"
-                with st.expander(f"Adım {step['attempt']} - Seçilen Strateji: {step['action']} -> Sonuç: {durum_ikonu} {step['status']}"):
-                    st.write(f"**Detay:** {step['details']}")
-                    st.markdown("**Üretilen Kod:**")
-                    st.code(step['code'], language='python')
-            
             # --- 3. NİHAİ SONUÇ ---
             st.markdown("---")
             st.subheader("🏆 Nihai (En İyi) Sonuç")
-            if final_result['status'] == "Hata":
+            if final_result is None:
+                st.info("Ajan ilk adımı tamamlamadan durduruldu.")
+            elif final_result['status'] in ("Hata", "Zaman Aşımı", "Bellek Aşımı"):
                 st.error(f"Hata: {final_result['details']}")
             else:
-                st.balloons()
+                if canli:
+                    st.balloons()
                 st.success(f"Başarılı! Coverage: {final_result['details']}")
                 st.code(final_result['code'], language='python')
 
@@ -259,6 +393,9 @@ elif secim == "Modül 3: Otonom Ajan (RL & LLM)":
 # MODÜL 4: GENETİK ALGORİTMA LABORATUVARI (GÜNCELLENDİ) 🧬
 # ==============================================================================
 elif secim == "Modül 4: Genetik Algoritma Laboratuvarı 🧬":
+    from modules.genetic_brain import GeneticOptimizer
+    from modules.background import BackgroundRun
+
     st.header("🧬 Modül 4: Genetik Kod Evrimi")
     st.markdown("""
     Bu modül, elinizdeki test kodunu **Doğal Seçilim, Mutasyon ve Çaprazlama** yöntemleriyle evrimleştirir.
@@ -279,23 +416,64 @@ elif secim == "Modül 4: Genetik Algoritma Laboratuvarı 🧬":
     
     pop_size = 2    
     generations = 50 
+    branch_mode_ga = st.checkbox("🌿 Fitness'ta Dal (Branch) Coverage'ını kullan", value=False, key="branch_ga",
+                                 help="Fitness, satır ve dal coverage'ının ortalaması olur; evrim tüm yollar denenince durur.")
+
+    # Evrim arka planda çalışır: Her nesil geldikçe grafik ve tablo güncellenir; iş bitmeden
+    # aynı oturumdan ikinci bir evrim başlatılamaz (sayfa yenilense de iş kesilmez)
+    ga_isi = st.session_state.get("ga_isi")  # (GeneticOptimizer, BackgroundRun)
+    ga_calisiyor = ga_isi is not None and ga_isi[1].running
 
-    if st.button("🧬 Evrimi Başlat"):
+    if st.button("🧬 Evrimi Başlat", disabled=ga_calisiyor):
         if not source_code_ga:
             st.error("Lütfen kaynak kodu girin.")
         else:
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
             # Optimizer başlat
-            optimizer = GeneticOptimizer(source_code_ga, initial_test_ga, pop_size, generations)
-            
-            with st.spinner(f"🧬 Genetik Algoritma çalışıyor... (Popülasyon: {pop_size}, Nesil: {generations})"):
-                # Evrim işlemini başlat
-                best_individual, history = optimizer.evolve()
-            
-            # --- SONUÇ EKRANI ---
-            progress_bar.progress(100)
+            optimizer = GeneticOptimizer(source_code_ga, initial_test_ga, pop_size, generations, incremental=True,
+                                        branch=branch_mode_ga)
+            ga_isi = (optimizer, BackgroundRun(optimizer.evolve, name="genetik-algoritma").start())
+            st.session_state["ga_isi"] = ga_isi
+
+    if ga_isi is not None:
+        optimizer, job = ga_isi
+        canli = job.running  # Sonuç ekranı bu çalıştırmada mı tamamlandı (balon sadece bir kez)
+        if canli and st.button("⏹️ Durdur", key="ga_iptal", help="Evrim, sürmekte olan nesli bitirince durur."):
+            job.cancel()
+
+        progress_bar = st.progress(0.0)
+        status_text = st.empty()
+
+        # --- 1. DEĞİŞİM GRAFİĞİ (CANLI) ---
+        st.subheader("📈 Gelişim Grafiği")
+        grafik = st.empty()
+
+        # --- 2. EVRİM SÜRECİ TABLOSU (CANLI) ---
+        st.subheader("🧬 Evrim Tarihçesi")
+        tablo = st.empty()
+
+        gosterilen = 0
+        while True:
+            yeni_nesiller = job.wait_for_events(gosterilen, timeout=0.5)
+            if yeni_nesiller:
+                gosterilen += len(yeni_nesiller)
+                history = job.events[:gosterilen]
+                progress_bar.progress(min(gosterilen / optimizer.generations, 1.0))
+                grafik.line_chart(pd.DataFrame([h['best_score'] for h in history], columns=["Coverage Skoru"]))
+                tablo.table(evrim_tablosu(history))
+            elif not job.running:
+                break
+            if job.running:
+                iptal_notu = " (durduruluyor...)" if job.cancel_event.is_set() else ""
+                en_iyi = job.events[gosterilen - 1]['best_score'] if gosterilen else 0
+                status_text.info(f"🧬 Genetik Algoritma çalışıyor... Nesil {gosterilen}/{optimizer.generations}, "
+                                 f"en iyi: %{en_iyi:.2f} ({job.elapsed:.0f} sn){iptal_notu}")
+        status_text.empty()
+
+        if job.error:
+            st.error(job.error)
+        else:
+            best_individual, history = job.result
+            progress_bar.progress(1.0)
             
             final_score = best_individual[1]
             total_gens = len(history)
@@ -303,7 +481,7 @@ elif secim == "Modül 4: Genetik Algoritma Laboratuvarı 🧬":
             # --- YENİ EKLENDİ: İSTATİSTİK PANELLERİ ---
             st.divider()
             
-            kpi1, kpi2, kpi3 = st.columns(3)
+            kpi1, kpi2, kpi3, kpi4 = st.columns(4)
             
             kpi1.metric(
                 label="En Yüksek Coverage",
@@ -321,49 +499,26 @@ elif secim == "Modül 4: Genetik Algoritma Laboratuvarı 🧬":
                 value=optimizer.total_tests_run,
                 help="Genetik algoritma boyunca oluşturulup analiz edilen toplam test kodu varyasyonu."
             )
+
+            kpi4.metric(
+                label="💾 Önbellekten Gelen",
+                value=optimizer.cache_hits,
+                help="Daha önce ölçülmüş (aynı veya sadece satır sonu karakterleri farklı) kodlar için tekrar çalıştırılmadan önbellekten alınan analiz sayısı."
+            )
             
             st.divider()
             # ------------------------------------------
 
             if final_score >= 100:
-                st.balloons()
+                if canli:
+                    st.balloons()
                 st.success(f"🎉 HEDEF TUTTURULDU! {total_gens}. Nesilde %100 Coverage'a ulaşıldı.")
+            elif optimizer.cancelled:
+                st.warning(f"⏹️ Evrim durduruldu. {total_gens} nesil sonunda maksimum %{final_score:.2f} oranına ulaşılabildi.")
             else:
                 st.warning(f"🏁 İşlem Tamamlandı. {total_gens} nesil sonunda maksimum %{final_score:.2f} oranına ulaşılabildi.")
-
-            # --- 1. DEĞİŞİM GRAFİĞİ ---
-            st.subheader("📈 Gelişim Grafiği")
-            scores = [h['best_score'] for h in history]
-            chart_data = pd.DataFrame(scores, columns=["Coverage Skoru"])
-            st.line_chart(chart_data)
-            
-            # --- 2. EVRİM SÜRECİ TABLOSU ---
-            st.subheader("🧬 Evrim Tarihçesi")
-            
-            history_data = []
-            previous_score = 0
-            
-            for h in history:
-                score = h['best_score']
-                improvement = score - previous_score
-                
-                if score >= 100:
-                    status = "🏆 ZİRVE"
-                elif improvement > 0:
-                    status = f"↗️ Gelişti (+%{improvement:.1f})"
-                else:
-                    status = "➡️ Sabit"
-                
-                history_data.append({
-                    "Nesil": h['generation'],
-                    "Kapsama Oranı": f"%{score:.2f}",
-                    "Durum": status
-                })
-                previous_score = score
-                
-            st.table(history_data)
             
             # --- 3. KAZANAN KOD ---
             st.markdown("---")
             st.subheader(f"🏆 Survivor (Kazanan Kod) - Coverage: %{final_score:.2f}")
-            st.code(best_individual[0], language='python')
\ No newline at end of file
+            st.code(best_individual[0], language='python')
@@ -1,7 +1,10 @@
 import time
+
 from modules.ai_generator import generate_test_code_from_gemini
-from modules.coverage_tool import run_coverage_analysis
+from modules.coverage_tool import run_coverage_analysis, coverage_score, is_fully_covered
 from modules.rl_brain import QLearningBrain
+from modules.prompt_slicer import build_source_context, describe_missed_lines
+from modules.llm_metrics import capture_llm_calls, summarize_llm_calls
 
 
 class AutoTestAgent:
@@ -10,22 +13,46 @@ class AutoTestAgent:
     üreten ve coverage (kapsam) oranını maksimize etmeye çalışan otonom ajan.
     """
 
-    def __init__(self, source_code, max_retries=5):
+    def __init__(self, source_code, max_retries=5, incremental=False, branch=False, branch_weight=None, seed=None,
+                 prompt_token_budget=None):
         self.source_code = source_code
         self.max_retries = max_retries
+        # True ise önceki denemelerde ölçülmüş (değişmemiş) test metotları tekrar çalıştırılmaz
+        self.incremental = incremental
+        # True ise dal (branch) coverage'ı da ölçülür; "Mükemmel" için tüm dallar çalışmalıdır
+        self.branch = branch
+        self.branch_weight = branch_weight
+        # Prompt'a eklenecek kaynak kodun token bütçesi (None: PROMPT_SOURCE_TOKEN_BUDGET, 0: sınırsız);
+        # büyük modüllerde sadece hedeflenen fonksiyonlar ve bağımlılıklarının imzaları gönderilir
+        self.prompt_token_budget = prompt_token_budget
         self.history = []
+        # run() iptal isteğiyle (cancel_event) erken bittiyse True
+        self.cancelled = False
+        # Bu çalıştırmada gönderilmiş prompt'lar: Aynı prompt tekrar gönderilirse önbellekteki
+        # (başarısız olduğu bilinen) kod yerine yeni bir yanıt istenir
+        self._sent_prompts = set()
 
         # --- Takviyeli Öğrenme (RL) Konfigürasyonu ---
         # Ajanın seçebileceği stratejik eylem uzayı (Action Space)
         self.actions = ["STRATEJI_STANDART", "STRATEJI_SADELESTIR", "STRATEJI_GENISLET", "STRATEJI_EDGE_CASE"]
         # Q-Learning beyni: Eylemlerin değerlerini (Q-values) saklayan ve güncelleyen motor
-        self.brain = QLearningBrain(actions=self.actions)
+        # seed verilirse eylem seçimleri tekrarlanabilir (ör. LLM kaydından tekrar oynatırken)
+        self.brain = QLearningBrain(actions=self.actions, seed=seed)
 
-    def _get_prompt_by_action(self, action, error_msg="", coverage_info=""):
+    def _get_prompt_by_action(self, action, error_msg="", coverage_info="", failing_tests="", missed_lines=None,
+                              missed_arcs=None):
         """
         Seçilen aksiyona göre LLM'e (Gemini) gönderilecek özelleştirilmiş
         komut setini (prompt) hazırlar.
+
+        failing_tests verilirse (önceki denemede başarısız olan testlerin adı,
+        hata tipi ve mesajı), hangi testlerin neden düştüğü prompt'a eklenir.
+
+        Kaynak kod token bütçesini aşıyorsa AST ile dilimlenir (prompt_slicer);
+        STRATEJI_GENISLET'te test edilmemiş satırları içeren fonksiyonlar önceliklidir
+        ve satırlar, içinde bulundukları fonksiyon ve dal koşullarıyla açıklanır.
         """
+        source = build_source_context(self.source_code, token_budget=self.prompt_token_budget)
         base_instruction = """
         Aşağıdaki Python kodu için 'unittest' kütüphanesini kullanarak test dosyası yaz.
         KURALLAR:
@@ -33,28 +60,64 @@ class AutoTestAgent:
         2. Sadece Python kodunu ver.
         """
 
+        # Önceki denemede düşen testler: LLM tüm kodu baştan yazmak yerine bunları düzeltsin
+        if failing_tests:
+            base_instruction += f"\nÖnceki denemede şu testler BAŞARISIZ oldu (başarılı testleri koru, bunları düzelt):\n{failing_tests}\n"
+
         if action == "STRATEJI_STANDART":
-            return f"{base_instruction}\nGenel ve kapsamlı testler yaz.\nKod:\n{self.source_code}"
+            return f"{base_instruction}\nGenel ve kapsamlı testler yaz.\nKod:\n{source}"
 
         elif action == "STRATEJI_SADELESTIR":
             # Syntax hatalarında veya karmaşık import problemlerinde ajanı temel yapıya döndürür
-            return f"{base_instruction}\nÖnceki kod HATA verdi: {error_msg}\nLütfen kodu SADELEŞTİR. Karmaşık yapılardan kaçın, sadece temel importları yap.\nKod:\n{self.source_code}"
+            return f"{base_instruction}\nÖnceki kod HATA verdi: {error_msg}\nLütfen kodu SADELEŞTİR. Karmaşık yapılardan kaçın, sadece temel importları yap.\nKod:\n{source}"
 
         elif action == "STRATEJI_GENISLET":
             # Düşük coverage durumunda spesifik olarak çalıştırılmamış satırlara odaklanır
-            return f"{base_instruction}\nCoverage Düşük kaldı. Şu satırlar test edilmedi: {coverage_info}\nLütfen sadece bu eksik satırları hedefleyen testler ekle.\nKod:\n{self.source_code}"
+            focus = list(missed_lines or []) + [arc[0] for arc in (missed_arcs or [])]
+            source = build_source_context(self.source_code, focus, self.prompt_token_budget)
+            targets = describe_missed_lines(self.source_code, missed_lines, missed_arcs)
+            if targets:
+                coverage_info += f"\nEksik satırların bulunduğu fonksiyonlar ve çalışmaları için gereken koşullar:\n{targets}"
+            return f"{base_instruction}\nCoverage Düşük kaldı. Şu satırlar test edilmedi: {coverage_info}\nLütfen sadece bu eksik satırları hedefleyen testler ekle.\nKod:\n{source}"
 
         elif action == "STRATEJI_EDGE_CASE":
             # Yüksek coverage sağlandığında %100'e ulaşmak için uç durumları zorlar
-            return f"{base_instruction}\nTestler çalışıyor ama coverage %100 değil. Lütfen 'Edge Case' (Sınır durumları: None, 0, negatif, boş liste) testleri ekle.\nKod:\n{self.source_code}"
+            return f"{base_instruction}\nTestler çalışıyor ama coverage %100 değil. Lütfen 'Edge Case' (Sınır durumları: None, 0, negatif, boş liste) testleri ekle.\nKod:\n{source}"
+
+        return f"{base_instruction}\nKod:\n{source}"
 
-        return f"{base_instruction}\nKod:\n{self.source_code}"
+    @staticmethod
+    def _summarize_failures(result, limit=5):
+        """
+        Yapılandırılmış test sonuçlarından başarısız testlerin kısa özetini çıkarır.
+
+        Args:
+            result (dict): run_coverage_analysis sonucu ('tests' listesi)
+            limit (int): Özete eklenecek en fazla test sayısı
+
+        Returns:
+            str: Her satırda "- test_id: HataTipi: mesaj" formatında özet (yoksa boş)
+        """
+        if not result:
+            return ""
+        failed = [t for t in result.get('tests', []) if t['outcome'] in ("failed", "error")]
+        lines = [f"- {t['id']}: {t['exception_type']}: {(t['message'] or '')[:200]}" for t in failed[:limit]]
+        if len(failed) > limit:
+            lines.append(f"- ... ve {len(failed) - limit} test daha")
+        return "\n".join(lines)
 
     def _determine_state(self, result, error_msg, current_coverage):
         """
         Gözlem Alanı (State Determination): Mevcut test sonuçlarını ve
         coverage verilerini analiz ederek ajanın içinde bulunduğu durumu tanımlar.
         """
+        # Kaynak sınırı aşımları (sonsuz döngü, aşırı bellek): Testler yarıda kesildi
+        if result and result.get('status') == "timeout":
+            return "DURUM_ZAMAN_ASIMI"
+
+        if result and result.get('status') == "oom":
+            return "DURUM_BELLEK_ASIMI"
+
         # Hatalı durumların tespiti (Ajanın negatif feedback alacağı durumlar)
         if error_msg:
             return "DURUM_SYNTAX_HATA"
@@ -65,9 +128,10 @@ class AutoTestAgent:
 
         # Başarı seviyelerinin gruplandırılması (Binning)
         # Sürekli veriyi (0-100) ayrık durumlara çevirerek Q-Table karmaşıklığını azaltır
-        cov = result['coverage_percent']
+        # (branch modunda puan, satır ve dal coverage'ının ağırlıklı ortalamasıdır)
+        cov = coverage_score(result, self.branch_weight)
 
-        if cov == 100:
+        if is_fully_covered(result):
             return "DURUM_MUKEMMEL"
         elif cov < 20:
             return "DURUM_COV_COK_DUSUK"
@@ -78,15 +142,31 @@ class AutoTestAgent:
         else:
             return "DURUM_COV_YUKSEK"
 
-    def run(self):
+    def run(self, on_progress=None, cancel_event=None):
         """
         Ana döngü: Karar alma (Action), Uygulama (Execution), Gözlem (State)
         ve Öğrenme (Reward) adımlarını içeren iterasyon süreci.
+
+        Her adımın kaydında LLM çağrılarının özeti ('llm': bekleme, süre, token, tekrar)
+        ve testlerin değerlendirme süresi ('eval_seconds') bulunur.
+
+        Args:
+            on_progress: Her adım bitince adım kaydıyla çağrılır (ör. arayüzde canlı gösterim)
+            cancel_event: threading.Event; set edilirse yeni adıma başlanmaz ve o ana kadarki
+                sonuç döner (self.cancelled True olur; hiç adım yoksa sonuç None'dır)
+
+        Returns:
+            tuple: (son_adım, adım_geçmişi)
         """
         current_coverage = 0
         state = "DURUM_BASLANGIC"
 
         for attempt in range(1, self.max_retries + 1):
+            # İptal sadece adımlar arasında kontrol edilir (yarım kalan adım öğrenmeye katılmaz)
+            if cancel_event is not None and cancel_event.is_set():
+                self.cancelled = True
+                return (self.history[-1] if self.history else None), self.history
+
             step_info = {"attempt": attempt, "status": "", "details": "", "action": ""}
 
             # 1. ADIM: EYLEM SEÇİMİ (Exploration vs Exploitation)
@@ -94,37 +174,61 @@ class AutoTestAgent:
             step_info["action"] = action
 
             # Context hazırlığı: Önceki denemelerden gelen hatalar ve eksik satırlar
-            last_error = self.history[-1]['details'] if self.history and self.history[-1]['status'] == "Hata" else ""
+            last_error = self.history[-1]['details'] if self.history and self.history[-1]['status'] in ("Hata", "Zaman Aşımı", "Bellek Aşımı") else ""
             last_missed = str(self.history[-1]['missed_lines']) if self.history and 'missed_lines' in self.history[
                 -1] else ""
+            if self.history and self.history[-1].get('missed_arcs'):
+                last_missed += f" | Çalışmayan dallar [satır, hedef satır]: {self.history[-1]['missed_arcs']}"
+            last_failures = self.history[-1].get('failing_tests', "") if self.history else ""
+            last_step = self.history[-1] if self.history else {}
 
             # 2. ADIM: KOD ÜRETİMİ (LLM Entegrasyonu)
-            prompt = self._get_prompt_by_action(action, last_error, last_missed)
-            generated_code = generate_test_code_from_gemini(prompt)
+            prompt = self._get_prompt_by_action(action, last_error, last_missed, last_failures,
+                                                last_step.get('missed_lines'), last_step.get('missed_arcs'))
+            with capture_llm_calls() as llm_calls:
+                generated_code = generate_test_code_from_gemini(prompt, use_cache=prompt not in self._sent_prompts)
+            self._sent_prompts.add(prompt)
             step_info["code"] = generated_code
+            step_info["llm"] = summarize_llm_calls(llm_calls)
 
             # 3. ADIM: ANALİZ (Testlerin Çalıştırılması ve Kapsam Ölçümü)
-            result, error_msg = run_coverage_analysis(self.source_code, generated_code)
+            # preflight: Bozuk çıktı (LLM hata mesajı, tanımsız isim vb.) çalıştırılmadan reddedilir;
+            # red sebebi hata mesajı olarak bir sonraki prompt'a aktarılır
+            eval_started = time.perf_counter()
+            result, error_msg = run_coverage_analysis(self.source_code, generated_code, incremental=self.incremental,
+                                                      branch=self.branch, preflight=True)
+            step_info["eval_seconds"] = round(time.perf_counter() - eval_started, 3)
 
             # 4. ADIM: DURUM GEÇİŞİ VE ÖDÜL MEKANİZMASI (Reward Shaping)
             next_state = self._determine_state(result, error_msg, current_coverage)
 
             reward = 0
-            new_coverage = result.get('coverage_percent', 0) if result else 0
+            new_coverage = coverage_score(result, self.branch_weight) if result else 0
+            step_info["coverage"] = new_coverage
 
             # --- Ödül Fonksiyonu Tasarımı ---
             if next_state == "DURUM_SYNTAX_HATA":
                 reward = -20  # Negatif Reward: Kodun çalışmaması en büyük engeldir
                 step_info.update({"status": "Hata", "details": error_msg})
 
+            elif next_state == "DURUM_ZAMAN_ASIMI":
+                reward = -30  # Negatif Reward: Sonsuz döngü/bekleme tüm çalışmayı yavaşlatır
+                step_info.update({"status": "Zaman Aşımı", "details": error_msg})
+
+            elif next_state == "DURUM_BELLEK_ASIMI":
+                reward = -30  # Negatif Reward: Aşırı bellek kullanımı
+                step_info.update({"status": "Bellek Aşımı", "details": error_msg})
+
             elif next_state == "DURUM_TEST_BASARISIZ":
                 reward = -10  # Negatif Reward: Mantıksal tutarsızlık cezası
-                step_info.update({"status": "Test Başarısız", "details": "Assertion Error"})
+                failing_tests = self._summarize_failures(result)
+                step_info.update({"status": "Test Başarısız", "details": failing_tests or "Assertion Error",
+                                  "failing_tests": failing_tests})
 
             elif next_state == "DURUM_MUKEMMEL":
                 # Pozitif Reward: %100 başarı ve zaman verimliliği teşviki
                 reward = 100 + (10 / attempt)
-                step_info.update({"status": "Mükemmel", "details": "Coverage: %100"})
+                step_info.update({"status": "Mükemmel", "details": "Coverage: %100 (Satır + Dal)" if self.branch else "Coverage: %100"})
 
             else:
                 # Dinamik Kapsam Analizi: İlerleme varsa ödüllendir, gerileme varsa cezalandır
@@ -143,6 +247,7 @@ class AutoTestAgent:
                 step_info["details"] = f"Coverage: %{new_coverage} (Değişim: {diff})"
                 current_coverage = new_coverage
                 if result: step_info["missed_lines"] = result.get('missed_lines', [])
+                if result and result.get('missed_arcs'): step_info["missed_arcs"] = result['missed_arcs']
 
             # 5. ADIM: ÖĞRENME (Bellman Denklemine Dayalı Q-Table Güncellemesi)
             self.brain.learn(state, action, reward, next_state)
@@ -150,11 +255,13 @@ class AutoTestAgent:
             # Döngü sonu hazırlıkları ve başarı kontrolü
             state = next_state
             self.history.append(step_info)
+            if on_progress:
+                on_progress(step_info)
 
             if next_state == "DURUM_MUKEMMEL":
                 return step_info, self.history
 
-            # API hız limitlerini (Rate Limit) aşmamak için kısa bekleme
-            time.sleep(1)
+            # API hız limitleri (Rate Limit) ai_generator'daki anahtar başına sınırlayıcıyla
+            # korunur; burada sabit bekleme yapılmaz
 
         return self.history[-1], self.history
\ No newline at end of file
@@ -1,56 +1,53 @@
-import google.generativeai as genai
+import ast
+import asyncio
+import concurrent.futures
+import contextvars
+import json
 import os
+import re
 import time
-from dotenv import load_dotenv
 
-# .env dosyasındaki çevresel değişkenleri (API anahtarları vb.) sisteme yükler
-load_dotenv()
+# .env import sırasında yüklenmez (modules.env); giriş noktaları modülleri içe aktarmadan önce yükler
+from modules.env import ensure_dotenv
+from modules.llm_client import (AsyncLLMClient, LLMHTTPError, RateLimiterPool,
+                                OUTPUT_TOKEN_ESTIMATE, estimate_tokens, get_key_manager, parse_retry_after)
+from modules.llm_backends import get_backend
+from modules.prompt_cache import get_prompt_cache, make_prompt_key
+from modules.code_stream import CodeStreamMonitor
+from modules.llm_metrics import LLMCallTrace, trace_outcome
 
+# Yanıtlar varsayılan olarak akış (streaming) halinde okunur; kod bloğu kapanınca beklenmez
+STREAMING_DEFAULT = os.getenv("LLM_STREAMING", "1") != "0"
 
-def get_all_api_keys():
-    """
-    Sistemdeki tüm Gemini API anahtarlarını toplar.
-    'GEMINI_API_KEY_1', 'GEMINI_API_KEY_2' gibi sıralı anahtarları ve
-    varsayılan 'GEMINI_API_KEY'i bir liste halinde döndürür.
-    """
-    keys = []
-    i = 1
-    # Dinamik olarak GEMINI_API_KEY_n formatındaki tüm anahtarları tara
-    while True:
-        key = os.getenv(f"GEMINI_API_KEY_{i}")
-        if key:
-            keys.append(key)
-            i += 1
-        else:
-            break
+# Çok adaylı yanıtlarda JSON yerine kullanılabilecek ayraç satırı: "# --- ADAY 2 ---"
+CANDIDATE_MARKER = re.compile(r"^[ \t]*#+[ \t]*[-=]*[ \t]*ADAY[ \t]*(\d+)\b.*$", re.IGNORECASE | re.MULTILINE)
 
-    # Eğer varsa, tekil/fallback API anahtarını da listeye ekle (mükerrer kontrolü ile)
-    fallback = os.getenv("GEMINI_API_KEY")
-    if fallback and fallback not in keys:
-        keys.append(fallback)
+NO_KEYS_ERROR = "Hata: Hiçbir API Key bulunamadı. .env dosyasını kontrol edin."
+QUOTA_ERROR = "Hata: Tüm API anahtarlarının kotası dolu! Biraz bekleyiniz..."
 
-    if not keys:
-        return []
 
-    return keys
+def get_all_api_keys(backend=None):
+    """
+    Arka ucun (None ise LLM_BACKEND) API anahtarlarını döndürür. Gemini için
+    'GEMINI_API_KEY_1', 'GEMINI_API_KEY_2' gibi sıralı anahtarlar ve varsayılan
+    'GEMINI_API_KEY' bir liste halinde döner. Anahtarlar .env'den de okunur
+    (dosya henüz yüklenmediyse ilk çağrıda yüklenir).
+    """
+    ensure_dotenv()
+    return (backend or get_backend()).api_keys()
 
 
-def generate_test_code_from_gemini(user_prompt, fix_for_streamlit=False, mode="general"):
+def build_system_instruction(fix_for_streamlit=False, mode="general"):
     """
-    Belirlenen moda göre (Genel Test veya Spesifik Test Case) Gemini AI modelinden
-    Python unittest kodu üretir. API kota sınırlarını aşmak için anahtar rotasyonu uygular.
+    Moda göre LLM'e gönderilecek sistem talimatını seçer.
 
     Args:
-        user_prompt (str): Test edilecek kod veya test senaryosu.
         fix_for_streamlit (bool): Kodun Streamlit ortamında çalışması için gerekli main bloğunu ekler.
         mode (str): Prompt stratejisi seçimi ("general" veya "test_case").
-    """
-
-    api_keys = get_all_api_keys()
-
-    if not api_keys:
-        return "Hata: Hiçbir API Key bulunamadı. .env dosyasını kontrol edin."
 
+    Returns:
+        str: Sistem talimatı
+    """
     # --- PROMPT MÜHENDİSLİĞİ (Prompt Engineering) ---
 
     # Strateji 1: Genel amaçlı, kaynak koddan test üreten sistem talimatı
@@ -97,53 +94,338 @@ def generate_test_code_from_gemini(user_prompt, fix_for_streamlit=False, mode="g
             unittest.main(argv=['first-arg-is-ignored'], exit=False)
         """
 
-    # Sistem talimatı ile kullanıcı girdisini birleştirerek tam promptu oluştur
-    full_prompt = f"{system_instruction}\n\nKullanıcı Girdisi:\n{user_prompt}"
+    return system_instruction
+
+
+def build_full_prompt(user_prompt, fix_for_streamlit=False, mode="general"):
+    """
+    Sistem talimatı ile kullanıcı girdisini birleştirerek LLM'e gönderilecek
+    tam prompt'u oluşturur.
+
+    Args:
+        user_prompt (str): Test edilecek kod veya test senaryosu.
+        fix_for_streamlit (bool): Kodun Streamlit ortamında çalışması için gerekli main bloğunu ekler.
+        mode (str): Prompt stratejisi seçimi ("general" veya "test_case").
+
+    Returns:
+        str: Tam prompt
+    """
+    return f"{build_system_instruction(fix_for_streamlit, mode)}\n\nKullanıcı Girdisi:\n{user_prompt}"
+
+
+def _cache_lookup(user_prompt, fix_for_streamlit, mode, backend, use_cache):
+    """
+    Prompt önbelleğine bakar (arka uç önbelleği kullanmıyorsa atlanır, ör. kayıt/tekrar).
+
+    Returns:
+        tuple: (önbellek, anahtar, kayıtlı_yanıt) - Önbellek kapalıysa (None, None, None)
+    """
+    cache = get_prompt_cache() if use_cache and backend.use_prompt_cache else None
+    if cache is None:
+        return None, None, None
+    key = make_prompt_key(backend.model_id, build_system_instruction(fix_for_streamlit, mode), user_prompt, mode,
+                          fix_for_streamlit)
+    return cache, key, cache.get(key)
+
+
+def clean_generated_code(text):
+    """
+    LLM yanıtındaki markdown etiketlerini temizler ve saf Python kodunu döndürür.
+    """
+    return text.replace("```python", "").replace("```", "").strip()
+
+
+def _json_candidates(text):
+    """Metindeki ilk JSON dizisini bulur; elemanlar string veya {"code": ...} olabilir."""
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r"\[", text):
+        try:
+            value, _ = decoder.raw_decode(text, match.start())
+        except ValueError:
+            continue
+        if isinstance(value, list) and any(isinstance(item, (str, dict)) for item in value):
+            return [item.get("code") or item.get("kod") if isinstance(item, dict) else item for item in value]
+    return None
+
+
+def parse_candidates(text, count):
+    """
+    Tek istekte istenen birden fazla aday kodu yanıttan ayıklar.
+
+    Yanıtta "# --- ADAY n ---" ayraçları varsa bloklar bunlara göre, yoksa
+    ilk JSON dizisi ('["kod1", "kod2"]') kullanılarak ayrılır. Boş veya ayrıştırılamayan (sözdizimi hatalı)
+    adaylar None olarak döner; çağıran bunları tekil isteklerle tamamlar.
+
+    Args:
+        text (str): LLM yanıtı (hata mesajı da olabilir)
+        count (int): Beklenen aday sayısı
+
+    Returns:
+        list: 'count' uzunluğunda; her eleman temiz kod veya None
+    """
+    raw = [None] * count
+    markers = list(CANDIDATE_MARKER.finditer(text or ""))
+    if markers:
+        for marker, following in zip(markers, markers[1:] + [None]):
+            number = int(marker.group(1))
+            if 1 <= number <= count and raw[number - 1] is None:
+                raw[number - 1] = text[marker.end():following.start() if following else len(text)]
+    else:
+        for i, item in enumerate((_json_candidates(text or "") or [])[:count]):
+            raw[i] = item if isinstance(item, str) else None
+
+    candidates = []
+    for item in raw:
+        code = clean_generated_code(item) if item else ""
+        try:
+            ast.parse(code)
+        except SyntaxError:
+            code = ""
+        candidates.append(code or None)
+    return candidates
+
+
+def get_key_stats():
+    """
+    Anahtar başına kullanım ve sağlık istatistikleri (istek, başarı, kota hatası,
+    ortalama süre, kalan soğuma süresi). Anahtarlar maskelenmiş döner.
+    """
+    return get_key_manager().stats()
+
+
+def _response_to_code(text, prompt_feedback, monitor=None):
+    """
+    Boş/filtrelenmiş yanıtları hata mesajına, dolu yanıtları temiz koda çevirir.
+    Akış sözdizimi hatası yüzünden kesildiyse (monitor) hata mesajı döner.
+    """
+    if monitor is not None and monitor.status == "aborted":
+        return f"Hata: Yanıt akışı erken kesildi, kod geçersiz. {monitor.reason}"
+    if not text:
+        if prompt_feedback is not None:
+            return f"AI cevap veremedi. Filtre: {prompt_feedback}"
+        return "AI boş cevap döndürdü."
+    return clean_generated_code(text)
+
+
+def generate_test_code_from_gemini(user_prompt, fix_for_streamlit=False, mode="general", use_cache=True,
+                                   stream=None, backend=None):
+    """
+    Belirlenen moda göre (Genel Test veya Spesifik Test Case) LLM'den (varsayılan:
+    Gemini) Python unittest kodu üretir. API kota sınırlarını aşmak için anahtar rotasyonu uygular.
 
-    # AI Güvenlik Ayarları: Üretilen kodun filtre takılmaması için kısıtlamaları esnet
-    safety_settings = [
-        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-    ]
+    İstekler anahtar başına hız sınırlayıcıdan (llm_client) geçer; kotası dolduğu
+    bilinen (soğumadaki) anahtarlar atlanır ve en sağlıklı anahtar seçilir.
+    Hiçbirinde yer yoksa sadece gerektiği kadar beklenir.
+
+    Her çağrının bekleme, ilk parça ve toplam süreleri, token sayıları, kullanılan
+    anahtar, tekrar sayısı ve sonucu llm_metrics'e kaydedilir.
+
+    Args:
+        user_prompt (str): Test edilecek kod veya test senaryosu.
+        fix_for_streamlit (bool): Kodun Streamlit ortamında çalışması için gerekli main bloğunu ekler.
+        mode (str): Prompt stratejisi seçimi ("general" veya "test_case").
+        use_cache (bool): True ise aynı girdiler için önceden üretilmiş kod (prompt önbelleği)
+            kullanılır. Bilerek rastgele olması istenen çağrılarda (GA mutasyonu) False verilmelidir.
+        stream (bool): True ise yanıt akış halinde okunur; kapanış ``` satırı gelince veya
+            tamamlanmış ifadelerde sözdizimi hatası görülünce beklenmeden durulur
+            (None ise LLM_STREAMING ayarı).
+        backend (LLMBackend): İsteğin gönderileceği arka uç (None ise LLM_BACKEND ayarı)
+    """
+    stream = STREAMING_DEFAULT if stream is None else stream
+    try:
+        backend = backend or get_backend()
+    except ValueError as e:
+        return f"Hata: {e}"
+
+    full_prompt = build_full_prompt(user_prompt, fix_for_streamlit, mode)
+    trace = LLMCallTrace(backend, full_prompt)
+
+    # Aynı prompt daha önce cevaplandıysa API'ye hiç gidilmez
+    cache, cache_key, cached = _cache_lookup(user_prompt, fix_for_streamlit, mode, backend, use_cache)
+    if cached is not None:
+        trace.finish("cached", cached)
+        return cached
+
+    api_keys = get_all_api_keys(backend)
+
+    if not api_keys:
+        trace.finish("no_keys")
+        return NO_KEYS_ERROR
+
+    # Anahtar başına istek/token kovaları ve sağlık durumu (süreç genelinde paylaşılır)
+    pool = RateLimiterPool(api_keys, limits=backend.rate_limits)
+    reserved_tokens = estimate_tokens(full_prompt) + OUTPUT_TOKEN_ESTIMATE
+    # Sağlığı eşit anahtarlar arasında her çağrı farklı anahtardan başlar (hep 1. anahtar değil)
+    slot = get_key_manager().next_slot()
 
     # --- API KEY ROTASYON VE HATA YÖNETİMİ ---
     # Toplam anahtar sayısının 3 katı kadar deneme yaparak geçici hataları tolere et
     max_attempts = len(api_keys) * 3
 
     for attempt in range(max_attempts):
-        # Modülo aritmetiği ile sıradaki API anahtarını seç (Round-robin)
-        current_key_index = attempt % len(api_keys)
-        current_key = api_keys[current_key_index]
+        # Soğumada olmayan, kotasında yer olan en sağlıklı anahtarı seç (gerekirse bekle)
+        waiting = time.perf_counter()
+        current_key_index = pool.acquire(reserved_tokens, start=slot + attempt)
+        trace.waited(time.perf_counter() - waiting)
+        if current_key_index is None:
+            break  # Tüm anahtarlar uzun süre soğumada
+        used_tokens, outcome, retry_after = None, "error", None
+        started = time.perf_counter()
+        trace.attempt(current_key_index)
 
         try:
-            # Seçili anahtar ile Gemini modelini yapılandır
-            genai.configure(api_key=current_key)
-            model = genai.GenerativeModel('gemini-flash-latest')
-
-            # İçerik üretimi isteğini gönder
-            response = model.generate_content(full_prompt, safety_settings=safety_settings)
+            # Akış modu: Parçalar geldikçe izlenir, kod bloğu kapanınca okuma bırakılır
+            monitor = CodeStreamMonitor() if stream else None
+            text, prompt_feedback, used_tokens = backend.complete(api_keys[current_key_index], full_prompt, monitor)
+            outcome = "ok"
 
-            # Yanıtın boş gelip gelmediğini veya filtreye takılıp takılmadığını kontrol et
-            if not response.parts:
-                if hasattr(response, 'prompt_feedback'):
-                    return f"AI cevap veremedi. Filtre: {response.prompt_feedback}"
-                return "AI boş cevap döndürdü."
-
-            # Markdown etiketlerini temizle ve saf Python kodunu dışarı aktar
-            cleaned_code = response.text.replace("```python", "").replace("```", "").strip()
-            return cleaned_code
+            # Boş/filtrelenmiş yanıtlar hata mesajına, dolu yanıtlar saf Python koduna çevrilir
+            code = _response_to_code(text, prompt_feedback, monitor)
+            if text and not (monitor and monitor.status == "aborted") and cache is not None:
+                cache.put(cache_key, code)  # Sadece başarılı yanıtlar saklanır
+            trace.finish(trace_outcome(text, monitor), text, used_tokens, monitor)
+            return code
 
         except Exception as e:
             error_msg = str(e)
-            # HTTP 429: Too Many Requests (Kota Aşımı) hatası durumunda anahtar değiştir
+            # HTTP 429: Too Many Requests (Kota Aşımı) hatası durumunda anahtarı soğumaya al ve değiştir
             if "429" in error_msg or "quota" in error_msg.lower():
-                print(f"⚠️ Anahtar {current_key_index + 1} kotası doldu! Sıradaki anahtara geçiliyor... (Hata: 429)")
-                time.sleep(1)  # API limitlerini zorlamamak için kısa mola
+                outcome = "quota"
+                retry_after = getattr(e, "retry_after", None) or parse_retry_after(error_msg)
+                print(f"⚠️ Anahtar {current_key_index + 1} kotası doldu! Soğumaya alındı, başka anahtara geçiliyor... (Hata: 429)")
                 continue
             else:
                 # Kota harici kritik hataları (bağlantı vb.) hemen raporla
+                trace.finish("error")
                 return f"Beklenmeyen Hata: {error_msg}"
+        finally:
+            # Sonucu anahtarın sağlık durumuna işle; ayrılan kotayı gerçek kullanımla düzelt
+            pool.release(current_key_index, reserved_tokens, used_tokens, outcome, retry_after,
+                         time.perf_counter() - started)
+            trace.attempt_done()
+
+    trace.finish("quota")
+    return QUOTA_ERROR
+
+
+async def agenerate_test_code(user_prompt, fix_for_streamlit=False, mode="general", client=None, slot=0,
+                              use_cache=True, stream=None, backend=None):
+    """
+    generate_test_code_from_gemini'nin asenkron karşılığı. Dönüş değerleri
+    (temiz kod veya "Hata: ..." mesajları) senkron sürümle aynıdır.
+
+    Args:
+        user_prompt (str): Test edilecek kod veya test senaryosu.
+        fix_for_streamlit (bool): Kodun Streamlit ortamında çalışması için gerekli main bloğunu ekler.
+        mode (str): Prompt stratejisi seçimi ("general" veya "test_case").
+        client (AsyncLLMClient): Kullanılacak istemci (None ise arka ucun tüm anahtarlarıyla yeni istemci)
+        slot (int): İlk denenecek anahtarın sırası
+        use_cache (bool): True ise prompt önbelleği kullanılır
+        stream (bool): True ise yanıt akış halinde okunur (None ise LLM_STREAMING ayarı)
+        backend (LLMBackend): client verilmediğinde kullanılacak arka uç (None ise LLM_BACKEND ayarı)
+
+    Returns:
+        str: Üretilen test kodu veya hata mesajı
+    """
+    stream = STREAMING_DEFAULT if stream is None else stream
+    if client is None:
+        try:
+            backend = backend or get_backend()
+        except ValueError as e:
+            return f"Hata: {e}"
+    backend = client.backend if client is not None else backend
+    full_prompt = build_full_prompt(user_prompt, fix_for_streamlit, mode)
+    trace = LLMCallTrace(backend, full_prompt)
+
+    cache, cache_key, cached = _cache_lookup(user_prompt, fix_for_streamlit, mode, backend, use_cache)
+    if cached is not None:
+        trace.finish("cached", cached)
+        return cached
+
+    if client is None:
+        client, error = _make_client(backend)
+        if error:
+            trace.finish("no_keys")
+            return error
+
+    monitor = CodeStreamMonitor() if stream else None
+    try:
+        text, prompt_feedback = await client.generate(full_prompt, slot=slot, monitor=monitor, trace=trace)
+    except LLMHTTPError as e:
+        trace.finish("quota" if e.is_quota else "error")
+        return QUOTA_ERROR if e.is_quota else f"Beklenmeyen Hata: {e}"
+    except Exception as e:
+        trace.finish("error")
+        return f"Beklenmeyen Hata: {e}"
+    code = _response_to_code(text, prompt_feedback, monitor)
+    if text and not (monitor and monitor.status == "aborted") and cache is not None:
+        cache.put(cache_key, code)
+    trace.finish(trace_outcome(text, monitor), text, monitor=monitor)
+    return code
+
+
+def _make_client(backend):
+    """
+    Arka ucun tüm anahtarlarını kullanan asenkron istemci oluşturur.
+
+    Returns:
+        tuple: (istemci, hata_mesajı) - Anahtar yoksa (None, NO_KEYS_ERROR)
+    """
+    api_keys = get_all_api_keys(backend)
+    if not api_keys:
+        return None, NO_KEYS_ERROR
+    return AsyncLLMClient(api_keys, backend=backend), None
+
+
+def _run_coroutine(coro):
+    """
+    Coroutine'i senkron koddan çalıştırır. Çağıran thread'de zaten bir event loop
+    çalışıyorsa, coroutine ayrı bir thread'deki yeni loop'ta çalıştırılır
+    (çağıranın bağlamıyla; ör. capture_llm_calls kayıtları toplamaya devam eder).
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(contextvars.copy_context().run, asyncio.run, coro).result()
+
+
+def generate_many(user_prompts, fix_for_streamlit=False, mode="general", client=None, use_cache=True,
+                  stream=None, backend=None):
+    """
+    Birden fazla prompt için eş zamanlı kod üretir (ör. GA'nın bir neslindeki tüm çocuklar).
+
+    İstekler tüm API anahtarlarına dağıtılır; her anahtarın dakikalık istek/token
+    kotası ve eş zamanlı istek sınırı aşılmaz. Toplam süre, anahtar sayısı arttıkça kısalır.
+
+    Args:
+        user_prompts (list): Prompt listesi
+        fix_for_streamlit (bool): Kodun Streamlit ortamında çalışması için gerekli main bloğunu ekler.
+        mode (str): Prompt stratejisi seçimi ("general" veya "test_case").
+        client (AsyncLLMClient): Kullanılacak istemci (None ise arka ucun tüm anahtarlarıyla yeni istemci)
+        use_cache (bool): True ise prompt önbelleği kullanılır
+        stream (bool): True ise yanıtlar akış halinde okunur (None ise LLM_STREAMING ayarı)
+        backend (LLMBackend): client verilmediğinde kullanılacak arka uç (None ise LLM_BACKEND ayarı)
+
+    Returns:
+        list: Girdi sırasıyla üretilen kodlar veya hata mesajları
+    """
+    user_prompts = list(user_prompts)
+    if not user_prompts:
+        return []
+
+    if client is None:
+        try:
+            client, error = _make_client(backend or get_backend())
+        except ValueError as e:
+            client, error = None, f"Hata: {e}"
+        if error:
+            return [error] * len(user_prompts)
+
+    async def _generate_all():
+        return await asyncio.gather(*(agenerate_test_code(prompt, fix_for_streamlit, mode, client=client, slot=i,
+                                                          use_cache=use_cache, stream=stream)
+                                      for i, prompt in enumerate(user_prompts)))
 
-    return "Hata: Tüm API anahtarlarının kotası dolu! Biraz bekleyiniz..."
\ No newline at end of file
+    return _run_coroutine(_generate_all())
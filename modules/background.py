@@ -0,0 +1,102 @@
+"""
+Arka Plan Çalıştırma Modülü
+Ajan (AutoTestAgent.run) ve genetik algoritma (GeneticOptimizer.evolve) gibi
+uzun süren işleri ayrı bir iş parçacığında (thread) çalıştırır.
+
+Streamlit betiği işi beklerken bloklanmaz: İş, ilerleme olaylarını (adım /
+nesil kayıtları) biriktirir; arayüz bunları okuyup canlı gösterir ve iptal
+isteği gönderebilir. İş nesnesi st.session_state'te saklandığı için sayfa
+yeniden çalıştırıldığında (ör. bir düğmeye basıldığında) iş kesilmez ve o ana
+kadarki olaylar tekrar gösterilir.
+
+Çalıştırılan fonksiyon iki argüman alır: on_progress(olay) ve cancel_event
+(threading.Event). İş parçacığından Streamlit fonksiyonları çağrılmamalıdır.
+"""
+
+import threading
+import time
+
+
+class BackgroundRun:
+    """
+    Tek bir arka plan işinin durumu: ilerleme olayları, sonuç/hata ve iptal isteği.
+
+    Örnek:
+        job = BackgroundRun(lambda on_progress, cancel_event: agent.run(on_progress, cancel_event)).start()
+        olaylar = job.wait_for_events(0, timeout=0.5)
+    """
+
+    def __init__(self, target, name="arka-plan-isi"):
+        """
+        Args:
+            target: target(on_progress, cancel_event) şeklinde çağrılacak fonksiyon
+            name (str): İş parçacığının adı
+        """
+        self.cancel_event = threading.Event()
+        self.events = []  # Gelen ilerleme olayları (sırasıyla)
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._target = target
+        self._done = False
+        self._changed = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        """İşi başlatır ve kendisini döndürür."""
+        self.started_at = time.time()
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self.result = self._target(self._on_progress, self.cancel_event)
+        except Exception as e:
+            self.error = f"Hata: {e}"
+        finally:
+            with self._changed:
+                self.finished_at = time.time()
+                self._done = True
+                self._changed.notify_all()
+
+    def _on_progress(self, event):
+        with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    @property
+    def running(self):
+        """İş henüz bitmediyse True."""
+        return self.started_at is not None and not self._done
+
+    @property
+    def elapsed(self):
+        """Başlangıçtan bu yana (iş bittiyse bitişe kadar) geçen süre (saniye)."""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def cancel(self):
+        """İptal ister; iş bir sonraki adım/nesil başında durur."""
+        self.cancel_event.set()
+
+    def wait_for_events(self, seen, timeout=None):
+        """
+        İlk 'seen' olaydan sonra yeni olay gelene veya iş bitene kadar bekler.
+
+        Args:
+            seen (int): Okuyucunun daha önce aldığı olay sayısı
+            timeout (float): En fazla bekleme süresi (saniye, None: süresiz)
+
+        Returns:
+            list: Yeni olaylar (zaman aşımında veya iş bittiyse boş olabilir)
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.events) > seen or self._done, timeout)
+            return self.events[seen:]
+
+    def join(self, timeout=None):
+        """İş bitene kadar bekler; bittiyse True döner."""
+        self._thread.join(timeout)
+        return self._done
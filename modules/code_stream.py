@@ -0,0 +1,154 @@
+"""
+Akış (Streaming) Yanıt İzleme Modülü
+Bu modül, LLM yanıtını parça parça (chunk) gelirken izler ve iki durumda
+akışın geri kalanını beklemeden durdurulmasını sağlar:
+
+1. Erken bitiş: Kod bloğunu kapatan ``` satırı geldiğinde. LLM'in kodun
+   ardından yazdığı açıklamalar beklenmez.
+2. Erken iptal: Tamamlanmış üst seviye (top-level) ifadeler ayrıştırılamıyorsa
+   (ast.parse). Yanıtın geri kalanı ne olursa olsun kod çalışmayacaktır.
+
+Tamamlanmış ifade: Sütun 0'da başlayan yeni bir ifadeden önceki tüm satırlar.
+Henüz kapanmamış çok satırlı string/parantezler "eksik" sayılır, hata sayılmaz.
+Durdurulan metin, ai_generator'daki markdown temizleme adımına aynen verilir.
+"""
+
+import ast
+import time
+
+FENCE = "```"
+
+# Kod bloğu (```) olmadan gelen yanıtlarda, ilk satır bunlardan biriyle başlıyorsa metin kod kabul edilir
+CODE_LINE_PREFIXES = ("import ", "from ", "class ", "def ", "async def ", "@", "#", "if __name__")
+
+# Sütun 0'da olsa da yeni ifade başlatmayan satırlar (önceki bloğun devamı)
+CONTINUATION_PREFIXES = ("else", "elif", "except", "finally", "case ", ")", "]", "}", "#")
+
+# Ayrıştırma hatasının sebebi metnin henüz bitmemiş olmasıysa (hata değil, eksik)
+INCOMPLETE_MARKERS = ("unterminated", "was never closed", "unexpected EOF", "EOF while")
+
+
+class CodeStreamMonitor:
+    """
+    Akış halinde gelen LLM yanıtını biriktirir ve her parçadan sonra akışın
+    devam edip etmeyeceğine karar verir.
+
+    Durumlar (status):
+        "streaming": Akış sürüyor
+        "early_stop": Kapanış ``` satırı geldi; metin o satırda kesildi
+        "aborted": Tamamlanmış ifadelerde sözdizimi hatası bulundu (sebep: reason)
+        "finished": Akış kendiliğinden bitti
+    """
+
+    def __init__(self, syntax_check=True):
+        """
+        Args:
+            syntax_check (bool): True ise tamamlanmış ifadeler artımlı olarak ayrıştırılır
+        """
+        self.syntax_check = syntax_check
+        self.text = ""
+        self.status = "streaming"
+        self.reason = None
+        self.chunks = 0
+        self.first_chunk_at = None  # İlk parçanın geldiği an (time.perf_counter; ölçüm için)
+        self._verified_lines = 0  # Kod bölgesinde ayrıştırılıp doğrulanmış satır sayısı
+
+    def feed(self, chunk):
+        """
+        Yeni bir parçayı ekler.
+
+        Args:
+            chunk (str): Yanıt parçası
+
+        Returns:
+            bool: Akış devam etmeliyse True, durdurulmalıysa False
+        """
+        if self.status != "streaming":
+            return False
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time.perf_counter()
+        self.chunks += 1
+        self.text += chunk or ""
+
+        complete, _, _ = self.text.rpartition("\n")
+        lines = complete.split("\n") if complete else []
+        region = self._code_region(lines)
+        if region is None:
+            return True
+        start, end = region
+
+        if end is not None:
+            # Kapanış satırından sonrası atılır
+            self.text = "\n".join(lines[:end + 1]) + "\n"
+            self.status = "early_stop"
+            return False
+
+        if self.syntax_check and not self._check(lines[start:]):
+            return False
+        return True
+
+    def finish(self):
+        """
+        Akış kendiliğinden bittiğinde çağrılır. Tam metin zaten elde olduğundan
+        ek kontrol yapılmaz (hatalar ön kontrol/coverage aşamasında raporlanır).
+        """
+        if self.status == "streaming":
+            self.status = "finished"
+        return self.status
+
+    def _code_region(self, lines):
+        """
+        Tamamlanmış satırlar içinde kod bölgesini bulur.
+
+        Returns:
+            tuple: (başlangıç, kapanış_satırı veya None) veya kod bölgesi henüz belli değilse None
+        """
+        opening = None
+        for i, line in enumerate(lines):
+            if line.strip().startswith(FENCE):
+                if opening is None:
+                    opening = i
+                else:
+                    return opening + 1, i
+        if opening is not None:
+            return opening + 1, None
+
+        # Kod bloğu yok: İlk dolu satır koda benziyorsa tüm metin kod sayılır
+        first = next((line for line in lines if line.strip()), None)
+        if first is not None and first.startswith(CODE_LINE_PREFIXES):
+            return 0, None
+        return None
+
+    def _check(self, code_lines):
+        """
+        Kod satırlarının tamamlanmış kısmını (sütun 0'da yeni ifade başlatan
+        son satırdan öncesini) ayrıştırır.
+
+        Args:
+            code_lines (list): Kod bölgesinin tamamlanmış satırları
+
+        Returns:
+            bool: Hata yoksa (veya kontrol yapılamıyorsa) True
+        """
+        boundary = 0
+        for i in range(len(code_lines) - 1, 0, -1):
+            line, previous = code_lines[i], code_lines[i - 1].rstrip()
+            # Dekoratörden veya '\\' ile biten satırdan sonraki satır yeni ifade değildir
+            if previous.startswith("@") or previous.endswith("\\"):
+                continue
+            if line and not line[0].isspace() and not line.startswith(CONTINUATION_PREFIXES):
+                boundary = i
+                break
+        if boundary <= self._verified_lines:
+            return True
+
+        try:
+            ast.parse("\n".join(code_lines[:boundary]))
+        except SyntaxError as e:
+            if any(marker in (e.msg or "") for marker in INCOMPLETE_MARKERS):
+                return True  # Çok satırlı string/parantez henüz kapanmadı
+            self.status = "aborted"
+            self.reason = f"Yazım Hatası (Satır {e.lineno}): {e.msg}"
+            return False
+        self._verified_lines = boundary
+        return True
@@ -5,69 +5,613 @@ Bu modül, test kodlarının kaynak kodu ne kadar kapsadığını (coverage)
 
 Coverage analizi, hangi satırların test edildiğini ve hangilerinin
 test edilmediğini gösterir.
+
+İki çalışma modu (engine) vardır:
+- "worker": Önceden ısıtılmış, kalıcı worker süreçlerinden oluşan bir havuz
+  (fork-server) üzerinde coverage.Coverage API'si ile ölçüm yapar
+  (varsayılan, hızlı).
+- "cli": Her ölçümde 'coverage run' ve 'coverage json' komutlarını ayrı
+  süreçler olarak çalıştırır (eski yöntem). Testler yine de worker'daki
+  StructuredTestResult ile koşar; iki motor da test bazlı kayıtları ('tests') döndürür.
+
+Her iki modda da üretilen testlere duvar saati zaman aşımı, CPU süresi ve
+bellek sınırı uygulanır. Sınırı aşan ölçümler 'status' alanı "timeout" veya
+"oom" olan bir sonuçla döner; böylece sonsuz döngü içeren bir test tüm
+ajan/GA çalışmasını kilitlemez.
+
+per_test=True ile her test metodunun hangi satırları çalıştırdığı da ölçülür
+('test_coverage_map'); satır kümeleri kompakt bitset (hex) olarak taşınır,
+lines_to_bitset / bitset_to_lines ile dönüştürülür.
+
+incremental=True ile sadece yeni veya değişmiş test metotları çalıştırılır;
+değişmeyenlerin sonuçları incremental_coverage modülündeki önbellekten alınır.
+
+branch=True ile dal (branch) coverage da ölçülür ('branch_percent',
+'missed_arcs'). coverage_score satır ve dal yüzdelerini ağırlıklı tek bir
+puana çevirir; is_fully_covered ise ikisinin de %100 olup olmadığını söyler.
+Böylece satırlar %100 olsa bile denenmemiş yollar kaldıkça arama sürer.
+
+Worker motorunda satır verisi, Python 3.12+ sürümlerinde sys.monitoring
+(PEP 669) tabanlı hafif bir toplayıcıyla, eski sürümlerde coverage.py ile
+toplanır (bkz. coverage_worker.MonitoringCollector, COVERAGE_COLLECTOR).
+
+preflight=True ile test kodu önce statik olarak kontrol edilir (bkz. preflight
+modülü); bariz şekilde çalışamayacak adaylar süreç başlatılmadan 'status'
+alanı "rejected" olan bir sonuçla döner.
+
+evaluate_many, aynı kaynak kod için birden fazla test adayını (ör. GA'nın bir
+nesli) tek çağrıda ve worker havuzu üzerinde paralel olarak ölçer.
 """
 
 import subprocess
 import os
 import json
+import re
 import sys
 import shutil
+import atexit
+import copy
+import queue
+import signal
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.preflight import preflight_check
+from modules.result_cache import get_result_cache, make_cache_key
+
+# Varsayılan çalışma modu, ortam değişkeni ile değiştirilebilir
+DEFAULT_ENGINE = os.getenv("COVERAGE_ENGINE", "worker")
+
+# Geçici analiz klasörlerinin kök dizini (boşsa sistemin geçici dizini kullanılır)
+SANDBOX_ROOT = os.getenv("COVERAGE_SANDBOX_ROOT") or None
+
+# Havuzdaki en fazla worker sayısı ve bir worker'ın yenilenmeden önce yapacağı iş sayısı
+POOL_SIZE = int(os.getenv("COVERAGE_POOL_SIZE", "0")) or (os.cpu_count() or 1)
+MAX_JOBS_PER_WORKER = int(os.getenv("COVERAGE_WORKER_MAX_JOBS", "200"))
+
+# Üretilen testler için kaynak sınırları (ölçüm başına)
+DEFAULT_TIMEOUT = float(os.getenv("COVERAGE_TIMEOUT", "30"))              # Duvar saati (sn)
+DEFAULT_CPU_LIMIT = int(os.getenv("COVERAGE_CPU_LIMIT", "20"))            # CPU süresi (sn)
+DEFAULT_MEMORY_LIMIT_MB = int(os.getenv("COVERAGE_MEMORY_LIMIT_MB", "512"))  # Adres alanı (MB)
+
+# Satır verisi toplayıcısı: "auto" (3.12+ ise sys.monitoring) veya "coverage" (her zaman coverage.py)
+DEFAULT_COLLECTOR = os.getenv("COVERAGE_COLLECTOR", "auto")
+
+# Dal coverage ölçüldüğünde puanda dalların ağırlığı (0: sadece satır, 1: sadece dal)
+DEFAULT_BRANCH_WEIGHT = float(os.getenv("COVERAGE_BRANCH_WEIGHT", "0.5"))
+
+# Worker'ın kendi zaman aşımını uygulayamaması (ör. kilitlenme) durumuna karşı ek süre
+WORKER_TIMEOUT_GRACE = 5
+
+# Worker betiğinin tam yolu (ayrı süreç olarak çalıştırılır)
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "coverage_worker.py")
+
+# Test dışında (import, setUpClass vb.) çalışan satırların haritadaki anahtarı
+IMPORT_CONTEXT = "<import>"
+
+
+def lines_to_bitset(lines):
+    """
+    Satır numaralarını kompakt bir bitset'e (hex string) çevirir.
+    (coverage_worker.lines_to_bitset ile aynı formattadır.)
+
+    Args:
+        lines (iterable): Satır numaraları
+
+    Returns:
+        str: i. bit i. satırı temsil eden hex string (ör. "0x1a")
+    """
+    bits = 0
+    for line in lines:
+        bits |= 1 << line
+    return hex(bits)
+
+
+def coverage_score(result, branch_weight=None):
+    """
+    Coverage sonucunu tek bir puana (0-100) çevirir.
+
+    Sonuçta dal coverage'ı ('branch_percent') varsa satır ve dal yüzdelerinin
+    ağırlıklı ortalaması, yoksa sadece satır yüzdesi döner.
+
+    Args:
+        result (dict): run_coverage_analysis sonucu
+        branch_weight (float): Dalların ağırlığı (0-1). None ise DEFAULT_BRANCH_WEIGHT.
+
+    Returns:
+        float: Puan
+    """
+    line_percent = result.get('coverage_percent', 0)
+    branch_percent = result.get('branch_percent')
+    if branch_percent is None:
+        return line_percent
+    weight = DEFAULT_BRANCH_WEIGHT if branch_weight is None else branch_weight
+    return round((1 - weight) * line_percent + weight * branch_percent, 2)
+
+
+def is_fully_covered(result):
+    """
+    Tüm satırlar ve (ölçüldüyse) tüm dallar çalıştırıldı mı?
+
+    Args:
+        result (dict): run_coverage_analysis sonucu
+
+    Returns:
+        bool: Gerçek yol doygunluğuna ulaşıldıysa True
+    """
+    if not result or result.get('coverage_percent', 0) < 100:
+        return False
+    return result.get('branch_percent', 100) >= 100
+
+
+def bitset_to_lines(bitset):
+    """
+    lines_to_bitset ile üretilmiş bitset'i sıralı satır listesine çevirir.
+
+    Args:
+        bitset (str | int): Hex string veya tamsayı
+
+    Returns:
+        list: Sıralı satır numaraları
+    """
+    bits = int(bitset, 16) if isinstance(bitset, str) else int(bitset)
+    lines = []
+    line = 0
+    while bits:
+        if bits & 1:
+            lines.append(line)
+        bits >>= 1
+        line += 1
+    return lines
+
+
+class CoverageWorker:
+    """
+    Kalıcı coverage worker sürecini yöneten sınıf.
+
+    Süreç ilk işte başlatılır ve sonraki işlerde tekrar kullanılır. Böylece
+    her ölçümde yorumlayıcı açılışı ve coverage/unittest import maliyeti
+    ödenmez. Süreç beklenmedik şekilde ölürse bir sonraki işte yeniden
+    başlatılır. Worker belirlenen sürede cevap vermezse süreç grubuyla
+    birlikte öldürülür (fork olmayan sistemlerde zaman aşımı bu şekilde uygulanır).
+    """
+
+    def __init__(self):
+        self.process = None
+        self.jobs_done = 0  # Mevcut süreçte tamamlanan iş sayısı
+        self.lock = threading.Lock()  # Aynı anda tek iş (protokol satır bazlı)
+
+    def _start(self):
+        """Worker sürecini başlatır ve cevapları okuyan yardımcı thread'i açar."""
+        self.process = subprocess.Popen(
+            [sys.executable, "-u", WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            start_new_session=(os.name == "posix"),  # Kendi süreç grubu (toplu öldürme için)
+        )
+        self.jobs_done = 0
+
+        # Cevaplar ayrı bir thread'de okunur; böylece zaman aşımıyla beklenebilir
+        self.responses = queue.Queue()
+        threading.Thread(
+            target=self._read_responses, args=(self.process, self.responses), daemon=True
+        ).start()
+
+    @staticmethod
+    def _read_responses(process, responses):
+        """Worker çıktısını satır satır kuyruğa aktarır; süreç kapanınca boş satır ekler."""
+        try:
+            for line in process.stdout:
+                responses.put(line)
+        except (OSError, ValueError):
+            pass
+        responses.put("")
+
+    def run(self, job, timeout=None):
+        """
+        Bir işi worker'a gönderir ve cevabını bekler.
+
+        Args:
+            job (dict): Worker'a gönderilecek iş tanımı
+            timeout (float): Cevap için en fazla bekleme süresi (sn). Aşılırsa worker öldürülür.
+
+        Returns:
+            dict: {"result": ..., "error": ...} formatında worker cevabı
+        """
+        with self.lock:
+            if self.process is None or self.process.poll() is not None:
+                self._start()
+
+            self.jobs_done += 1
+            try:
+                self.process.stdin.write(json.dumps(job) + "\n")
+                self.process.stdin.flush()
+                line = self.responses.get(timeout=timeout)
+            except (BrokenPipeError, OSError):
+                line = ""
+            except queue.Empty:
+                # Worker cevap vermiyor: Süreç grubunu öldür, sonraki işte yenisi açılır
+                self._kill()
+                return {"result": _status_result("timeout"),
+                        "error": f"⏱️ Zaman Aşımı: Testler {timeout} saniye içinde tamamlanamadı."}
+
+            if not line:
+                # Worker öldü (ör. test kodu os._exit çağırdı); bir sonraki işte yenisi açılır
+                self._kill()
+                return {"result": None, "error": "⚠️ Coverage worker süreci beklenmedik şekilde sonlandı."}
+
+            return json.loads(line)
+
+    def _kill(self):
+        """Worker sürecini (POSIX'te tüm süreç grubuyla) zorla kapatır."""
+        if self.process is not None:
+            try:
+                if os.name == "posix":
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                else:
+                    self.process.kill()
+            except OSError:
+                pass
+            try:
+                self.process.wait()
+            except OSError:
+                pass
+            self.process = None
+
+    def close(self):
+        """Worker sürecini düzgünce kapatır."""
+        with self.lock:
+            if self.process is not None and self.process.poll() is None:
+                try:
+                    self.process.stdin.close()
+                    self.process.wait(timeout=5)
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+            self._kill()
+
+
+class CoverageWorkerPool:
+    """
+    Sınırlı sayıda CoverageWorker'dan oluşan havuz (fork-server havuzu).
+
+    - Havuz en fazla 'size' kadar worker süreci açar; daha fazla eşzamanlı
+      istek gelirse boşta worker çıkana kadar bekler.
+    - Worker'lar ilk kullanımda (veya warm_up ile önceden) başlatılır ve
+      açılışta coverage makinesini yükleyerek ısınır.
+    - Bir worker 'max_jobs_per_worker' iş yaptıktan sonra kapatılır ve bir
+      sonraki işte yenisi açılır (bellek şişmesine karşı geri dönüşüm).
+    """
+
+    def __init__(self, size=None, max_jobs_per_worker=None):
+        """
+        Args:
+            size (int): Havuzdaki worker sayısı (None ise POOL_SIZE)
+            max_jobs_per_worker (int): Bir worker'ın yenilenmeden yapacağı iş sayısı
+        """
+        self.size = size or POOL_SIZE
+        self.max_jobs_per_worker = max_jobs_per_worker or MAX_JOBS_PER_WORKER
+        self.workers = [CoverageWorker() for _ in range(self.size)]
+
+        # LIFO: En son kullanılan (sıcak) worker önce tekrar kullanılır
+        self.idle = queue.LifoQueue()
+        for worker in self.workers:
+            self.idle.put(worker)
+
+    def warm_up(self):
+        """Tüm worker süreçlerini önceden başlatır (ilk isteklerde bekleme olmasın)."""
+        for worker in self.workers:
+            with worker.lock:
+                if worker.process is None or worker.process.poll() is not None:
+                    worker._start()
+
+    def run(self, job, timeout=None):
+        """
+        Boştaki bir worker'ı alıp işi çalıştırır.
+
+        Args:
+            job (dict): Worker'a gönderilecek iş tanımı
+            timeout (float): Worker cevabı için en fazla bekleme süresi (sn)
+
+        Returns:
+            dict: {"result": ..., "error": ...} formatında worker cevabı
+        """
+        worker = self.idle.get()  # Boşta worker yoksa burada bekle
+        try:
+            return worker.run(job, timeout=timeout)
+        finally:
+            # Geri dönüşüm: Çok iş yapmış worker'ı kapat, sonraki işte yenisi açılır
+            if worker.jobs_done >= self.max_jobs_per_worker:
+                worker.close()
+            self.idle.put(worker)
+
+    def close(self):
+        """Havuzdaki tüm worker süreçlerini kapatır."""
+        for worker in self.workers:
+            worker.close()
+
+
+# Süreç genelinde paylaşılan worker havuzu (ilk kullanımda oluşturulur)
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool():
+    """
+    Süreç genelinde paylaşılan coverage worker havuzunu döndürür.
+
+    Returns:
+        CoverageWorkerPool: Paylaşılan havuz
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = CoverageWorkerPool()
+        return _pool
+
+
+def configure_worker_pool(size=None, max_jobs_per_worker=None):
+    """
+    Paylaşılan worker havuzunu yeni ayarlarla yeniden oluşturur.
+    Mevcut havuzdaki worker süreçleri kapatılır.
+
+    Args:
+        size (int): Havuzdaki worker sayısı
+        max_jobs_per_worker (int): Bir worker'ın yenilenmeden yapacağı iş sayısı
+
+    Returns:
+        CoverageWorkerPool: Yeni havuz
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = CoverageWorkerPool(size, max_jobs_per_worker)
+        return _pool
+
+
+@atexit.register
+def _close_worker_pool():
+    """Program kapanırken worker süreçlerini kapatır."""
+    if _pool is not None:
+        _pool.close()
+
 
-def run_coverage_analysis(source_code, test_code):
+def run_coverage_analysis(source_code, test_code, engine=None, sandbox_root=None, use_cache=True,
+                          timeout=None, cpu_limit=None, memory_limit_mb=None, per_test=False,
+                          test_filter=None, incremental=False, branch=False, collector=None, preflight=False):
     """
     Test kodunun kaynak kodu ne kadar kapsadığını (coverage) ölçer.
-    
+
     Bu fonksiyon şu adımları takip eder:
-    1. Geçici dosyalar klasörünü temizler ve oluşturur
+    0. Aynı kod çifti daha önce ölçüldüyse sonucu önbellekten döndürür
+    1. Bu çağrıya özel, benzersiz bir geçici klasör oluşturur
     2. Kaynak kodu app.py, test kodunu test_app.py olarak kaydeder
-    3. Coverage.py aracı ile testleri çalıştırır
-    4. Coverage raporunu JSON formatında oluşturur
-    5. Raporu analiz ederek coverage yüzdesini ve test edilmeyen satırları bulur
-    
+    3. Seçilen motor (engine) ile testleri çalıştırır
+    4. Coverage verisini analiz ederek coverage yüzdesini ve test edilmeyen satırları bulur
+    5. Geçici klasörü siler
+
     Args:
         source_code (str): Test edilecek kaynak kod
         test_code (str): Test kodu (unittest formatında)
-        
+        engine (str): "worker" (varsayılan) veya "cli". None ise DEFAULT_ENGINE kullanılır.
+        sandbox_root (str): Geçici klasörlerin açılacağı kök dizin (ör. tmpfs için /dev/shm).
+            None ise SANDBOX_ROOT, o da yoksa sistemin geçici dizini kullanılır.
+        use_cache (bool): True ise sonuç önbelleği (result_cache) kullanılır.
+        timeout (float): Duvar saati zaman aşımı (sn). None ise DEFAULT_TIMEOUT.
+        cpu_limit (int): CPU süresi sınırı (sn, sadece POSIX). None ise DEFAULT_CPU_LIMIT.
+        memory_limit_mb (int): Bellek sınırı (MB, sadece POSIX). None ise DEFAULT_MEMORY_LIMIT_MB.
+        per_test (bool): True ise her testin çalıştırdığı satırlar da ölçülür
+            ('test_coverage_map': {test_id: bitset}, 'statements': bitset).
+        test_filter (list): Sadece bu testleri çalıştır (ör. ["test_app.Sinif.test_x"]).
+        incremental (bool): True ise sadece yeni/değişmiş test metotları çalıştırılır,
+            diğerlerinin sonuçları önceki ölçümlerden birleştirilir
+            (bkz. incremental_coverage.IncrementalCoverageEvaluator).
+            Dal coverage'ı test bazlı birleştirilemediği için branch=True iken tüm paket çalışır.
+        branch (bool): True ise dal coverage'ı da ölçülür
+            ('branch_percent', 'total_branches', 'missed_arcs').
+        collector (str): Worker motorunda satır verisi toplayıcısı: "auto" (sys.monitoring
+            varsa onu kullanır) veya "coverage". None ise DEFAULT_COLLECTOR.
+        preflight (bool): True ise test kodu çalıştırılmadan önce statik olarak kontrol edilir;
+            reddedilen kod için 'status' "rejected" ve 'reason' alanları dolu sonuç döner.
+
     Returns:
         tuple: (sonuç_sözlüğü, hata_mesajı)
             - sonuç_sözlüğü: coverage_percent, missed_lines, success gibi bilgiler içerir
+              ('cached' anahtarı, sonucun önbellekten gelip gelmediğini gösterir;
+              'status' anahtarı "ok", "timeout", "oom" veya (preflight ile) "rejected" olabilir;
+              'tests' listesi her testin sonucunu, süresini ve hata bilgisini içerir)
             - hata_mesajı: Hata varsa mesaj, yoksa None
     """
-    # --- 1. KLASÖR TEMİZLİĞİ VE HAZIRLIĞI ---
-    # Eski geçici dosyaları temizle (önceki analizlerden kalan)
-    if os.path.exists("temp_files"):
-        try:
-            shutil.rmtree("temp_files")  # Klasörü içindekilerle birlikte sil
-        except Exception:
-            pass  # Silinemezse (dosya açıksa) devam et, hata verme
-            
-    # Geçici dosyalar klasörünü oluştur
-    if not os.path.exists("temp_files"):
-        os.makedirs("temp_files")
-
-    # Mutlak yol al (platform bağımsız çalışma için)
-    base_dir = os.path.abspath("temp_files")
-    
+    limits = _build_limits(timeout, cpu_limit, memory_limit_mb, per_test, test_filter, branch, collector)
+    return _analyze(source_code, test_code, engine, sandbox_root, use_cache, incremental, limits,
+                    preflight=preflight)
+
+
+def evaluate_many(source_code, test_codes, engine=None, sandbox_root=None, use_cache=True,
+                  timeout=None, cpu_limit=None, memory_limit_mb=None, branch=False,
+                  incremental=False, max_parallel=None, preflight=False):
+    """
+    Aynı kaynak kod için birden fazla test kodunu tek çağrıda ölçer.
+
+    Kaynak kod diske bir kez yazılır (adayların klasörlerine bağlanır),
+    birebir aynı adaylar bir kez ölçülür ve adaylar worker havuzu üzerinde
+    paralel çalıştırılır. Böylece bir neslin tamamı, yaklaşık olarak en yavaş
+    adayın süresinde değerlendirilir.
+
+    Args:
+        source_code (str): Test edilecek kaynak kod
+        test_codes (list): Test kodları (unittest formatında)
+        max_parallel (int): Aynı anda ölçülecek en fazla aday sayısı
+            (None ise worker havuzunun büyüklüğü)
+        Diğer argümanlar: run_coverage_analysis ile aynıdır.
+
+    Returns:
+        list: Girdi sırasıyla (sonuç_sözlüğü, hata_mesajı) çiftleri. Sonuç sözlüğü
+            her zaman vardır; 'status' alanı "ok", "timeout", "oom", "rejected"
+            (ön kontrolden geçemedi) veya (sistem/başlatma hatalarında) "error" olur.
+    """
+    test_codes = list(test_codes)
+    if not test_codes:
+        return []
+
+    limits = _build_limits(timeout, cpu_limit, memory_limit_mb, branch=branch)
+    unique = list(OrderedDict.fromkeys(test_codes))  # Aynı adaylar bir kez ölçülsün
+
+    # --- KAYNAK KODU BİR KEZ HAZIRLA ---
+    root = sandbox_root or SANDBOX_ROOT
+    if root:
+        os.makedirs(root, exist_ok=True)
+    batch_dir = os.path.realpath(tempfile.mkdtemp(prefix="batch_", dir=root))
+    shared_source = os.path.join(batch_dir, "app.py")
+
+    def measure(test_code):
+        result, error = _analyze(source_code, test_code, engine, batch_dir, use_cache, incremental,
+                                 limits, shared_source=shared_source, preflight=preflight)
+        if result is None:
+            result = _status_result("error")
+            result["cached"] = False
+        return result, error
+
+    try:
+        with open(shared_source, "w", encoding="utf-8") as f:
+            f.write(source_code)
+
+        if max_parallel is None:
+            max_parallel = get_worker_pool().size if (engine or DEFAULT_ENGINE) != "cli" else (os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(unique)))) as executor:
+            measured = dict(zip(unique, executor.map(measure, unique)))
+    finally:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+
+    # Girdi sırasıyla döndür (tekrarlanan adaylar kendi kopyalarını alır)
+    return [copy.deepcopy(measured[test_code]) for test_code in test_codes]
+
+
+def _build_limits(timeout=None, cpu_limit=None, memory_limit_mb=None, per_test=False, test_filter=None, branch=False,
+                  collector=None):
+    """Ölçüm ayarlarını (sınırlar ve modlar) worker'a gönderilecek sözlüğe çevirir."""
+    return {
+        "timeout": timeout or DEFAULT_TIMEOUT,
+        "cpu_limit": cpu_limit or DEFAULT_CPU_LIMIT,
+        "memory_limit_mb": memory_limit_mb or DEFAULT_MEMORY_LIMIT_MB,
+        "per_test": bool(per_test),
+        "test_filter": list(test_filter) if test_filter else None,
+        "branch": bool(branch),
+        "collector": collector or DEFAULT_COLLECTOR,
+    }
+
+
+def _analyze(source_code, test_code, engine, sandbox_root, use_cache, incremental, limits, shared_source=None,
+             preflight=False):
+    """
+    Ön kontrolü yapar, önbelleğe bakar, gerekirse ölçümü (artımlı veya tam) yapar
+    ve sonucu önbelleğe yazar.
+
+    Args:
+        limits (dict): _build_limits ile üretilmiş ayarlar
+        shared_source (str): Önceden yazılmış app.py yolu (evaluate_many için)
+        preflight (bool): True ise önce statik ön kontrol yapılır
+
+    Returns:
+        tuple: (sonuç_sözlüğü, hata_mesajı)
+    """
+    per_test, test_filter, branch = limits["per_test"], limits["test_filter"], limits["branch"]
+
+    # --- ÖN KONTROL: Çalışamayacağı belli olan kod için süreç başlatma ---
+    if preflight:
+        passed, reason = preflight_check(source_code, test_code)
+        if not passed:
+            result = _status_result("rejected")
+            result["reason"] = reason
+            result["cached"] = False
+            return result, f"🚫 Ön Kontrol Reddi: {reason}"
+
+    # --- 0. ÖNBELLEK KONTROLÜ ---
+    cache = get_result_cache() if use_cache else None
+    if cache is not None:
+        options = {}
+        if per_test:
+            options["per_test"] = True
+        if test_filter:
+            options["test_filter"] = sorted(test_filter)
+        if branch:
+            options["branch"] = True
+        cache_key = make_cache_key(source_code, test_code, options or None)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            cached["cached"] = True
+            return cached, None
+
+    if incremental and not test_filter and not branch:
+        # Döngüsel import olmasın diye burada yükleniyor (evaluator bu fonksiyonu çağırır)
+        from modules.incremental_coverage import get_incremental_evaluator
+        result, error = get_incremental_evaluator().evaluate(
+            source_code, test_code, engine=engine, sandbox_root=sandbox_root,
+            timeout=limits["timeout"], cpu_limit=limits["cpu_limit"],
+            memory_limit_mb=limits["memory_limit_mb"], collector=limits["collector"])
+    else:
+        result, error = _run_in_sandbox(source_code, test_code, engine, sandbox_root, limits, shared_source)
+
+    # Sadece tamamlanmış ölçümleri sakla (sistem hataları ve zaman aşımları geçici olabilir)
+    if result is not None:
+        result["cached"] = False
+        if cache is not None and result.get("status") == "ok":
+            cache.put(cache_key, result)
+
+    return result, error
+
+
+def _run_in_sandbox(source_code, test_code, engine, sandbox_root, limits, shared_source=None):
+    """
+    Kaynak ve test kodunu izole bir klasöre yazar ve seçilen motorla ölçer.
+
+    Args:
+        limits (dict): timeout, cpu_limit, memory_limit_mb, per_test, test_filter ve branch değerleri
+        shared_source (str): Verilirse app.py yeniden yazılmaz, bu dosyaya bağlanır (hard link)
+
+    Returns:
+        tuple: (sonuç_sözlüğü, hata_mesajı)
+    """
+    engine = engine or DEFAULT_ENGINE
+
+    # --- 1. İZOLE KLASÖR (SANDBOX) HAZIRLIĞI ---
+    # Her çağrı kendi benzersiz klasörünü kullanır; böylece aynı anda çalışan
+    # analizler (thread veya süreç) birbirlerinin dosyalarını ezmez.
+    root = sandbox_root or SANDBOX_ROOT
+    if root:
+        os.makedirs(root, exist_ok=True)
+    base_dir = os.path.realpath(tempfile.mkdtemp(prefix="cov_", dir=root))
+
     # Standart isimlendirme: Python modül sistemi ile uyumlu
     source_filename = "app.py"
     test_filename = "test_app.py"
-    
+
     # Dosya yollarını oluştur
     source_path = os.path.join(base_dir, source_filename)
     test_path = os.path.join(base_dir, test_filename)
-    json_path = os.path.join(base_dir, "coverage.json")
-    
+
     try:
         # --- 2. DOSYALARI YAZMA ---
-        # Kaynak kodu app.py olarak kaydet
-        with open(source_path, "w", encoding="utf-8") as f:
-            f.write(source_code)
-            
+        # Kaynak kodu app.py olarak kaydet (toplu ölçümde hazır dosyaya bağla)
+        if shared_source:
+            try:
+                os.link(shared_source, source_path)
+            except OSError:
+                shutil.copyfile(shared_source, source_path)  # Hard link desteklenmiyorsa kopyala
+        else:
+            with open(source_path, "w", encoding="utf-8") as f:
+                f.write(source_code)
+
         # Test kodunu hazırla ve kaydet
         # Import işlemini garanti altına al: 'from app import *'
         # Bu satır, test dosyasının app.py modülünü görmesini sağlar
         import_line = "from app import *"
-        
+
         # Eğer test kodunda zaten import yoksa, başına ekle
         if "from app import" not in test_code and "import app" not in test_code:
             final_test_code = f"{import_line}\n{test_code}"
@@ -78,77 +622,225 @@ def run_coverage_analysis(source_code, test_code):
         with open(test_path, "w", encoding="utf-8") as f:
             f.write(final_test_code)
 
-        # --- 3. COVERAGE KOMUTU HAZIRLIĞI ---
-        # Yöntem: 'python -m coverage run -m unittest test_app'
-        # Dosya yolu yerine modül ismi kullanmak (test_app) import hatalarını engeller.
-        # --source=app: Sadece app.py dosyasının coverage'ını ölç (test kodunu değil)
-        run_command = [
-            sys.executable, "-m", "coverage", "run",
-            "--source=app",  # Sadece app.py dosyasını takip et
-            "-m", "unittest",
-            "test_app"       # test_app.py modülünü çalıştır
-        ]
-        
-        # --- 4. TESTLERİ ÇALIŞTIR ---
-        # cwd=base_dir: İşlemi temp_files klasörünün içinde yap
-        # Bu sayede Python modül sistemi app.py ve test_app.py'yi bulabilir
-        process = subprocess.run(
-            run_command,
-            capture_output=True,  # Çıktıları yakala (stdout ve stderr)
-            text=True,            # Çıktıyı string olarak al
-            cwd=base_dir  
-        )
-        
-        # --- 5. COVERAGE RAPORUNU JSON OLARAK ÇIKAR ---
-        # Coverage çalıştıysa veritabanı (.coverage) oluşmuştur
-        # Şimdi bu veritabanını JSON formatına çevir
-        json_command = [sys.executable, "-m", "coverage", "json", "-o", "coverage.json"]
-        subprocess.run(json_command, capture_output=True, text=True, cwd=base_dir)
-
-        # --- 6. SONUÇLARI ANALİZ ET ---
-        # JSON raporu var mı kontrol et
-        if not os.path.exists(json_path):
-            # Rapor dosyası yoksa, test hiç çalışamamış demektir
-            # Hatayı kullanıcıya ham haliyle göster (debug için)
-            return None, f"⚠️ Testler Başlatılamadı!\n\nPython Hata Çıktısı:\n{process.stderr}\n\nStandart Çıktı:\n{process.stdout}"
-
-        # JSON raporunu oku
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        # Raporun içinde app.py dosyasını bul
-        # Coverage.py, dosya yollarını tam yol olarak kaydeder
-        target_key = None
-        for key in data["files"].keys():
-            if "app.py" in key:
-                target_key = key
-                break
-        
-        # app.py bulunamazsa hata döndür
-        if not target_key:
-            return None, "Rapor oluştu ama kaynak kod (app.py) içinde bulunamadı."
-
-        # app.py'nin coverage verilerini al
-        file_data = data["files"][target_key]
-        summary = file_data["summary"]  # Özet istatistikler
-        
-        # Test başarılı mı kontrol et
-        # Unittest çıktısında "OK" varsa tüm testler geçmiş demektir
-        is_success = "OK" in process.stderr or "OK" in process.stdout
-        
-        # Sonuç sözlüğünü oluştur
-        output = {
-            "total_tests": "Otomatik",  # Unittest otomatik sayar
-            "failures": 0,              # Başarısız test sayısı (şimdilik 0)
-            "errors": 0,                # Hata sayısı (şimdilik 0)
-            "coverage_percent": round(summary["percent_covered"], 2),  # Coverage yüzdesi
-            "missed_lines": file_data["missing_lines"],  # Test edilmeyen satır numaraları
-            "success": is_success  # Testler başarılı mı?
-        }
-        
-        return output, None
+        # --- 3. TESTLERİ SEÇİLEN MOTORLA ÇALIŞTIR ---
+        if engine == "cli":
+            return _run_with_cli(base_dir, limits)
+
+        job = dict(limits, work_dir=base_dir)
+        response = get_worker_pool().run(job, timeout=limits["timeout"] + WORKER_TIMEOUT_GRACE)
+        return response["result"], response["error"]
 
     except Exception as e:
         # Beklenmeyen hataları yakala ve detaylı hata mesajı döndür
         import traceback
-        return None, f"Sistem Hatası: {str(e)}\n{traceback.format_exc()}"
\ No newline at end of file
+        return None, f"Sistem Hatası: {str(e)}\n{traceback.format_exc()}"
+
+    finally:
+        # Analiz bitince klasörü (içindekilerle birlikte) sil
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def _status_result(status):
+    """
+    Ölçüm yapılamayan durumlar (zaman aşımı, bellek aşımı, ön kontrol reddi, sistem hatası)
+    için sonuç sözlüğü üretir.
+    (coverage_worker.status_result ile aynı formattadır.)
+    """
+    return {
+        "total_tests": 0,
+        "failures": 0,
+        "errors": 0,
+        "coverage_percent": 0,
+        "missed_lines": [],
+        "success": False,
+        "status": status,
+        "tests": [],
+    }
+
+
+def _resource_limiter(limits):
+    """
+    Alt süreç başlamadan önce CPU ve bellek sınırlarını uygulayan fonksiyonu döndürür
+    (subprocess 'preexec_fn' için). POSIX dışı sistemlerde None döner.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    def apply_limits():
+        cpu = int(limits["cpu_limit"])
+        memory = int(limits["memory_limit_mb"]) * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+            resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+        except (ValueError, OSError):
+            pass
+
+    return apply_limits
+
+
+def _run_with_cli(base_dir, limits):
+    """
+    Eski yöntem: Testleri 'coverage run' komutu ile ayrı bir süreçte çalıştırır,
+    ardından 'coverage json' ile raporu diske yazıp geri okur. Test sayıları ve
+    test kayıtları, süreçte çalışan coverage_worker.run_tests_cli'nin yazdığı
+    JSON dosyasından alınır.
+
+    Args:
+        base_dir (str): app.py ve test_app.py dosyalarının bulunduğu klasör
+        limits (dict): timeout, cpu_limit, memory_limit_mb, per_test, test_filter ve branch değerleri
+
+    Returns:
+        tuple: (sonuç_sözlüğü, hata_mesajı)
+    """
+    json_path = os.path.join(base_dir, "coverage.json")
+    tests_path = os.path.join(base_dir, "test_results.json")
+
+    # --- COVERAGE KOMUTU HAZIRLIĞI ---
+    # Yöntem: 'python -m coverage run coverage_worker.py --run-tests test_results.json test_app'
+    # Testler worker motoruyla aynı StructuredTestResult ile çalışır ve sonuçlar dosyaya yazılır.
+    # Dosya yolu yerine modül ismi kullanmak (test_app) import hatalarını engeller.
+    # --source=app: Sadece app.py dosyasının coverage'ını ölç (test kodunu değil)
+    run_command = [
+        sys.executable, "-m", "coverage", "run",
+        "--source=app",  # Sadece app.py dosyasını takip et
+        *(["--branch"] if limits.get("branch") else []),  # Dal coverage'ı
+        WORKER_SCRIPT, "--run-tests", tests_path,
+    ]
+    # test_app.py modülünü (veya sadece istenen testleri) çalıştır
+    run_command.extend(limits.get("test_filter") or ["test_app"])
+
+    # Test bazlı ölçüm: coverage.py her test fonksiyonunu ayrı bağlamda (context) kaydeder
+    if limits.get("per_test"):
+        with open(os.path.join(base_dir, ".coveragerc"), "w", encoding="utf-8") as f:
+            f.write("[run]\ndynamic_context = test_function\n")
+
+    # --- TESTLERİ ÇALIŞTIR ---
+    # cwd=base_dir: İşlemi analiz klasörünün içinde yap
+    # Bu sayede Python modül sistemi app.py ve test_app.py'yi bulabilir
+    # start_new_session: Zaman aşımında testlerin açtığı süreçlerle birlikte öldürülebilsin
+    process = subprocess.Popen(
+        run_command,
+        stdout=subprocess.PIPE,  # Çıktıları yakala (stdout ve stderr)
+        stderr=subprocess.PIPE,
+        stdin=subprocess.DEVNULL,  # input() çağrıları beklemesin
+        text=True,               # Çıktıyı string olarak al
+        cwd=base_dir,
+        start_new_session=(os.name == "posix"),
+        preexec_fn=_resource_limiter(limits),
+    )
+    try:
+        stdout, stderr = process.communicate(timeout=limits["timeout"])
+    except subprocess.TimeoutExpired:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+        process.communicate()
+        return _status_result("timeout"), f"⏱️ Zaman Aşımı: Testler {limits['timeout']} saniye içinde tamamlanamadı."
+
+    # CPU süresi sınırı aşıldıysa süreç SIGXCPU/SIGKILL ile sonlanmıştır
+    cpu_limit_codes = [-getattr(signal, ad) for ad in ("SIGXCPU", "SIGKILL") if hasattr(signal, ad)]
+    if process.returncode in cpu_limit_codes:
+        return _status_result("timeout"), f"⏱️ Zaman Aşımı: Testler {limits['cpu_limit']} saniyelik CPU sınırını aştı."
+
+    # Test sayıları ve kayıtları (süreç sonuç yazamadan öldüyse dosya yoktur)
+    tests_summary = None
+    if os.path.exists(tests_path):
+        with open(tests_path, "r", encoding="utf-8") as f:
+            tests_summary = json.load(f)
+
+    # Bellek sınırı: Test modülü MemoryError ile yüklenemedi veya süreç sonuç yazamadan bellekten düştü.
+    # Bir testin içindeki MemoryError sadece o testin hata kaydıdır.
+    if tests_summary is not None:
+        out_of_memory = tests_summary["total_tests"] == 0 and any(
+            t["exception_type"] == "MemoryError" for t in tests_summary["tests"])
+    else:
+        out_of_memory = "MemoryError" in stderr
+    if out_of_memory:
+        return _status_result("oom"), f"💥 Bellek Aşımı: Testler {limits['memory_limit_mb']} MB bellek sınırını aştı."
+
+    # --- COVERAGE RAPORUNU JSON OLARAK ÇIKAR ---
+    # Coverage çalıştıysa veritabanı (.coverage) oluşmuştur
+    # Şimdi bu veritabanını JSON formatına çevir
+    json_command = [sys.executable, "-m", "coverage", "json", "-o", "coverage.json"]
+    if limits.get("per_test"):
+        json_command.append("--show-contexts")
+    subprocess.run(json_command, capture_output=True, text=True, cwd=base_dir)
+
+    # --- SONUÇLARI ANALİZ ET ---
+    # JSON raporu var mı kontrol et
+    if not os.path.exists(json_path):
+        # Rapor dosyası yoksa, test hiç çalışamamış demektir
+        # Hatayı kullanıcıya ham haliyle göster (debug için)
+        return None, f"⚠️ Testler Başlatılamadı!\n\nPython Hata Çıktısı:\n{stderr}\n\nStandart Çıktı:\n{stdout}"
+
+    # JSON raporunu oku
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    # Raporun içinde app.py dosyasını bul
+    # Coverage.py, dosya yollarını tam yol olarak kaydeder
+    target_key = None
+    for key in data["files"].keys():
+        if "app.py" in key:
+            target_key = key
+            break
+
+    # app.py bulunamazsa hata döndür
+    if not target_key:
+        return None, "Rapor oluştu ama kaynak kod (app.py) içinde bulunamadı."
+
+    # app.py'nin coverage verilerini al
+    file_data = data["files"][target_key]
+    summary = file_data["summary"]  # Özet istatistikler
+
+    # Test sonuçları: Sayılar, başarı ve test bazlı kayıtlar (worker motoruyla aynı alanlar)
+    if tests_summary is None:
+        # Süreç sonuç dosyası yazamadan kapandı: Sayıları unittest özet satırlarından oku
+        # ("Ran 3 tests" ve "FAILED (failures=1, errors=2)"); test kaydı yoktur
+        ran = re.search(r"Ran (\d+) tests?", stderr)
+        failures = re.search(r"failures=(\d+)", stderr)
+        errors = re.search(r"errors=(\d+)", stderr)
+        tests_summary = {
+            "total_tests": int(ran.group(1)) if ran else 0,
+            "failures": int(failures.group(1)) if failures else 0,
+            "errors": int(errors.group(1)) if errors else 0,
+            "tests": [],
+        }
+        # Sadece sayılara güvenilir; çıktıda geçen "OK" metni başarı sayılmaz
+        tests_summary["success"] = bool(ran) and process.returncode == 0 and not (
+            tests_summary["failures"] or tests_summary["errors"])
+
+    # Sonuç sözlüğünü oluştur
+    output = {
+        "total_tests": tests_summary["total_tests"],  # Çalışan test sayısı
+        "failures": tests_summary["failures"],        # Başarısız test sayısı
+        "errors": tests_summary["errors"],            # Hata sayısı
+        # Satır coverage yüzdesi (branch modunda percent_covered dalları da içerdiği için ayrıca hesaplanır)
+        "coverage_percent": round(summary["covered_lines"] / summary["num_statements"] * 100, 2) if summary["num_statements"] else 100.0,
+        "missed_lines": file_data["missing_lines"],  # Test edilmeyen satır numaraları
+        "success": tests_summary["success"],  # Testler başarılı mı?
+        "status": "ok",
+        "tests": tests_summary["tests"],  # Test bazlı sonuçlar (StructuredTestResult kayıtları)
+    }
+
+    # Dal coverage'ı: Toplam dal sayısı ve çalıştırılmamış dallar
+    if limits.get("branch"):
+        total_branches = summary.get("num_branches", 0)
+        output["total_branches"] = total_branches
+        output["branch_percent"] = round(summary.get("covered_branches", 0) / total_branches * 100, 2) if total_branches else 100.0
+        output["missed_arcs"] = sorted(file_data.get("missing_branches", []))
+
+    # Test bazlı harita: {satır: [bağlamlar]} -> {bağlam: bitset}
+    if limits.get("per_test"):
+        per_context = {}
+        for line, contexts in file_data.get("contexts", {}).items():
+            for context in contexts:
+                per_context.setdefault(context or IMPORT_CONTEXT, set()).add(int(line))
+        statements = file_data["executed_lines"] + file_data["missing_lines"]
+        output["statements"] = lines_to_bitset(statements)
+        output["test_coverage_map"] = {ctx: lines_to_bitset(lines) for ctx, lines in per_context.items()}
+
+    return output, None
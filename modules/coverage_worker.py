@@ -0,0 +1,668 @@
+"""
+Coverage Çalıştırıcı (Worker) Modülü
+Bu dosya, coverage_tool.py tarafından ayrı bir Python süreci olarak başlatılır
+ve kapanmadan birçok coverage ölçümü yapar.
+
+Her ölçüm için yeni bir yorumlayıcı başlatmak (ve coverage/unittest
+kütüphanelerini baştan import etmek) yerine, süreç bir kere açılır ve
+işleri standart girişten satır satır JSON olarak alır. Ölçüm, coverage.py'nin
+Python API'si (coverage.Coverage) ile süreç içinde yapılır ve satır verisi
+doğrudan CoverageData'dan okunur; diske JSON rapor yazılmaz.
+
+Fork-server çalışma şekli: Worker açılışta coverage ve unittest
+makinesini bir kere yükler (ısınma). Fork destekleyen sistemlerde her iş
+için ısınmış süreçten yeni bir çocuk süreç (fork) oluşturulur; testler
+çocukta çalışır ve çocuk iş bitince kapanır. Böylece her ölçüm temiz bir
+süreçte, fakat yorumlayıcı açılış maliyeti olmadan yapılır. Fork olmayan
+sistemlerde (Windows) iş, worker sürecinin içinde çalıştırılır.
+
+Kaynak sınırları: Fork edilen her çocuk süreç için duvar saati (wall-clock)
+zaman aşımı, CPU süresi (RLIMIT_CPU) ve bellek (RLIMIT_AS) sınırları
+uygulanır. Sınırı aşan çocuk, süreç grubuyla birlikte öldürülür ve sonuç
+'timeout' veya 'oom' durumuyla döner. Bir testin içinde yakalanan MemoryError
+ise tüm ölçümü düşürmez; sadece o testin hatası (exception_type: MemoryError)
+olarak kaydedilir.
+
+Protokol:
+    Girdi : {"work_dir": "...", "timeout": 30, "cpu_limit": 20, "memory_limit_mb": 512}
+    Çıktı : {"result": {...} | null, "error": "..." | null}
+
+Sonuç sözlüğündeki 'status' alanı: "ok", "timeout" (zaman/CPU aşımı), "oom" (bellek aşımı)
+Sonuç sözlüğündeki 'tests' alanı: Her test metodu için sonuç, süre ve (varsa)
+hata tipi/mesajı/traceback bilgisini içeren liste (StructuredTestResult).
+
+Test bazlı coverage ("per_test": true): Her test metodu başlarken coverage.py
+dinamik bağlamı (context) test adına çevrilir. Sonuçta 'test_coverage_map'
+alanı, her testin çalıştırdığı satırları bitset (hex) olarak içerir. Import
+sırasında çalışan satırlar "<import>" anahtarı altındadır.
+
+Dal (branch) coverage ("branch": true): Satırlara ek olarak if/for/while gibi
+karar noktalarının her iki yönünün de çalışıp çalışmadığı ölçülür. Sonuçta
+'branch_percent', 'total_branches' ve 'missed_arcs' ([kaynak_satır, hedef_satır]
+listesi; hedef negatifse fonksiyondan çıkış) alanları bulunur.
+
+CLI motoru: coverage_tool'un "cli" motoru bu dosyayı 'coverage run' altında
+"--run-tests <sonuç.json> [test adları]" argümanlarıyla çalıştırır (run_tests_cli).
+Testler aynı StructuredTestResult ile koşar; sayılar ve test kayıtları JSON
+dosyasına yazılır, böylece iki motor da aynı 'tests' listesini döndürür.
+
+Veri toplayıcı (collector): Python 3.12+ sürümlerinde satır verisi varsayılan
+olarak sys.monitoring (PEP 669) tabanlı MonitoringCollector ile toplanır. Her
+satır olayı ilk tetiklendiğinde kapatılır (DISABLE); döngü içindeki satırlar
+sadece bir kez ücret öder. Eski sürümlerde, branch modunda veya
+"collector": "coverage" istendiğinde coverage.py kullanılır. Sonuçtaki
+'collector' alanı hangisinin kullanıldığını gösterir.
+"""
+
+import importlib
+import io
+import json
+import os
+import select
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import traceback
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+
+import coverage
+from coverage.misc import join_regex
+from coverage.python import PythonParser
+
+# Çalıştırılan test modüllerinin isimleri (coverage_tool.py ile aynı olmalı)
+SOURCE_MODULE = "app"
+TEST_MODULE = "test_app"
+
+# Test dışı (import, setUpClass vb.) çalışan satırların bağlam adı
+IMPORT_CONTEXT = "<import>"
+
+# sys.monitoring (PEP 669) sadece Python 3.12+ sürümlerinde vardır
+MONITORING_AVAILABLE = hasattr(sys, "monitoring")
+
+# Her iş için çocuk süreç oluşturulabiliyor mu? (Windows'ta os.fork yoktur)
+FORK_AVAILABLE = hasattr(os, "fork")
+
+try:
+    import resource  # Sadece POSIX sistemlerde vardır
+except ImportError:
+    resource = None
+
+
+class StructuredTestResult(unittest.TextTestResult):
+    """
+    Her testin sonucunu makine tarafından okunabilir şekilde kaydeden TestResult.
+
+    Normal unittest metin çıktısı aynen üretilir; ek olarak her test için
+    şu bilgiler 'records' listesinde tutulur:
+        id, outcome (passed/failed/error/skipped/expected_failure/unexpected_success),
+        duration (sn), exception_type, message, traceback
+    """
+
+    # Test bazlı coverage için run_job tarafından atanır (coverage.Coverage nesnesi)
+    coverage = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.records = []
+        self._started_at = None
+        self._current = None
+
+    def startTest(self, test):
+        super().startTest(test)
+        if self.coverage is not None:
+            self.coverage.switch_context(test.id())  # Bu testin satırları ayrı kaydedilsin
+        self._current = {"id": test.id(), "outcome": "passed", "duration": 0.0,
+                         "exception_type": None, "message": None, "traceback": None}
+        self._started_at = time.perf_counter()
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        if self.coverage is not None:
+            self.coverage.switch_context("")  # Testler arası kod (tearDownClass vb.) ortak bağlamda
+        if self._current is not None:
+            self._current["duration"] = round(time.perf_counter() - self._started_at, 6)
+            self.records.append(self._current)
+            self._current = None
+
+    def _record(self, test, outcome, err=None, reason=None):
+        """Mevcut testin (veya setUpClass gibi test dışı hataların) sonucunu işler."""
+        record = self._current
+        if record is None or record["id"] != test.id():
+            # Sınıf/modül seviyesindeki hatalar (ör. import hatası) startTest'ten geçmez
+            record = {"id": test.id(), "outcome": outcome, "duration": 0.0,
+                      "exception_type": None, "message": None, "traceback": None}
+            self.records.append(record)
+        record["outcome"] = outcome
+        if err is not None:
+            exc_type, exc_value, _ = err
+            record["exception_type"] = exc_type.__name__
+            record["message"] = str(exc_value)
+            record["traceback"] = self._exc_info_to_string(err, test)
+        elif reason is not None:
+            record["message"] = str(reason)
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._record(test, "failed", err=err)
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._record(test, "error", err=err)
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self._record(test, "skipped", reason=reason)
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self._record(test, "expected_failure", err=err)
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self._record(test, "unexpected_success")
+
+    def addSubTest(self, test, subtest, err):
+        super().addSubTest(test, subtest, err)
+        if err is not None:
+            outcome = "failed" if issubclass(err[0], test.failureException) else "error"
+            self._record(test, outcome, err=err)
+
+
+class MonitoringCollector:
+    """
+    sys.monitoring (PEP 669) ile satır coverage'ı toplayan hafif veri toplayıcı.
+
+    settrace tabanlı izlemenin aksine her satır olayı ilk çalıştığında
+    sys.monitoring.DISABLE ile kapatılır; aynı satırın tekrar çalışması (ör.
+    test tablosu üzerinde dönen döngüler) hiçbir ek maliyet getirmez.
+    Test bazlı ölçümde bağlam değişince restart_events ile olaylar yeniden açılır.
+
+    run_job içinde coverage.Coverage yerine kullanılabilmesi için aynı metot
+    isimlerini (start, stop, switch_context, get_data, analysis2) sunar.
+    """
+
+    # Denenecek araç kimlikleri (COVERAGE_ID başka bir araçta kullanılıyorsa boştakiler)
+    TOOL_IDS = (1, 3, 4)
+
+    def __init__(self, source_path):
+        self.source_path = source_path
+        self.contexts = {"": set()}  # {bağlam: çalışan satırlar}
+        self._current = self.contexts[""]
+        self.tool_id = None
+        monitoring = sys.monitoring
+        for tool_id in self.TOOL_IDS:
+            if monitoring.get_tool(tool_id) is None:
+                self.tool_id = tool_id
+                break
+        if self.tool_id is None:
+            raise RuntimeError("sys.monitoring araç kimliği bulunamadı")
+
+    def _on_line(self, code, line_number):
+        if code.co_filename == self.source_path:
+            self._current.add(line_number)
+        return sys.monitoring.DISABLE  # Bu satır bir daha (bağlam değişene kadar) ücret ödemesin
+
+    def start(self):
+        monitoring = sys.monitoring
+        monitoring.use_tool_id(self.tool_id, "ai-test-coverage")
+        monitoring.register_callback(self.tool_id, monitoring.events.LINE, self._on_line)
+        monitoring.set_events(self.tool_id, monitoring.events.LINE)
+
+    def stop(self):
+        monitoring = sys.monitoring
+        monitoring.set_events(self.tool_id, monitoring.events.NO_EVENTS)
+        monitoring.register_callback(self.tool_id, monitoring.events.LINE, None)
+        monitoring.free_tool_id(self.tool_id)
+
+    def switch_context(self, name):
+        self._current = self.contexts.setdefault(name, set())
+        sys.monitoring.restart_events()  # Kapatılan satırlar yeni bağlamda tekrar kaydedilsin
+
+    # --- coverage.Coverage ile uyumlu okuma arayüzü ---
+    def get_data(self):
+        return self
+
+    def measured_files(self):
+        return [self.source_path] if any(self.contexts.values()) else []
+
+    def _parser(self):
+        if not hasattr(self, "_parsed"):
+            parser = PythonParser(filename=self.source_path, exclude=join_regex(coverage.config.DEFAULT_EXCLUDE))
+            parser.parse_source()
+            self._parsed = parser
+        return self._parsed
+
+    def contexts_by_lineno(self, filename):
+        parser = self._parser()
+        by_line = {}
+        for context, lines in self.contexts.items():
+            for line in parser.first_lines(lines):
+                by_line.setdefault(line, []).append(context)
+        return by_line
+
+    def analysis2(self, filename):
+        parser = self._parser()
+        statements = parser.statements
+        executed = parser.first_lines(set().union(*self.contexts.values())) & statements
+        return filename, sorted(statements), sorted(parser.excluded), sorted(statements - executed), ""
+
+
+def make_collector(job, source_path):
+    """
+    İş için veri toplayıcıyı seçer.
+
+    sys.monitoring varsa ve dal (branch) coverage istenmiyorsa MonitoringCollector,
+    aksi halde coverage.py (coverage.Coverage) kullanılır. job["collector"]
+    "coverage" ise her zaman coverage.py seçilir.
+
+    Returns:
+        tuple: (toplayıcı, toplayıcı_adı)
+    """
+    branch = bool(job.get("branch"))
+    if MONITORING_AVAILABLE and not branch and job.get("collector", "auto") != "coverage":
+        try:
+            return MonitoringCollector(source_path), "monitoring"
+        except RuntimeError:
+            pass  # Tüm araç kimlikleri dolu: coverage.py'ye dön
+    return coverage.Coverage(data_file=None, include=[source_path], config_file=False, branch=branch), "coverage"
+
+
+def lines_to_bitset(lines):
+    """
+    Satır numaralarını kompakt bir bitset'e (hex string) çevirir.
+    i. bit 1 ise i. satır çalışmıştır. JSON ile taşınabilmesi için hex kullanılır.
+    """
+    bits = 0
+    for line in lines:
+        bits |= 1 << line
+    return hex(bits)
+
+
+def status_result(status):
+    """
+    Ölçüm yapılamayan durumlar (zaman aşımı, bellek aşımı) için sonuç sözlüğü üretir.
+
+    Args:
+        status (str): "timeout" veya "oom"
+
+    Returns:
+        dict: Coverage'ı 0 olan, başarısız sonuç sözlüğü
+    """
+    return {
+        "total_tests": 0,
+        "failures": 0,
+        "errors": 0,
+        "coverage_percent": 0,
+        "missed_lines": [],
+        "success": False,
+        "status": status,
+        "tests": [],
+    }
+
+
+def limit_message(status, job):
+    """Durum için kullanıcıya gösterilecek hata mesajını üretir."""
+    if status == "timeout":
+        return (f"⏱️ Zaman Aşımı: Testler {job.get('timeout')} saniye (CPU sınırı: "
+                f"{job.get('cpu_limit')} sn) içinde tamamlanamadı. Sonsuz döngü veya bekleyen bir çağrı olabilir.")
+    return f"💥 Bellek Aşımı: Testler {job.get('memory_limit_mb')} MB bellek sınırını aştı."
+
+
+def apply_resource_limits(job):
+    """
+    İşin CPU ve bellek sınırlarını mevcut sürece uygular (sadece POSIX).
+
+    Args:
+        job (dict): 'cpu_limit' (saniye) ve 'memory_limit_mb' alanlarını içerebilir
+    """
+    if resource is None:
+        return
+    cpu_limit = job.get("cpu_limit")
+    if cpu_limit:
+        try:
+            # Yumuşak sınırda SIGXCPU, 1 sn sonra sert sınırda SIGKILL gelir
+            resource.setrlimit(resource.RLIMIT_CPU, (int(cpu_limit), int(cpu_limit) + 1))
+        except (ValueError, OSError):
+            pass
+    memory_limit_mb = job.get("memory_limit_mb")
+    if memory_limit_mb:
+        limit = int(memory_limit_mb) * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError):
+            pass  # Bazı sistemler (ör. macOS) RLIMIT_AS desteklemez
+
+
+def _result_class(cov):
+    """
+    Verilen coverage nesnesine bağlı bir StructuredTestResult alt sınıfı döndürür.
+    (TextTestRunner, resultclass'ı kendisi örneklediği için nesne sınıf üzerinden aktarılır.)
+    """
+    if cov is None:
+        return StructuredTestResult
+    return type("ContextTestResult", (StructuredTestResult,), {"coverage": cov})
+
+
+def summarize_tests(test_result, crash_error=None, crash=None):
+    """
+    Test çalıştırmasının sayılarını ve test kayıtlarını sonuç sözlüğü alanlarına çevirir.
+
+    Args:
+        test_result (StructuredTestResult): Çalıştırma sonucu (modül yüklenemediyse None)
+        crash_error (BaseException): Test modülü yüklenirken oluşan hata
+        crash (str): Bu hatanın traceback metni
+
+    Returns:
+        dict: total_tests, failures, errors, success ve tests alanları
+    """
+    tests = list(test_result.records) if test_result is not None else []
+    if crash is not None:
+        # Test modülü yüklenemediyse bunu da bir hata kaydı olarak ekle
+        tests.append({"id": f"{TEST_MODULE} (yükleme)", "outcome": "error", "duration": 0.0,
+                      "exception_type": type(crash_error).__name__, "message": str(crash_error),
+                      "traceback": crash})
+    return {
+        "total_tests": test_result.testsRun if test_result is not None else 0,
+        "failures": len(test_result.failures) if test_result is not None else 0,
+        "errors": len(test_result.errors) if test_result is not None else int(crash is not None),
+        "success": crash is None and test_result is not None and test_result.wasSuccessful(),
+        "tests": tests,
+    }
+
+
+def run_job(job):
+    """
+    Tek bir coverage ölçümü yapar.
+
+    work_dir içindeki app.py ve test_app.py dosyalarını kullanarak testleri
+    unittest ile çalıştırır ve app.py'nin coverage verisini toplar.
+
+    Args:
+        job (dict): İş tanımı. 'work_dir' anahtarı zorunludur; 'per_test' True ise
+            test bazlı coverage haritası da çıkarılır.
+            'test_filter' verilirse sadece bu testler (ör. "test_app.Sinif.test_x") çalışır.
+            'branch' True ise dal (branch) coverage da ölçülür.
+            'collector' "auto" (varsayılan) veya "coverage" olabilir (bkz. make_collector).
+
+    Returns:
+        dict: {"result": sonuç_sözlüğü veya None, "error": hata_mesajı veya None}
+    """
+    work_dir = os.path.realpath(job["work_dir"])
+    source_path = os.path.join(work_dir, f"{SOURCE_MODULE}.py")
+    per_test = bool(job.get("per_test"))
+    branch = bool(job.get("branch"))
+    test_filter = job.get("test_filter")
+
+    # Önceki işlerden kalan modülleri unut (aynı isimler tekrar kullanılıyor)
+    for name in (SOURCE_MODULE, TEST_MODULE):
+        sys.modules.pop(name, None)
+
+    old_cwd = os.getcwd()
+    old_path = list(sys.path)
+    sys.path.insert(0, work_dir)
+    os.chdir(work_dir)
+    # Yeni yazılan dosyaların import sistemi tarafından görülmesini garanti et
+    importlib.invalidate_caches()
+
+    output = io.StringIO()
+    cov, collector_name = make_collector(job, source_path)
+    test_result = None
+    crash = None
+    crash_error = None
+
+    try:
+        with redirect_stdout(output), redirect_stderr(output):
+            cov.start()
+            try:
+                if test_filter:
+                    suite = unittest.defaultTestLoader.loadTestsFromNames(test_filter)
+                else:
+                    suite = unittest.defaultTestLoader.loadTestsFromName(TEST_MODULE)
+                runner = unittest.TextTestRunner(stream=output, verbosity=1, resultclass=_result_class(cov if per_test else None))
+                test_result = runner.run(suite)
+            finally:
+                cov.stop()
+    except BaseException as e:
+        # Test modülü import edilirken patlayabilir (SyntaxError, sys.exit vb.)
+        crash_error = e
+        crash = traceback.format_exc()
+        output.write(crash)
+    finally:
+        os.chdir(old_cwd)
+        sys.path[:] = old_path
+        for name in (SOURCE_MODULE, TEST_MODULE):
+            sys.modules.pop(name, None)
+
+    # Test modülü bellek yetmediği için yüklenemediyse hiçbir test çalışmamıştır.
+    # Testlerin içindeki MemoryError ise aşağıda o testin hata kaydı olarak kalır.
+    if isinstance(crash_error, MemoryError):
+        return {"result": status_result("oom"), "error": limit_message("oom", job)}
+
+    # --- COVERAGE VERİSİNİ OKU ---
+    data = cov.get_data()
+    measured = {os.path.realpath(f) for f in data.measured_files()}
+    if source_path not in measured:
+        # Kaynak kod hiç import edilmediyse testler başlatılamamış demektir
+        return {
+            "result": None,
+            "error": f"⚠️ Testler Başlatılamadı!\n\nPython Hata Çıktısı:\n{output.getvalue()}",
+        }
+
+    _, statements, _, missing, _ = cov.analysis2(source_path)
+    executed = len(statements) - len(missing)
+    percent = (executed / len(statements) * 100) if statements else 100.0
+
+    result = summarize_tests(test_result, crash_error, crash)
+    result.update({
+        "coverage_percent": round(percent, 2),
+        "missed_lines": sorted(missing),
+        "status": "ok",
+        "collector": collector_name,
+    })
+
+    # --- DAL (BRANCH) COVERAGE ---
+    if branch:
+        analysis = cov._analyze(source_path)
+        total_branches = analysis.numbers.n_branches
+        missed_branches = analysis.numbers.n_missing_branches
+        result["total_branches"] = total_branches
+        result["branch_percent"] = round((total_branches - missed_branches) / total_branches * 100, 2) if total_branches else 100.0
+        result["missed_arcs"] = sorted([line, target] for line, targets in analysis.missing_branch_arcs().items()
+                                       for target in targets)
+
+    # --- TEST BAZLI COVERAGE HARİTASI (test -> satır bitset'i) ---
+    if per_test:
+        statement_set = set(statements)
+        per_context = {}
+        for line, contexts in data.contexts_by_lineno(source_path).items():
+            if line not in statement_set:
+                continue
+            for context in contexts:
+                per_context.setdefault(context or IMPORT_CONTEXT, set()).add(line)
+        result["statements"] = lines_to_bitset(statements)
+        result["test_coverage_map"] = {ctx: lines_to_bitset(lines) for ctx, lines in per_context.items()}
+
+    return {"result": result, "error": None}
+
+
+def run_job_forked(job):
+    """
+    İşi, ısınmış worker'dan fork edilen bir çocuk süreçte çalıştırır.
+
+    Çocuk süreç kendi süreç grubunu açar, CPU/bellek sınırlarını uygular,
+    sonucu bir pipe üzerinden ebeveyne yazar ve os._exit ile kapanır. Test
+    kodu süreci çökertse veya global durumu bozsa bile worker etkilenmez.
+    Süre dolarsa çocuk, başlattığı alt süreçlerle birlikte öldürülür.
+
+    Args:
+        job (dict): İş tanımı
+
+    Returns:
+        dict: {"result": ..., "error": ...} formatında sonuç
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+
+    if pid == 0:
+        # --- ÇOCUK SÜREÇ ---
+        os.close(read_fd)
+        try:
+            os.setpgid(0, 0)  # Testlerin açtığı süreçler de bu grupta olsun
+            apply_resource_limits(job)
+            payload = json.dumps(run_job(job))
+        except BaseException:
+            payload = json.dumps({"result": None, "error": f"Worker Hatası:\n{traceback.format_exc()}"})
+        with os.fdopen(write_fd, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os._exit(0)
+
+    # --- EBEVEYN (WORKER) SÜREÇ ---
+    os.close(write_fd)
+    try:
+        os.setpgid(pid, pid)  # Yarış durumuna karşı ebeveyn de grubu ayarlar
+    except OSError:
+        pass
+
+    # Sonucu, duvar saati zaman aşımını gözeterek oku
+    timeout = job.get("timeout")
+    deadline = time.monotonic() + timeout if timeout else None
+    chunks = []
+    timed_out = False
+    while True:
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            timed_out = True
+            break
+        ready, _, _ = select.select([read_fd], [], [], remaining)
+        if not ready:
+            timed_out = True
+            break
+        chunk = os.read(read_fd, 65536)
+        if not chunk:
+            break  # Çocuk kapandı (EOF)
+        chunks.append(chunk)
+    os.close(read_fd)
+
+    if timed_out:
+        # Süre doldu: Çocuğu ve başlattığı tüm süreçleri öldür
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except OSError:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    _, status, rusage = os.wait4(pid, 0)
+    payload = b"".join(chunks).decode("utf-8")
+
+    if timed_out:
+        return {"result": status_result("timeout"), "error": limit_message("timeout", job)}
+
+    if not payload:
+        # Çocuk sonuç yazamadan öldü: CPU sınırı mı, bellek mi, başka bir çökme mi?
+        if os.WIFSIGNALED(status):
+            sig = os.WTERMSIG(status)
+            cpu_used = rusage.ru_utime + rusage.ru_stime
+            cpu_limit = job.get("cpu_limit")
+            if sig == getattr(signal, "SIGXCPU", None) or (cpu_limit and cpu_used >= cpu_limit):
+                return {"result": status_result("timeout"), "error": limit_message("timeout", job)}
+            if sig == signal.SIGKILL and job.get("memory_limit_mb"):
+                return {"result": status_result("oom"), "error": limit_message("oom", job)}
+            sebep = f"sinyal {sig}"
+        else:
+            sebep = f"çıkış kodu {os.WEXITSTATUS(status)}"
+        return {"result": None, "error": f"⚠️ Test süreci beklenmedik şekilde sonlandı ({sebep})."}
+
+    return json.loads(payload)
+
+
+def warm_up():
+    """
+    Worker'ı ısıtır: Küçük bir örnek işi süreç içinde çalıştırarak coverage,
+    unittest ve bağımlı modüllerin (tracer, sqlite vb.) önceden yüklenmesini sağlar.
+    Böylece fork edilen her çocuk bu modülleri hazır bulur.
+    """
+    work_dir = tempfile.mkdtemp(prefix="cov_warmup_")
+    try:
+        with open(os.path.join(work_dir, f"{SOURCE_MODULE}.py"), "w", encoding="utf-8") as f:
+            f.write("def f():\n    return 1\n")
+        with open(os.path.join(work_dir, f"{TEST_MODULE}.py"), "w", encoding="utf-8") as f:
+            f.write(
+                f"import unittest\nfrom {SOURCE_MODULE} import f\n"
+                "class T(unittest.TestCase):\n    def test_f(self):\n        self.assertEqual(f(), 1)\n"
+            )
+        run_job({"work_dir": work_dir})
+    except Exception:
+        pass  # Isınma başarısız olsa da worker çalışmaya devam edebilir
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_tests_cli(result_path, names):
+    """
+    CLI motoru: 'coverage run' altında testleri StructuredTestResult ile çalıştırır
+    ve summarize_tests çıktısını JSON olarak result_path'e yazar. Coverage verisini
+    coverage.py'nin kendisi toplar; unittest metin çıktısı stderr'e yazılır.
+
+    Args:
+        result_path (str): Sonuç JSON dosyasının yolu
+        names (list): Çalıştırılacak testler (boşsa TEST_MODULE)
+    """
+    sys.path[0] = os.getcwd()  # Betiğin klasörü (modules/) yerine test klasöründen import et
+    test_result = None
+    crash = None
+    crash_error = None
+    try:
+        suite = unittest.defaultTestLoader.loadTestsFromNames(names or [TEST_MODULE])
+        test_result = unittest.TextTestRunner(verbosity=1, resultclass=StructuredTestResult).run(suite)
+    except BaseException as e:
+        # Test modülü import edilirken patlayabilir (SyntaxError, sys.exit vb.)
+        crash_error = e
+        crash = traceback.format_exc()
+        sys.stderr.write(crash)
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump(summarize_tests(test_result, crash_error, crash), f)
+
+
+def main():
+    """
+    Worker ana döngüsü: İşleri okur, çalıştırır ve sonucu geri yazar.
+
+    Üretilen testlerin print() çıktıları veya input() çağrıları protokolü
+    bozmasın diye, protokol için stdin/stdout'un kopyaları alınır ve asıl
+    0/1 numaralı dosya tanımlayıcıları devnull'a yönlendirilir.
+    """
+    sys.dont_write_bytecode = True  # Aynı saniyede yazılan dosyalarda eski .pyc kullanılmasın
+
+    proto_in = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    proto_out = os.fdopen(os.dup(1), "w", encoding="utf-8", newline="\n")
+
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    sys.stdin = open(os.devnull, "r")
+    sys.stdout = open(os.devnull, "w")
+
+    warm_up()
+
+    for line in proto_in:
+        if not line.strip():
+            continue
+        try:
+            job = json.loads(line)
+            response = run_job_forked(job) if FORK_AVAILABLE else run_job(job)
+        except Exception:
+            response = {"result": None, "error": f"Worker Hatası:\n{traceback.format_exc()}"}
+        proto_out.write(json.dumps(response) + "\n")
+        proto_out.flush()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--run-tests"]:
+        run_tests_cli(sys.argv[2], sys.argv[3:])
+    else:
+        main()
@@ -0,0 +1,36 @@
+"""
+Ortam Değişkenleri (.env) Yükleme Modülü
+.env dosyası süreç başına yalnızca bir kez okunur. Streamlit her etkileşimde
+main.py'yi baştan çalıştırdığı için dosya her seferinde tekrar aranıp
+ayrıştırılmaz; python-dotenv de ilk çağrıya kadar içe aktarılmaz.
+
+Not: Modüllerdeki ayarlar (model adı, hız sınırları, önbellek yolu vb.)
+içe aktarılırken okunur. Giriş noktaları (main.py, komut satırı) .env'i
+bu modülleri içe aktarmadan önce ensure_dotenv() ile yüklemelidir. API
+anahtarları her istekte okunduğundan, anahtar toplanırken de çağrılır.
+"""
+
+import threading
+
+_loaded = False
+_lock = threading.Lock()
+
+
+def ensure_dotenv():
+    """
+    .env dosyasını (bulunursa) yükler; sonraki çağrılar hiçbir şey yapmaz.
+    Zaten tanımlı ortam değişkenlerinin üzerine yazılmaz.
+
+    Returns:
+        bool: Bu çağrıda yüklendiyse True
+    """
+    global _loaded
+    if _loaded:
+        return False
+    with _lock:
+        if _loaded:
+            return False
+        from dotenv import load_dotenv  # Sadece ilk çağrıda gerekir
+        load_dotenv()
+        _loaded = True
+        return True
@@ -5,10 +5,24 @@ optimize eder. Doğal seçilim, mutasyon ve çaprazlama operatörleri ile
 en yüksek coverage'a sahip test kodunu bulmayı hedefler.
 """
 
+import os
 import random
 import time
-from modules.ai_generator import generate_test_code_from_gemini
-from modules.coverage_tool import run_coverage_analysis
+from modules.ai_generator import generate_test_code_from_gemini, generate_many, parse_candidates
+from modules.coverage_tool import run_coverage_analysis, evaluate_many, coverage_score
+from modules.prompt_slicer import build_source_context
+from modules.llm_metrics import capture_llm_calls, summarize_llm_calls
+
+# Tek LLM isteğinde üretilecek en fazla çocuk sayısı (1: her çocuk için ayrı istek)
+DEFAULT_BATCH_SIZE = int(os.getenv("GA_BATCH_SIZE", "4"))
+
+# Mutasyon tipleri ve LLM'e verilen talimatları
+MUTATION_TYPES = {
+    "VALUE_MODIFICATION": "Testteki parametreleri (sayı, string) rastgele değiştir.",  # Değer değiştirme
+    "ADD_NEW_ASSERT": "Kaynak koddaki fonksiyonlardan birine rastgele bir çağrı ekle. Mantıklı olmak zorunda değil.",
+    "REMOVE_LINE": "Test fonksiyonlarından birinden rastgele bir satır sil.",  # Satır silme
+    "LOGIC_FLIP": "Kodda geçen bir mantıksal operatörü tersine çevir.",  # Mantık operatörünü tersine çevirme
+}
 
 class GeneticOptimizer:
     """
@@ -22,7 +36,8 @@ class GeneticOptimizer:
     - Çaprazlama: İki kodun özelliklerini birleştirme
     """
     
-    def __init__(self, source_code, initial_test_code, population_size=4, generations=3):
+    def __init__(self, source_code, initial_test_code, population_size=4, generations=3, incremental=False,
+                 branch=False, branch_weight=None, batch_size=None, seed=None, prompt_token_budget=None):
         """
         Genetik optimizatör başlatır.
         
@@ -31,15 +46,44 @@ class GeneticOptimizer:
             initial_test_code: Başlangıç test kodu (opsiyonel, boş olabilir)
             population_size: Popülasyon büyüklüğü (kaç farklı test kodu varyasyonu)
             generations: Evrim nesil sayısı (kaç nesil boyunca evrimleşecek)
+            incremental: True ise sadece yeni/değişmiş test metotları çalıştırılır
+                (ebeveynden aynen gelen metotların coverage'ı tekrar ölçülmez)
+            branch: True ise fitness, satır ve dal (branch) coverage'ının ağırlıklı
+                ortalamasıdır; evrim ancak tüm yollar denendiğinde durur
+            branch_weight: Dalların fitness içindeki ağırlığı (0-1, None ise varsayılan)
+            batch_size: Tek LLM isteğinde üretilecek en fazla çocuk sayısı (None ise GA_BATCH_SIZE);
+                kaynak kod ve ebeveynler prompt'a bir kez yazılır
+            seed: Rastgele seçimler (mutasyon tipi, ebeveyn, çaprazlama) için tohum; verilirse
+                aynı LLM yanıtlarıyla (ör. kayıttan tekrar) evrim aynı şekilde ilerler
+            prompt_token_budget: Mutasyon prompt'larına eklenen kaynak kodun token bütçesi
+                (None ise PROMPT_SOURCE_TOKEN_BUDGET, 0 ise sınırsız)
         """
         self.source_code = source_code
         self.initial_test_code = initial_test_code
         self.population_size = population_size
         self.generations = generations
+        self.incremental = incremental
+        self.branch = branch
+        self.branch_weight = branch_weight
+        self.batch_size = DEFAULT_BATCH_SIZE if batch_size is None else batch_size
+        # Optimizatöre özel rastgele sayı üreteci (global 'random' durumunu etkilemez)
+        self.rng = random.Random(seed)
+        # Prompt'lardaki kaynak kod: Büyük modüllerde bütçeye sığan dilimler ve imzalar (bir kez hesaplanır)
+        self.source_context = build_source_context(source_code, token_budget=prompt_token_budget)
         self.population = []  # Popülasyon: [(test_kodu, fitness_score), ...] formatında
         
         # İstatistik: Toplam kaç test kodu değerlendirildi
         self.total_tests_run = 0 
+        # İstatistik: Kaç değerlendirme önbellekten geldi (tekrar çalıştırılmadı)
+        self.cache_hits = 0
+        # İstatistik: Kaç aday ön kontrolde (çalıştırılmadan) elendi
+        self.preflight_rejections = 0
+        # İstatistik: Toplu yanıttan ayrıştırılamayıp tekil istekle üretilen çocuk sayısı
+        self.batch_fallbacks = 0
+        # İstatistik: Değerlendirmelerde (coverage ölçümü) geçen toplam süre (saniye)
+        self.eval_seconds = 0.0
+        # evolve() iptal isteğiyle (cancel_event) erken bittiyse True
+        self.cancelled = False
 
     def initialize_population(self):
         """
@@ -65,10 +109,13 @@ class TestApp(unittest.TestCase):
         self.population.append(self.evaluate(base_code))
         
         # Kalan popülasyon: Mutasyon ile çeşitlendir
-        for _ in range(self.population_size - 1):
-            time.sleep(1)  # API rate limit için bekleme
-            mutated = self.mutate(base_code)
-            self.population.append(self.evaluate(mutated))
+        # Mutantlar tüm API anahtarlarına dağıtılarak eş zamanlı üretilir (hız sınırı anahtar başına uygulanır)
+        # ve hepsi birlikte değerlendirilir. Mutasyon bilerek rastgeledir: Prompt önbelleği kullanılmaz
+        # (aynı prompt'a her seferinde aynı çocuk dönerse popülasyon çeşitlenmez)
+        tasks = [("MUTATION", base_code, self.rng.choice(list(MUTATION_TYPES)))
+                 for _ in range(self.population_size - 1)]
+        mutants = self.generate_children(tasks)
+        self.population.extend(self.evaluate_many(mutants))
 
     def evaluate(self, test_code):
         """
@@ -82,23 +129,79 @@ class TestApp(unittest.TestCase):
             
         Returns:
             tuple: (test_kodu, fitness_score) - Fitness skoru coverage yüzdesidir
+                (branch modunda satır ve dal yüzdelerinin ağırlıklı ortalaması)
         """
         # İstatistik: Her değerlendirmede sayacı artır
         self.total_tests_run += 1
+        started = time.perf_counter()
         
         try:
             # Coverage analizi çalıştır
-            result, _ = run_coverage_analysis(self.source_code, test_code)
-            score = result.get('coverage_percent', 0)
-            
-            # Eğer test başarısızsa (çalışmıyorsa) büyük ceza ver
-            if not result.get('success', False):
-                score = -100  # Çalışmayan kodlar elenmeli
-                
-            return (test_code, score)
+            # preflight: Çalışamayacağı statik olarak belli olan kod süreç başlatılmadan elenir
+            result, _ = run_coverage_analysis(self.source_code, test_code, incremental=self.incremental,
+                                              branch=self.branch, preflight=True)
+            return (test_code, self._fitness(result))
         except Exception:
             # Hata durumunda da ceza ver
             return (test_code, -100)
+        finally:
+            self.eval_seconds += time.perf_counter() - started
+
+    def evaluate_many(self, test_codes):
+        """
+        Birden fazla test kodunu (ör. bir neslin tüm çocuklarını) tek seferde değerlendirir.
+
+        Adaylar worker havuzunda paralel ölçülür; toplam süre yaklaşık olarak
+        en yavaş adayın süresi kadardır.
+
+        Args:
+            test_codes: Değerlendirilecek test kodları (liste)
+
+        Returns:
+            list: Girdi sırasıyla (test_kodu, fitness_score) çiftleri
+        """
+        test_codes = list(test_codes)
+        self.total_tests_run += len(test_codes)
+        started = time.perf_counter()
+
+        try:
+            results = evaluate_many(self.source_code, test_codes, incremental=self.incremental,
+                                    branch=self.branch, preflight=True)
+        except Exception:
+            return [(test_code, -100) for test_code in test_codes]
+        finally:
+            self.eval_seconds += time.perf_counter() - started
+        return [(test_code, self._fitness(result)) for test_code, (result, _) in zip(test_codes, results)]
+
+    def _fitness(self, result):
+        """
+        Coverage sonucunu fitness skoruna çevirir (cezalar dahil).
+
+        Args:
+            result: run_coverage_analysis sonucu
+
+        Returns:
+            float: Fitness skoru
+        """
+        score = coverage_score(result, self.branch_weight)
+
+        # Aynı (veya sadece satır sonu karakterleri farklı) kod daha önce ölçüldüyse sayacı artır
+        if result.get('cached'):
+            self.cache_hits += 1
+
+        # Ön kontrolde elenen kod (çalışmadığı için success False -> -100 cezası alır)
+        if result.get('status') == "rejected":
+            self.preflight_rejections += 1
+        
+        # Eğer test başarısızsa (çalışmıyorsa) büyük ceza ver
+        if not result.get('success', False):
+            score = -100  # Çalışmayan kodlar elenmeli
+
+        # Zaman/bellek sınırını aşan kodlar (sonsuz döngü vb.) en ağır cezayı alır
+        if result.get('status') in ("timeout", "oom"):
+            score = -150
+
+        return score
 
     def mutate(self, test_code):
         """
@@ -117,13 +220,33 @@ class TestApp(unittest.TestCase):
         Returns:
             str: Mutasyona uğramış yeni test kodu
         """
+        return generate_test_code_from_gemini(self._mutation_prompt(test_code), fix_for_streamlit=True,
+                                              use_cache=False)
+
+    def crossover(self, parent1, parent2):
+        """
+        Çaprazlama (Crossover) Operatörü: İki test kodunun özelliklerini birleştirir.
+        
+        Genetik algoritmada, iki iyi bireyin özelliklerini birleştirerek
+        daha iyi bir çocuk birey oluşturma işlemidir.
+        
+        Args:
+            parent1: İlk ebeveyn test kodu
+            parent2: İkinci ebeveyn test kodu
+            
+        Returns:
+            str: İki kodun özelliklerini harmanlayan yeni test kodu
+        """
+        return generate_test_code_from_gemini(self._crossover_prompt(parent1, parent2), fix_for_streamlit=True,
+                                              use_cache=False)
+
+    def _mutation_prompt(self, test_code, mutation_type=None):
+        """
+        mutate() için LLM'e gönderilecek prompt'u hazırlar. Mutasyon tipi
+        verilmezse rastgele seçilir.
+        """
         # Rastgele bir mutasyon tipi seç
-        mutation_type = random.choice([
-            "VALUE_MODIFICATION",  # Değer değiştirme
-            "ADD_NEW_ASSERT",      # Yeni assertion ekleme
-            "REMOVE_LINE",         # Satır silme
-            "LOGIC_FLIP"           # Mantık operatörünü tersine çevirme
-        ])
+        mutation_type = mutation_type or self.rng.choice(list(MUTATION_TYPES))
         
         # AI'ya mutasyon talimatı ver
         prompt = f"""
@@ -132,7 +255,7 @@ class TestApp(unittest.TestCase):
         Kodun çalışıp çalışmayacağını veya coverage'ı artırıp artırmayacağını umursama. Sadece değişimi uygula.
         
         Kaynak Kod (Sadece referans için):
-        {self.source_code}
+        {self.source_context}
         
         Mevcut Test Kodu:
         {test_code}
@@ -140,29 +263,19 @@ class TestApp(unittest.TestCase):
         UYGULANACAK MUTASYON TİPİ: {mutation_type}
         
         Talimatlar:
-        1. Eğer {mutation_type} == "VALUE_MODIFICATION": Testteki parametreleri (sayı, string) rastgele değiştir.
-        2. Eğer {mutation_type} == "ADD_NEW_ASSERT": Kaynak koddaki fonksiyonlardan birine rastgele bir çağrı ekle. Mantıklı olmak zorunda değil.
-        3. Eğer {mutation_type} == "REMOVE_LINE": Test fonksiyonlarından birinden rastgele bir satır sil.
-        4. Eğer {mutation_type} == "LOGIC_FLIP": Kodda geçen bir mantıksal operatörü tersine çevir.
+        1. Eğer {mutation_type} == "VALUE_MODIFICATION": {MUTATION_TYPES["VALUE_MODIFICATION"]}
+        2. Eğer {mutation_type} == "ADD_NEW_ASSERT": {MUTATION_TYPES["ADD_NEW_ASSERT"]}
+        3. Eğer {mutation_type} == "REMOVE_LINE": {MUTATION_TYPES["REMOVE_LINE"]}
+        4. Eğer {mutation_type} == "LOGIC_FLIP": {MUTATION_TYPES["LOGIC_FLIP"]}
         
         Sadece geçerli Python kodu döndür. Yorum satırı ekleme.
         """
         
-        return generate_test_code_from_gemini(prompt, fix_for_streamlit=True)
+        return prompt
 
-    def crossover(self, parent1, parent2):
+    def _crossover_prompt(self, parent1, parent2):
         """
-        Çaprazlama (Crossover) Operatörü: İki test kodunun özelliklerini birleştirir.
-        
-        Genetik algoritmada, iki iyi bireyin özelliklerini birleştirerek
-        daha iyi bir çocuk birey oluşturma işlemidir.
-        
-        Args:
-            parent1: İlk ebeveyn test kodu
-            parent2: İkinci ebeveyn test kodu
-            
-        Returns:
-            str: İki kodun özelliklerini harmanlayan yeni test kodu
+        crossover() için iki ebeveyn kodu harmanlatan prompt'u hazırlar.
         """
         prompt = f"""
         Genetik Çaprazlama (Crossover) yap.
@@ -174,9 +287,100 @@ class TestApp(unittest.TestCase):
         Baba Kod:
         {parent2}
         """
-        return generate_test_code_from_gemini(prompt, fix_for_streamlit=True)
+        return prompt
+
+    def _task_prompt(self, task):
+        """Tek bir üreme görevi için tekil prompt: ("MUTATION", kod, tip) veya ("CROSSOVER", anne, baba)."""
+        if task[0] == "CROSSOVER":
+            return self._crossover_prompt(task[1], task[2])
+        return self._mutation_prompt(task[1], task[2])
+
+    def _batch_prompt(self, tasks):
+        """
+        Birden fazla üreme görevini tek prompt'ta ister. Kaynak kod ve her
+        farklı ebeveyn kodu prompt'a yalnızca bir kez yazılır.
+
+        Args:
+            tasks: ("MUTATION", kod, tip) veya ("CROSSOVER", anne, baba) görevleri
+
+        Returns:
+            str: Yanıtı JSON dizisi olarak isteyen prompt
+        """
+        parents = []
+        for task in tasks:
+            for code in (task[1:] if task[0] == "CROSSOVER" else task[1:2]):
+                if code not in parents:
+                    parents.append(code)
+
+        parent_blocks = "\n".join(f"EBEVEYN {i}:\n{code}\n" for i, code in enumerate(parents, 1))
+        task_lines = []
+        for n, task in enumerate(tasks, 1):
+            if task[0] == "CROSSOVER":
+                task_lines.append(f"{n}. ÇAPRAZLAMA (EBEVEYN {parents.index(task[1]) + 1} + EBEVEYN "
+                                  f"{parents.index(task[2]) + 1}): İki kodun özelliklerini rastgele harmanla.")
+            else:
+                task_lines.append(f"{n}. MUTASYON (EBEVEYN {parents.index(task[1]) + 1}) - {task[2]}: "
+                                  f"{MUTATION_TYPES[task[2]]}")
+        task_list = "\n        ".join(task_lines)
+
+        return f"""
+        Sen 'Kör' bir Genetik Algoritma Operatörüsün.
+        Aşağıdaki görev listesindeki HER görev için ayrı bir test kodu üret (toplam {len(tasks)} kod).
+        Görevin kodu iyileştirmek DEĞİL, sadece istenen rastgele değişikliği yapmaktır.
+        Kodun çalışıp çalışmayacağını veya coverage'ı artırıp artırmayacağını umursama. Sadece değişimi uygula.
+        
+        Kaynak Kod (Sadece referans için):
+        {self.source_context}
+        
+        {parent_blocks}
+        GÖREVLER:
+        {task_list}
+        
+        ÇIKTI FORMATI (ÇOK ÖNEMLİ):
+        Sadece bir JSON dizisi döndür; dizinin n. elemanı n. görevin TAM Python test kodu (string) olsun.
+        Teknik kuraldaki main bloğunu HER kodun sonuna ayrı ayrı ekle.
+        Markdown (```) kullanma, açıklama yazma. Örnek: ["import unittest\\n...", "import unittest\\n..."]
+        """
+
+    def generate_children(self, tasks):
+        """
+        Üreme görevlerinden çocuk test kodlarını üretir.
+
+        Görevler batch_size'lık gruplara bölünür; her grup tek bir LLM isteğiyle
+        (kaynak kod ve ebeveynler bir kez gönderilerek) üretilir ve gruplar
+        eş zamanlı gönderilir. Yanıttan ayrıştırılamayan (eksik veya sözdizimi
+        hatalı) çocuklar tekil isteklerle yeniden üretilir.
+
+        Args:
+            tasks: ("MUTATION", kod, tip) veya ("CROSSOVER", anne, baba) görevleri
 
-    def evolve(self):
+        Returns:
+            list: Görev sırasıyla çocuk test kodları
+        """
+        tasks = list(tasks)
+        if self.batch_size <= 1 or len(tasks) <= 1:
+            return generate_many([self._task_prompt(t) for t in tasks], fix_for_streamlit=True, use_cache=False)
+
+        groups = [tasks[i:i + self.batch_size] for i in range(0, len(tasks), self.batch_size)]
+        # Toplu yanıt tek bir kod bloğu değildir: Akış modunun ilk ``` satırında durması istenmez
+        responses = generate_many([self._batch_prompt(g) if len(g) > 1 else self._task_prompt(g[0]) for g in groups],
+                                  fix_for_streamlit=True, use_cache=False, stream=False)
+
+        children = []
+        for group, response in zip(groups, responses):
+            children.extend(parse_candidates(response, len(group)) if len(group) > 1 else [response])
+
+        # --- TEKİL İSTEKLERE GERİ DÖNÜŞ ---
+        missing = [i for i, child in enumerate(children) if child is None]
+        if missing:
+            self.batch_fallbacks += len(missing)
+            retries = generate_many([self._task_prompt(tasks[i]) for i in missing], fix_for_streamlit=True,
+                                    use_cache=False)
+            for i, child in zip(missing, retries):
+                children[i] = child
+        return children
+
+    def evolve(self, on_progress=None, cancel_event=None):
         """
         Ana Evrim Döngüsü: Genetik algoritmanın temel işleyişi.
         
@@ -186,13 +390,23 @@ class TestApp(unittest.TestCase):
            a. Seçilim: En iyi bireyleri seç
            b. Üreme: Mutasyon ve çaprazlama ile yeni nesil oluştur
            c. Elitizm: En iyi bireyi koru
-        3. %100 coverage'a ulaşırsa dur
+        3. %100 coverage'a ulaşırsa dur (branch modunda satırlar ve dallar birlikte)
+        
+        Geçmişteki her nesil kaydında, o nesli üreten LLM çağrılarının özeti ('llm')
+        ve değerlendirme süresi ('eval_seconds') bulunur (1. nesil: başlangıç popülasyonu).
+        
+        Args:
+            on_progress: Her nesil kaydedilince nesil kaydıyla çağrılır (ör. arayüzde canlı gösterim)
+            cancel_event: threading.Event; set edilirse yeni nesil üretilmez ve o ana kadarki
+                en iyi birey döner (self.cancelled True olur)
         
         Returns:
             tuple: ((en_iyi_kod, en_iyi_skor), evrim_geçmişi)
         """
         # Başlangıç popülasyonunu oluştur
-        self.initialize_population()
+        eval_before = self.eval_seconds
+        with capture_llm_calls() as llm_calls:
+            self.initialize_population()
         history = []  # Her neslin en iyi skorunu kaydet
         
         # Her nesil için evrim döngüsü
@@ -207,12 +421,21 @@ class TestApp(unittest.TestCase):
             history.append({
                 "generation": gen,
                 "best_score": display_score,
-                "best_code": best_individual[0]
+                "best_code": best_individual[0],
+                "llm": summarize_llm_calls(llm_calls),
+                "eval_seconds": round(self.eval_seconds - eval_before, 3)
             })
+            if on_progress:
+                on_progress(history[-1])
             
             # Hedef tutturuldu mu? (%100 coverage)
             if display_score >= 100:
                 break  # Evrimi durdur
+
+            # İptal istendi mi? (Sadece nesiller arasında kontrol edilir)
+            if cancel_event is not None and cancel_event.is_set():
+                self.cancelled = True
+                break
             
             # --- 2. ÜREME (REPRODUCTION) ---
             # En iyi 2 bireyi hayatta tut (survivors)
@@ -223,20 +446,23 @@ class TestApp(unittest.TestCase):
             next_gen.append(survivors[0])
             
             # Yeni nesli oluştur (popülasyon büyüklüğüne ulaşana kadar)
-            while len(next_gen) < self.population_size:
-                time.sleep(1)  # API rate limit için bekleme
-                
+            # Önce tüm çocukların üreme görevleri belirlenir, sonra hepsi birlikte üretilir
+            tasks = []
+            while len(next_gen) + len(tasks) < self.population_size:
                 parent1 = survivors[0][0]  # En iyi birey
-                parent2 = random.choice(survivors)[0]  # Rastgele bir survivor
+                parent2 = self.rng.choice(survivors)[0]  # Rastgele bir survivor
                 
                 # %40 ihtimalle çaprazlama, %60 ihtimalle mutasyon
-                if random.random() < 0.4:
-                    child_code = self.crossover(parent1, parent2)
+                if self.rng.random() < 0.4:
+                    tasks.append(("CROSSOVER", parent1, parent2))
                 else:
-                    child_code = self.mutate(parent1)
-                
-                # Yeni bireyi değerlendir ve popülasyona ekle
-                next_gen.append(self.evaluate(child_code))
+                    tasks.append(("MUTATION", parent1, self.rng.choice(list(MUTATION_TYPES))))
+            eval_before = self.eval_seconds
+            with capture_llm_calls() as llm_calls:
+                children = self.generate_children(tasks)
+            
+            # Tüm çocukları birlikte (paralel) değerlendir ve popülasyona ekle
+            next_gen.extend(self.evaluate_many(children))
             
             # Yeni nesli eski nesille değiştir
             self.population = next_gen
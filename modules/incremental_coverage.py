@@ -0,0 +1,305 @@
+"""
+Artımlı (Incremental) Coverage Değerlendirme Modülü
+Bu modül, aynı kaynak kod için art arda ölçülen test dosyalarında sadece
+yeni veya değişmiş test metotlarını çalıştırır.
+
+Genetik algoritmada çocuk test dosyası çoğunlukla ebeveyninin birkaç metot
+eklenmiş/çıkarılmış halidir; ajan da önceki denemedeki testleri genişletir.
+Her test metodu, AST'sinin özetine (hash) göre tanınır:
+- Metot anahtarı = modül bağlamı (import'lar, yardımcı fonksiyonlar, sabitler)
+  + sınıf bağlamı (sınıf adı, taban sınıflar, setUp, yardımcı metotlar)
+  + metodun kendi AST'si
+Bağlamdan herhangi biri değişirse metot da "değişmiş" sayılır. Satır
+numaraları özete dahil değildir; metotların yer değiştirmesi sonucu etkilemez.
+
+Değişmeyen metotların çalıştırdığı satırlar (test bazlı coverage bitset'i) ve
+test sonuçları önbellekten alınır, yeni ölçümle birleştirilerek (union) tüm
+paketin sonucu üretilir.
+
+Not: Birbirinin durumuna bağımlı testler (sıra bağımlılığı) artımlı modda
+farklı sonuç verebilir. Sınıf/modül seviyesinde fixture (setUpClass,
+setUpModule vb.), yerel sınıflardan kalıtım veya load_tests içeren test
+dosyaları her zaman tamamen çalıştırılır.
+"""
+
+import ast
+import hashlib
+import threading
+from collections import OrderedDict
+
+from modules.coverage_tool import IMPORT_CONTEXT, run_coverage_analysis
+from modules.result_cache import normalize_code
+
+# Test modülünün adı (sandbox'ta test_app.py olarak yazılır)
+TEST_MODULE = "test_app"
+
+# unittest'in test metodu öneki (unittest.TestLoader.testMethodPrefix)
+TEST_METHOD_PREFIX = "test"
+
+# Bu isimler sınıf/modül seviyesinde satır çalıştırır; artımlı birleştirme güvenli olmaz
+_SHARED_FIXTURES = {"setUpClass", "tearDownClass", "setUpModule", "tearDownModule", "load_tests"}
+
+# Paketin başarısız sayılmasına yol açan test sonuçları (unittest.wasSuccessful ile aynı)
+_FAILED_OUTCOMES = ("failed", "error", "unexpected_success")
+
+
+def _digest(*parts):
+    """Parçaların SHA-256 özetini (hex) döndürür."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _base_name(node):
+    """Taban sınıf ifadesinin son adını döndürür (ör. unittest.TestCase -> TestCase)."""
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Name):
+        return node.id
+    return None
+
+
+def split_test_methods(test_code):
+    """
+    Test dosyasını test metotlarına ayırır ve her metot için anahtar üretir.
+
+    Args:
+        test_code (str): Test kodu (unittest formatında)
+
+    Returns:
+        tuple: (modül_anahtarı, {test_id: metot_anahtarı}) veya artımlı
+            değerlendirme güvenli değilse (sözdizimi hatası, sınıf fixture'ı,
+            yerel kalıtım vb.) None. test_id sırası dosyadaki sırayı izler.
+    """
+    try:
+        tree = ast.parse(test_code)
+    except (SyntaxError, ValueError):
+        return None
+
+    local_classes = {node.name for node in tree.body if isinstance(node, ast.ClassDef)}
+    module_parts = []
+    test_classes = OrderedDict()
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and node.name in _SHARED_FIXTURES:
+            return None
+
+        methods = []
+        if isinstance(node, ast.ClassDef):
+            methods = [item for item in node.body
+                       if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))
+                       and item.name.startswith(TEST_METHOD_PREFIX)]
+        if not methods:
+            module_parts.append(ast.dump(node))
+            continue
+
+        # Test sınıfı: Sadece TestCase türevlerinden doğrudan kalıtım desteklenir
+        bases = [_base_name(base) for base in node.bases]
+        if not bases or any(b is None or b in local_classes or not b.endswith("TestCase") for b in bases):
+            return None
+        if any(isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and item.name in _SHARED_FIXTURES
+               for item in node.body):
+            return None
+
+        # Aynı isimli sınıf tekrar tanımlanırsa Python'daki gibi sonuncusu geçerlidir
+        test_classes.pop(node.name, None)
+        test_classes[node.name] = node
+
+    module_key = _digest("module", *module_parts)
+
+    method_keys = OrderedDict()
+    for class_name, node in test_classes.items():
+        class_parts = [class_name, *(ast.dump(base) for base in node.bases),
+                       *(ast.dump(kw) for kw in node.keywords),
+                       *(ast.dump(dec) for dec in node.decorator_list)]
+        methods = OrderedDict()
+        for item in node.body:
+            if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and item.name.startswith(TEST_METHOD_PREFIX):
+                methods.pop(item.name, None)  # Tekrar tanımlanan metotta sonuncusu geçerli
+                methods[item.name] = item
+            else:
+                class_parts.append(ast.dump(item))
+        class_key = _digest("class", *class_parts)
+
+        for name, item in methods.items():
+            test_id = f"{TEST_MODULE}.{class_name}.{name}"
+            method_keys[test_id] = _digest(module_key, class_key, test_id, ast.dump(item))
+
+    if not method_keys:
+        return None
+    return module_key, method_keys
+
+
+class IncrementalCoverageEvaluator:
+    """
+    Test metodu seviyesinde önbellek tutarak coverage'ı artımlı ölçen sınıf.
+
+    Her kaynak kod (satır sonları birleştirilmiş halinin özeti) için ayrı bir kayıt tutulur:
+        statements: Kaynak koddaki çalıştırılabilir satırlar (bitset)
+        imports: {modül_anahtarı: import sırasında çalışan satırlar (bitset)}
+        methods: {metot_anahtarı: {"bits": satırlar, "record": test sonucu}}
+    """
+
+    def __init__(self, max_sources=32, max_methods_per_source=4096):
+        """
+        Args:
+            max_sources (int): Saklanacak en fazla kaynak kod sayısı (LRU)
+            max_methods_per_source (int): Kaynak kod başına saklanacak en fazla metot sonucu
+        """
+        self.max_sources = max_sources
+        self.max_methods_per_source = max_methods_per_source
+        self._sources = OrderedDict()
+        self._lock = threading.Lock()
+
+        # İstatistikler
+        self.executed_methods = 0
+        self.reused_methods = 0
+        self.full_runs = 0
+
+    def _entry(self, source_code):
+        """Kaynak koda ait kaydı döndürür (yoksa oluşturur)."""
+        key = _digest(normalize_code(source_code))
+        entry = self._sources.get(key)
+        if entry is None:
+            entry = {"statements": None, "imports": {}, "methods": OrderedDict()}
+            self._sources[key] = entry
+        self._sources.move_to_end(key)
+        while len(self._sources) > self.max_sources:
+            self._sources.popitem(last=False)
+        return entry
+
+    def evaluate(self, source_code, test_code, **kwargs):
+        """
+        Test kodunun coverage'ını artımlı olarak ölçer.
+
+        Args:
+            source_code (str): Test edilecek kaynak kod
+            test_code (str): Test kodu (unittest formatında)
+            **kwargs: run_coverage_analysis'e aktarılacak ek ayarlar
+                (engine, sandbox_root, timeout, cpu_limit, memory_limit_mb, collector)
+
+        Returns:
+            tuple: (sonuç_sözlüğü, hata_mesajı) - run_coverage_analysis ile aynı formattadır;
+                ek olarak 'incremental' anahtarı çalıştırılan/yeniden kullanılan metot
+                sayılarını içerir.
+        """
+        split = split_test_methods(test_code)
+        if split is None:
+            # Artımlı değerlendirme güvenli değil: Tüm paketi normal şekilde çalıştır
+            with self._lock:
+                self.full_runs += 1
+            return run_coverage_analysis(source_code, test_code, use_cache=False, **kwargs)
+        module_key, method_keys = split
+
+        # --- 1. HANGİ METOTLAR ÇALIŞTIRILMALI? ---
+        with self._lock:
+            entry = self._entry(source_code)
+            known = entry["statements"] is not None and module_key in entry["imports"]
+            missing = [test_id for test_id, key in method_keys.items()
+                       if not known or key not in entry["methods"]]
+            # Önbellekten gelen metotlar şimdi alınır: Başka bir thread adım 3'ten önce
+            # bunları LRU sınırı nedeniyle silebilir
+            hits = {key: entry["methods"][key] for test_id, key in method_keys.items() if test_id not in missing}
+
+        # --- 2. YENİ/DEĞİŞMİŞ METOTLARI ÇALIŞTIR ---
+        if missing:
+            run_all = len(missing) == len(method_keys)
+            result, error = run_coverage_analysis(
+                source_code, test_code, use_cache=False, per_test=True,
+                test_filter=None if run_all else missing, **kwargs)
+            if result is None or result.get("status") != "ok":
+                return result, error
+
+            records = {record["id"]: record for record in result.get("tests", [])}
+            if set(records) != set(missing):
+                # Beklenmeyen test kimlikleri (yükleme hatası vb.): Birleştirme yapılamaz
+                if run_all:
+                    return result, error
+                with self._lock:
+                    self.full_runs += 1
+                return run_coverage_analysis(source_code, test_code, use_cache=False, **kwargs)
+
+            coverage_map = result.get("test_coverage_map", {})
+            fresh = {method_keys[test_id]: {"bits": int(coverage_map.get(test_id, "0x0"), 16),
+                                            "record": records[test_id]}
+                     for test_id in missing}
+            with self._lock:
+                entry["statements"] = int(result["statements"], 16)
+                entry["imports"][module_key] = int(coverage_map.get(IMPORT_CONTEXT, "0x0"), 16)
+                entry["methods"].update(fresh)
+        else:
+            fresh = {}
+
+        # --- 3. SONUÇLARI BİRLEŞTİR (UNION) ---
+        with self._lock:
+            methods = entry["methods"]
+            statements = entry["statements"]
+            covered = entry["imports"][module_key]
+            coverage_map = {IMPORT_CONTEXT: hex(covered)}
+            tests = []
+            for test_id, key in method_keys.items():
+                # Bu çağrının ölçtüğü veya adım 1'de aldığı sonuçlar, başka bir thread
+                # önbellekten silse bile elde
+                cached = fresh.get(key) or hits[key]
+                methods[key] = cached
+                methods.move_to_end(key)
+                covered |= cached["bits"]
+                coverage_map[test_id] = hex(cached["bits"])
+                tests.append(dict(cached["record"], id=test_id))
+            self.executed_methods += len(missing)
+            self.reused_methods += len(method_keys) - len(missing)
+            while len(methods) > self.max_methods_per_source:
+                methods.popitem(last=False)
+
+        total_statements = bin(statements).count("1")
+        executed = bin(statements & covered).count("1")
+        percent = (executed / total_statements * 100) if total_statements else 100.0
+        missed = statements & ~covered
+
+        outcomes = [record["outcome"] for record in tests]
+        return {
+            "total_tests": len(tests),
+            "failures": outcomes.count("failed"),
+            "errors": outcomes.count("error"),
+            "coverage_percent": round(percent, 2),
+            "missed_lines": [line for line in range(missed.bit_length()) if missed >> line & 1],
+            "success": not any(outcome in _FAILED_OUTCOMES for outcome in outcomes),
+            "status": "ok",
+            "tests": tests,
+            "statements": hex(statements),
+            "test_coverage_map": coverage_map,
+            "incremental": {"executed": len(missing), "reused": len(method_keys) - len(missing)},
+        }, None
+
+    def stats(self):
+        """
+        Artımlı değerlendirme istatistiklerini döndürür.
+
+        Returns:
+            dict: executed_methods, reused_methods, full_runs, reuse_rate
+        """
+        with self._lock:
+            total = self.executed_methods + self.reused_methods
+            return {
+                "executed_methods": self.executed_methods,
+                "reused_methods": self.reused_methods,
+                "full_runs": self.full_runs,
+                "reuse_rate": round(self.reused_methods / total * 100, 2) if total else 0.0,
+            }
+
+    def clear(self):
+        """Tüm metot sonuçlarını ve istatistikleri siler."""
+        with self._lock:
+            self._sources.clear()
+            self.executed_methods = self.reused_methods = self.full_runs = 0
+
+
+# Süreç genelinde paylaşılan değerlendirici
+_default_evaluator = IncrementalCoverageEvaluator()
+
+
+def get_incremental_evaluator():
+    """Süreç genelinde paylaşılan artımlı coverage değerlendiricisini döndürür."""
+    return _default_evaluator
@@ -0,0 +1,71 @@
+"""
+Gecikmeli İçe Aktarma (Lazy Import) Modülü
+Bu modül, ağır kütüphaneleri (networkx, matplotlib, radon, pandas) ilk
+kullanıldıkları ana kadar içe aktarmayan vekil (proxy) modüller sağlar.
+
+Streamlit her etkileşimde betiği baştan çalıştırır; ilk açılışta veya
+bir sayfaya geçişte, o sayfanın hiç kullanmadığı kütüphanelerin içe
+aktarma süresi ödenmez. Örnek:
+
+    plt = lazy_module("matplotlib.pyplot")   # Henüz içe aktarılmadı
+    plt.figure()                             # İlk erişimde içe aktarılır
+"""
+
+import importlib
+import sys
+import threading
+import types
+
+_import_lock = threading.Lock()
+
+
+class LazyModule(types.ModuleType):
+    """
+    İlk öznitelik erişiminde gerçek modülü içe aktaran vekil.
+
+    İçe aktarıldıktan sonra öznitelikler gerçek modülden okunur. Vekil üzerine
+    yazılan öznitelikler (ör. testlerde unittest.mock.patch) vekilde kalır ve
+    gerçek modülü değiştirmez.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            with _import_lock:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "yüklendi" if self.__dict__["_lazy_module"] is not None else "yüklenmedi"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_module(name):
+    """
+    Modül zaten içe aktarılmışsa kendisini, değilse ilk erişimde içe aktarılacak vekili döndürür.
+
+    Args:
+        name (str): Modülün tam adı (ör. "matplotlib.pyplot")
+
+    Returns:
+        module: Modül veya LazyModule
+    """
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def is_loaded(module):
+    """Vekilin gerçek modülü içe aktarılmış mı (normal modüller için her zaman True)."""
+    return not isinstance(module, LazyModule) or module.__dict__["_lazy_module"] is not None
@@ -0,0 +1,348 @@
+"""
+LLM Arka Uç (Backend) Modülü
+Bu modül, kod üretiminin hangi LLM servisine gönderileceğini belirler.
+ai_generator ve llm_client sadece buradaki ortak arayüzü kullanır; anahtar
+rotasyonu, hız sınırları, önbellek ve akış izleme tüm arka uçlar için aynıdır.
+
+Arka uçlar (LLM_BACKEND ortam değişkeni ile seçilir):
+- "gemini" (varsayılan): Google Gemini (REST API; anahtar her isteğe ayrı verilir).
+- "openai": OpenAI uyumlu herhangi bir HTTP uç noktası (/chat/completions).
+  Yerel modeller (vLLM, llama.cpp, Ollama) veya sahte sunucular için.
+- "fake": Ağ kullanmayan, deterministik sahte arka uç. Hazır yanıtlar veya
+  prompt'taki fonksiyon/sınıf adlarından şablonla üretilen testler döndürür.
+  Ajan/GA hız ölçümleri ve CI çalıştırmaları için.
+
+Ortak arayüz:
+    complete(api_key, prompt, monitor=None)        -> (metin, prompt_feedback, toplam_token)
+    await acomplete(api_key, prompt, monitor=None) -> (metin, prompt_feedback, toplam_token)
+Kota hataları LLMHTTPError (429) olarak veya "429"/"quota" içeren mesajla bildirilir.
+"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+
+from modules.llm_client import (GEMINI_MODEL, estimate_tokens, consume_stream, gemini_rest_generate,
+                                gemini_rest_stream, openai_rest_generate, openai_rest_stream)
+
+# Seçili arka uç: "gemini", "openai" veya "fake"
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+
+# OpenAI uyumlu uç nokta ayarları
+OPENAI_API_BASE = os.getenv("OPENAI_API_BASE", "http://localhost:8000/v1")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "local-model")
+
+# Sahte arka uç: Hazır yanıt dosyası ({"prompt'ta geçen metin": "yanıt", ...}) ve yapay gecikme (saniye)
+FAKE_RESPONSES_PATH = os.getenv("LLM_FAKE_RESPONSES", "")
+FAKE_LATENCY = float(os.getenv("LLM_FAKE_LATENCY", "0"))
+
+# AI Güvenlik Ayarları: Üretilen kodun filtre takılmaması için kısıtlamaları esnet
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+]
+
+
+def gemini_api_keys():
+    """
+    Sistemdeki tüm Gemini API anahtarlarını toplar.
+    'GEMINI_API_KEY_1', 'GEMINI_API_KEY_2' gibi sıralı anahtarları ve
+    varsayılan 'GEMINI_API_KEY'i bir liste halinde döndürür.
+    """
+    keys = []
+    i = 1
+    # Dinamik olarak GEMINI_API_KEY_n formatındaki tüm anahtarları tara
+    while True:
+        key = os.getenv(f"GEMINI_API_KEY_{i}")
+        if key:
+            keys.append(key)
+            i += 1
+        else:
+            break
+
+    # Eğer varsa, tekil/fallback API anahtarını da listeye ekle (mükerrer kontrolü ile)
+    fallback = os.getenv("GEMINI_API_KEY")
+    if fallback and fallback not in keys:
+        keys.append(fallback)
+
+    return keys
+
+
+class LLMBackend:
+    """
+    Arka uçların ortak arayüzü.
+
+    Alt sınıflar generate() ve stream() metotlarını uygular; complete() ve
+    acomplete() bunları akış izleyicisiyle (CodeStreamMonitor) birleştirir.
+    Asenkron sürüm varsayılan olarak bloklayan çağrıyı thread havuzunda çalıştırır.
+    """
+
+    name = None
+    # Anahtar başına hız sınırları (KeyRateLimiter parametreleri; None ise LLM_* varsayılanları)
+    rate_limits = None
+    # False ise prompt önbelleği (prompt_cache) atlanır; her çağrı arka uca gider
+    use_prompt_cache = True
+
+    def __init__(self, model=None, timeout=None):
+        self.model = model
+        self.timeout = timeout
+
+    @property
+    def model_id(self):
+        """Önbellek anahtarında kullanılan model kimliği (farklı arka uçların yanıtları karışmaz)."""
+        return f"{self.name}:{self.model}"
+
+    def api_keys(self):
+        """İsteklerin dağıtılacağı API anahtarları (boşsa istek gönderilemez)."""
+        raise NotImplementedError
+
+    def generate(self, api_key, prompt):
+        """
+        Tek istek gönderir ve yanıtın tamamını bekler.
+
+        Returns:
+            tuple: (metin, prompt_feedback, toplam_token) - Yanıt boşsa metin None olur
+        """
+        raise NotImplementedError
+
+    def stream(self, api_key, prompt):
+        """Yanıtı (metin_parçası, prompt_feedback, toplam_token) parçaları halinde üretir."""
+        yield self.generate(api_key, prompt)
+
+    def complete(self, api_key, prompt, monitor=None):
+        """
+        Bloklayan çağrı. İzleyici verilirse yanıt akış halinde okunur ve
+        izleyici durdurduğunda bağlantı kesilir.
+
+        Returns:
+            tuple: (metin, prompt_feedback, toplam_token)
+        """
+        if monitor is not None:
+            return consume_stream(self.stream(api_key, prompt), monitor)
+        return self.generate(api_key, prompt)
+
+    async def acomplete(self, api_key, prompt, monitor=None):
+        """complete() ile aynı; event loop'u bloklamaz."""
+        return await asyncio.to_thread(self.complete, api_key, prompt, monitor)
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Google Gemini (REST API). Anahtar her isteğe ayrı verilir; SDK'nın global
+    yapılandırması (genai.configure) eş zamanlı isteklerde (thread havuzu veya
+    asenkron üretim) anahtarları karıştırabileceğinden kullanılmaz.
+    """
+
+    name = "gemini"
+
+    def __init__(self, model=None, safety_settings=None, base_url=None, timeout=None):
+        super().__init__(model or GEMINI_MODEL, timeout)
+        self.safety_settings = SAFETY_SETTINGS if safety_settings is None else safety_settings
+        self.base_url = base_url
+
+    @property
+    def model_id(self):
+        # Önceki sürümlerin önbellek kayıtları geçerli kalsın diye öneksiz
+        return self.model
+
+    def api_keys(self):
+        return gemini_api_keys()
+
+    def generate(self, api_key, prompt):
+        return gemini_rest_generate(api_key, prompt, self.safety_settings, self.base_url, self.model, self.timeout)
+
+    def stream(self, api_key, prompt):
+        return gemini_rest_stream(api_key, prompt, self.safety_settings, self.base_url, self.model, self.timeout)
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """
+    OpenAI uyumlu /chat/completions uç noktası (yerel veya uzak).
+
+    Anahtarlar OPENAI_API_KEY_1, OPENAI_API_KEY_2, ... ve OPENAI_API_KEY'den okunur; hiç anahtar
+    yoksa (yerel sunucu) tek bir boş anahtarla istek gönderilir.
+    """
+
+    name = "openai"
+
+    def __init__(self, model=None, base_url=None, timeout=None):
+        super().__init__(model or OPENAI_MODEL, timeout)
+        self.base_url = base_url or OPENAI_API_BASE
+
+    def api_keys(self):
+        keys = []
+        i = 1
+        while os.getenv(f"OPENAI_API_KEY_{i}"):
+            keys.append(os.getenv(f"OPENAI_API_KEY_{i}"))
+            i += 1
+        fallback = os.getenv("OPENAI_API_KEY")
+        if fallback and fallback not in keys:
+            keys.append(fallback)
+        return keys or [""]
+
+    def generate(self, api_key, prompt):
+        return openai_rest_generate(api_key, prompt, self.base_url, self.model, self.timeout)
+
+    def stream(self, api_key, prompt):
+        return openai_rest_stream(api_key, prompt, self.base_url, self.model, self.timeout)
+
+
+class FakeBackend(LLMBackend):
+    """
+    Ağ kullanmayan deterministik arka uç. Aynı prompt'a her zaman aynı yanıtı verir.
+
+    Yanıt seçimi:
+    1. Hazır yanıtlar: Prompt'ta geçen ilk anahtar metnin yanıtı
+    2. Şablon: Prompt'taki fonksiyon/sınıf adları için, her birini birkaç
+       basit argümanla çağıran bir unittest dosyası (gerçek coverage üretir)
+    """
+
+    name = "fake"
+    # Hız sınırı yok; eş zamanlılık sadece sahte gecikmeyi paralel çalıştırmak içindir
+    rate_limits = {"rpm": 0, "tpm": 0, "max_inflight": 64}
+
+    # Şablonda her fonksiyonun çağrılacağı argüman değerleri
+    ARGUMENT_VALUES = ("0", "1", "-1", "''", "'a'", "None", "[]")
+
+    DEF_PATTERN = re.compile(r"^[ \t]*(?:async[ \t]+)?def[ \t]+([A-Za-z_]\w*)[ \t]*\(([^)]*)\)", re.MULTILINE)
+    CLASS_PATTERN = re.compile(r"^[ \t]*class[ \t]+([A-Za-z_]\w*)", re.MULTILINE)
+
+    def __init__(self, responses=None, latency=None, chunk_size=64):
+        """
+        Args:
+            responses (dict): {"prompt'ta geçen metin": "yanıt"} (None ise LLM_FAKE_RESPONSES dosyası)
+            latency (float): Her yanıttan önce beklenecek süre (None ise LLM_FAKE_LATENCY)
+            chunk_size (int): Akış modunda parça uzunluğu (karakter)
+        """
+        super().__init__("template")
+        if responses is None and FAKE_RESPONSES_PATH:
+            with open(FAKE_RESPONSES_PATH, "r", encoding="utf-8") as f:
+                responses = json.load(f)
+        self.responses = dict(responses or {})
+        self.latency = FAKE_LATENCY if latency is None else latency
+        self.chunk_size = max(1, chunk_size)
+
+    def api_keys(self):
+        return ["fake"]
+
+    def respond(self, prompt):
+        """Prompt'a karşılık gelen yanıt metnini döndürür (gecikmesiz)."""
+        for needle, response in self.responses.items():
+            if needle in prompt:
+                return response
+        return f"```python\n{self._template_test(prompt)}```\n"
+
+    def _template_test(self, prompt):
+        lines = ["import unittest", "import app", "", "", "class TestApp(unittest.TestCase):",
+                 "    def _call(self, name, *args):",
+                 "        target = getattr(app, name, None)",
+                 "        if callable(target):",
+                 "            try:",
+                 "                return target(*args)",
+                 "            except Exception:",
+                 "                return None", ""]
+
+        # Kaynak koddaki (ve prompt'taki test kodundaki) isimler; test metotları ve özel isimler hariç
+        targets = {}
+        for name, params in self.DEF_PATTERN.findall(prompt):
+            if not name.startswith(("test", "_", "setUp", "tearDown")):
+                args = [p for p in params.split(",") if p.strip() and "=" not in p and not p.strip().startswith("*")]
+                targets.setdefault(name, len([a for a in args if a.strip() not in ("self", "cls")]))
+        for name in self.CLASS_PATTERN.findall(prompt):
+            if not name.startswith(("Test", "_")):
+                targets.setdefault(name, 0)
+
+        for name, arity in targets.items():
+            lines.append(f"    def test_{name}(self):")
+            for value in self.ARGUMENT_VALUES:
+                lines.append(f"        self._call({name!r}{''.join(', ' + value for _ in range(arity))})")
+            lines.append("")
+        if not targets:
+            lines += ["    def test_import(self):", "        self.assertIsNotNone(app)", ""]
+
+        # Streamlit uyumluluğu istendiyse (sistem talimatında) main bloğu eklenir
+        if "unittest.main(argv=" in prompt:
+            lines += ["if __name__ == '__main__':",
+                      "    unittest.main(argv=['first-arg-is-ignored'], exit=False)"]
+        return "\n".join(lines) + "\n"
+
+    def generate(self, api_key, prompt):
+        if self.latency:
+            time.sleep(self.latency)
+        text = self.respond(prompt)
+        return text, None, estimate_tokens(prompt) + estimate_tokens(text)
+
+    def stream(self, api_key, prompt):
+        text, _, tokens = self.generate(api_key, prompt)
+        for start in range(0, len(text), self.chunk_size):
+            yield text[start:start + self.chunk_size], None, None
+        yield "", None, tokens
+
+    async def acomplete(self, api_key, prompt, monitor=None):
+        # Gecikme event loop üzerinde beklenir (thread havuzu sınırına takılmaz)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        text = self.respond(prompt)
+        tokens = estimate_tokens(prompt) + estimate_tokens(text)
+        if monitor is not None:
+            chunks = ((text[i:i + self.chunk_size], None, tokens) for i in range(0, len(text), self.chunk_size))
+            return consume_stream(chunks, monitor)
+        return text, None, tokens
+
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "openai": OpenAICompatibleBackend,
+    "fake": FakeBackend,
+}
+
+# Süreç genelinde paylaşılan arka uç örnekleri (isim -> örnek)
+_backends = {}
+_backends_lock = threading.Lock()
+
+# Varsayılan arka ucun yerine geçici olarak kullanılan arka uç (ör. llm_cassette.use_cassette)
+_backend_override = None
+
+
+def set_backend_override(backend):
+    """
+    get_backend()'in (isim verilmeden çağrıldığında) döndüreceği arka ucu değiştirir.
+
+    Args:
+        backend (LLMBackend): Yeni varsayılan arka uç (None: LLM_BACKEND ayarına dön)
+
+    Returns:
+        LLMBackend: Önceki değer (geri yüklemek için)
+    """
+    global _backend_override
+    with _backends_lock:
+        previous, _backend_override = _backend_override, backend
+    return previous
+
+
+def get_backend(name=None):
+    """
+    Adı verilen (None ise LLM_BACKEND) arka ucu döndürür; örnek ilk kullanımda oluşturulur.
+    LLM_CASSETTE tanımlıysa varsayılan arka uç kayıt/tekrar (llm_cassette) katmanıyla sarılır.
+
+    Raises:
+        ValueError: Bilinmeyen arka uç adı
+    """
+    if name is None and _backend_override is not None:
+        return _backend_override
+    name = (name or LLM_BACKEND).strip().lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Bilinmeyen LLM arka ucu: '{name}'. Seçenekler: {', '.join(BACKENDS)}")
+    with _backends_lock:
+        if name not in _backends:
+            backend = BACKENDS[name]()
+            if os.getenv("LLM_CASSETTE") and name == LLM_BACKEND.strip().lower():
+                from modules.llm_cassette import cassette_from_env  # llm_cassette bu modülü içe aktarır
+                backend = cassette_from_env(backend)
+            _backends[name] = backend
+        return _backends[name]
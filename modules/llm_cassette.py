@@ -0,0 +1,257 @@
+"""
+LLM Kayıt/Tekrar (Cassette) Modülü
+Bu modül, bir çalıştırmadaki (AutoTestAgent.run, GeneticOptimizer.evolve)
+tüm LLM etkileşimlerini bir dosyaya kaydeder ve sonra aynı yanıtları ağa
+gitmeden tekrar oynatır.
+
+Böylece döngünün LLM dışındaki kısımları (değerlendirme, öğrenme, kayıt)
+deterministik olarak profillenebilir ve değişiklik öncesi/sonrası karşılaştırılabilir.
+Tam tekrar için ajan/GA aynı tohumla (seed) başlatılmalıdır.
+
+Modlar:
+- "record": Gerçek arka uca gidilir; her (prompt, yanıt, gecikme) kaydedilir
+- "replay": Yanıtlar kayıttan verilir; istenirse kaydedilen gecikmeler de uygulanır
+
+Dosya biçimi: Satır başına bir JSON kaydı (prompt'un özeti, yanıt, token, gecikme);
+yol ".gz" ile bitiyorsa gzip ile sıkıştırılır. Prompt'un kendisi saklanmaz.
+Aynı prompt birden fazla kez istendiyse yanıtlar kayıt sırasıyla verilir.
+
+Ortam değişkenleri (varsayılan arka ucu sarar):
+    LLM_CASSETTE=runs/ga_oturumu.jsonl.gz
+    LLM_CASSETTE_MODE=record      # veya replay
+    LLM_CASSETTE_LATENCY=1        # replay: kaydedilen gecikmelerin çarpanı (0: beklemeden)
+"""
+
+import asyncio
+import atexit
+import contextlib
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+from modules.llm_backends import LLMBackend, get_backend, set_backend_override
+from modules.llm_client import consume_stream
+
+CASSETTE_MODES = ("record", "replay")
+
+
+class CassetteMissError(LookupError):
+    """Tekrar modunda istenen prompt kayıtta yok (veya kayıttaki tüm yanıtları kullanıldı)."""
+
+
+def prompt_digest(prompt):
+    """Kayıt anahtarı: Prompt'un SHA-256 özetinin ilk 32 karakteri."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:32]
+
+
+def _open_text(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Cassette:
+    """
+    Kayıt dosyası. Thread-safe'tir (eş zamanlı GA istekleri aynı dosyaya yazar).
+    """
+
+    def __init__(self, path, mode="replay"):
+        """
+        Args:
+            path (str): Kayıt dosyasının yolu (".gz" ise sıkıştırılır)
+            mode (str): "record" (dosya baştan yazılır) veya "replay" (dosya okunur)
+
+        Raises:
+            ValueError: Bilinmeyen mod
+            OSError: Tekrar modunda dosya okunamazsa
+        """
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Bilinmeyen kayıt modu: '{mode}'. Seçenekler: {', '.join(CASSETTE_MODES)}")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._entries = {}  # özet -> [kayıt, ...] (kayıt sırasıyla)
+        self._cursors = {}  # özet -> sıradaki kaydın indeksi
+        self._file = None
+
+        # İstatistikler
+        self.recorded = 0
+        self.served = 0
+        self.misses = 0
+
+        if mode == "replay":
+            with _open_text(path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["k"], []).append(entry)
+        else:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._file = _open_text(path, "w")
+
+    def record(self, prompt, text, feedback, tokens, latency):
+        """Bir etkileşimi dosyaya ekler (hemen diske yazılır)."""
+        entry = {"k": prompt_digest(prompt), "r": text, "t": tokens, "l": round(latency, 4)}
+        if feedback is not None:
+            entry["f"] = str(feedback)  # SDK nesneleri JSON'a çevrilemez; metin olarak saklanır
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self.recorded += 1
+
+    def next_entry(self, prompt):
+        """
+        Prompt için sıradaki kaydı döndürür.
+
+        Raises:
+            CassetteMissError: Prompt kayıtta yoksa veya kayıtları tükendiyse
+        """
+        key = prompt_digest(prompt)
+        with self._lock:
+            entries = self._entries.get(key, [])
+            cursor = self._cursors.get(key, 0)
+            if cursor >= len(entries):
+                self.misses += 1
+                raise CassetteMissError(f"Kayıtta bu prompt için yanıt yok (özet: {key}, "
+                                        f"kayıtlı: {len(entries)}, istenen: {cursor + 1}).")
+            self._cursors[key] = cursor + 1
+            self.served += 1
+            return entries[cursor]
+
+    def stats(self):
+        """
+        Returns:
+            dict: mode, recorded, served, misses, prompts (kayıttaki farklı prompt sayısı)
+        """
+        with self._lock:
+            return {"mode": self.mode, "recorded": self.recorded, "served": self.served, "misses": self.misses,
+                    "prompts": len(self._entries)}
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class CassetteBackend(LLMBackend):
+    """
+    Başka bir arka ucu saran kayıt/tekrar katmanı.
+
+    Kayıt modunda istekler sarılan arka uca gider ve sonuçları kaydedilir;
+    tekrar modunda sarılan arka uç hiç çağrılmaz. Prompt önbelleği her iki
+    modda da kullanılmaz (kayıt, çalıştırmadaki tüm çağrıları içermelidir).
+    """
+
+    use_prompt_cache = False
+    # Tekrar modunda ağ yoktur; hız sınırı uygulanmaz
+    REPLAY_RATE_LIMITS = {"rpm": 0, "tpm": 0, "max_inflight": 64}
+
+    def __init__(self, cassette, inner=None, latency_scale=0.0):
+        """
+        Args:
+            cassette (Cassette): Kayıt dosyası
+            inner (LLMBackend): Kayıt modunda isteklerin gönderileceği arka uç
+            latency_scale (float): Tekrar modunda kaydedilen gecikmelerin çarpanı (0: beklemeden)
+        """
+        if cassette.mode == "record" and inner is None:
+            raise ValueError("Kayıt modu için sarılacak bir arka uç gerekli.")
+        super().__init__(getattr(inner, "model", None), getattr(inner, "timeout", None))
+        self.cassette = cassette
+        self.inner = inner
+        self.latency_scale = latency_scale
+        self.name = getattr(inner, "name", None) or "cassette"
+
+    @property
+    def replaying(self):
+        return self.cassette.mode == "replay"
+
+    @property
+    def model_id(self):
+        return self.inner.model_id if self.inner is not None else "cassette"
+
+    @property
+    def rate_limits(self):
+        return self.REPLAY_RATE_LIMITS if self.replaying else self.inner.rate_limits
+
+    def api_keys(self):
+        return ["cassette"] if self.replaying else self.inner.api_keys()
+
+    def _replay(self, prompt, monitor):
+        entry = self.cassette.next_entry(prompt)
+        result = (entry["r"], entry.get("f"), entry.get("t"))
+        if monitor is not None:
+            # Kaydedilen metin akış izleyicisinden geçmiş haliyle saklanır; tek parça olarak verilir
+            return consume_stream(iter([result]), monitor), entry["l"] * self.latency_scale
+        return result, entry["l"] * self.latency_scale
+
+    def complete(self, api_key, prompt, monitor=None):
+        if self.replaying:
+            result, delay = self._replay(prompt, monitor)
+            if delay:
+                time.sleep(delay)
+            return result
+        started = time.perf_counter()
+        result = self.inner.complete(api_key, prompt, monitor)
+        self.cassette.record(prompt, *result, time.perf_counter() - started)
+        return result
+
+    async def acomplete(self, api_key, prompt, monitor=None):
+        if self.replaying:
+            result, delay = self._replay(prompt, monitor)
+            if delay:
+                await asyncio.sleep(delay)
+            return result
+        started = time.perf_counter()
+        result = await self.inner.acomplete(api_key, prompt, monitor)
+        self.cassette.record(prompt, *result, time.perf_counter() - started)
+        return result
+
+
+@contextlib.contextmanager
+def use_cassette(path, mode="replay", backend=None, latency_scale=0.0):
+    """
+    Blok içindeki tüm LLM çağrılarını (generate_test_code_from_gemini, generate_many)
+    kaydeder veya kayıttan tekrar oynatır.
+
+    Örnek:
+        with use_cassette("ga.jsonl.gz", mode="record"):
+            GeneticOptimizer(kaynak, test, seed=42).evolve()
+        with use_cassette("ga.jsonl.gz", mode="replay") as kayit:
+            GeneticOptimizer(kaynak, test, seed=42).evolve()
+        print(kayit.cassette.stats())
+
+    Args:
+        path (str): Kayıt dosyası
+        mode (str): "record" veya "replay"
+        backend (LLMBackend): Kayıt modunda sarılacak arka uç (None ise LLM_BACKEND)
+        latency_scale (float): Tekrar modunda kaydedilen gecikmelerin çarpanı
+
+    Yields:
+        CassetteBackend: Blok süresince varsayılan olan arka uç
+    """
+    cassette = Cassette(path, mode)
+    inner = None if mode == "replay" else (backend or get_backend())
+    wrapper = CassetteBackend(cassette, inner, latency_scale)
+    previous = set_backend_override(wrapper)
+    try:
+        yield wrapper
+    finally:
+        set_backend_override(previous)
+        cassette.close()
+
+
+def cassette_from_env(backend):
+    """
+    LLM_CASSETTE ayarlarına göre arka ucu kayıt/tekrar katmanıyla sarar
+    (llm_backends.get_backend tarafından çağrılır). Kayıt dosyası süreç bitince kapatılır.
+    """
+    cassette = Cassette(os.getenv("LLM_CASSETTE"), os.getenv("LLM_CASSETTE_MODE", "replay"))
+    atexit.register(cassette.close)
+    return CassetteBackend(cassette, backend, float(os.getenv("LLM_CASSETTE_LATENCY", "0")))
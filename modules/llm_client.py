@@ -0,0 +1,642 @@
+"""
+Asenkron LLM İstemcisi ve Hız Sınırlama (Rate Limiting) Modülü
+Bu modül, Gemini'ye giden istekleri API anahtarı başına sınırlar ve
+birden fazla isteği (ör. GA'nın bir neslindeki tüm çocukları) tüm
+anahtarlara dağıtarak eş zamanlı gönderir.
+
+Her API anahtarı için:
+- İstek kovası (Token Bucket): Dakikada en fazla LLM_RPM_PER_KEY istek
+- Token kovası: Dakikada en fazla LLM_TPM_PER_KEY token (girdi + çıktı)
+- Eş zamanlı istek sınırı: Aynı anda en fazla LLM_MAX_INFLIGHT_PER_KEY istek
+
+Sabit 'time.sleep(1)' beklemeleri yerine sadece gerektiği kadar beklenir;
+toplam hız, tanımlı anahtar sayısıyla doğru orantılı artar.
+
+Anahtar sağlığı (KeyManager): Kota hatası (429) alan anahtar, sunucunun
+önerdiği süre (retry-after) veya katlanarak artan süre boyunca soğumaya alınır
+ve bu sürede hiçbir çağıran tarafından denenmez. İstekler her zaman o an
+kullanılabilir en sağlıklı anahtara yönlendirilir.
+
+İstekler Gemini REST API'sine veya OpenAI uyumlu bir HTTP uç noktasına
+(urllib ile) gönderilir; hangisinin kullanılacağını llm_backends belirler.
+GEMINI_API_BASE ortam değişkeniyle adres değiştirilebilir (ör. testlerde yerel
+bir HTTP sunucusu).
+"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# Gemini REST API adresi ve model adı
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-flash-latest")
+
+# Anahtar başına sınırlar (0 veya negatif: sınırsız)
+DEFAULT_RPM_PER_KEY = int(os.getenv("LLM_RPM_PER_KEY", "15"))
+DEFAULT_TPM_PER_KEY = int(os.getenv("LLM_TPM_PER_KEY", "250000"))
+DEFAULT_MAX_INFLIGHT_PER_KEY = int(os.getenv("LLM_MAX_INFLIGHT_PER_KEY", "2"))
+
+# Tek bir HTTP isteği için süre sınırı (saniye)
+DEFAULT_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "120"))
+
+# Token kovasından önceden ayrılan çıktı payı; yanıt gelince gerçek kullanımla düzeltilir
+OUTPUT_TOKEN_ESTIMATE = 1024
+
+# Eş zamanlı istek sınırı doluyken tekrar deneme aralığı (saniye)
+INFLIGHT_POLL_INTERVAL = 0.05
+
+# Kota hatası (429) alan anahtarın soğuma süresi: Sunucu süre önermezse
+# art arda her hatada ikiye katlanır (5, 10, 20, ... en fazla 120 sn)
+KEY_COOLDOWN_BASE = float(os.getenv("LLM_KEY_COOLDOWN_BASE", "5"))
+KEY_COOLDOWN_MAX = float(os.getenv("LLM_KEY_COOLDOWN_MAX", "120"))
+
+# Tüm anahtarlar soğumadayken bir isteğin en fazla bekleyeceği süre (saniye)
+MAX_QUOTA_WAIT = float(os.getenv("LLM_MAX_QUOTA_WAIT", "60"))
+
+
+def estimate_tokens(text):
+    """
+    Metnin token sayısını kabaca tahmin eder (yaklaşık 4 karakter = 1 token).
+
+    Args:
+        text (str): Prompt metni
+
+    Returns:
+        int: Tahmini token sayısı
+    """
+    return max(1, len(text or "") // 4)
+
+
+class LLMHTTPError(Exception):
+    """
+    LLM API'sinin HTTP hatası. Kota hatalarında (429) 'retry_after'
+    sunucunun önerdiği bekleme süresini (saniye) taşır.
+    """
+
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(f"{status} {message}")
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def is_quota(self):
+        """HTTP 429 veya RESOURCE_EXHAUSTED: Anahtarın kotası dolmuş."""
+        return self.status == 429 or "RESOURCE_EXHAUSTED" in str(self)
+
+
+class TokenBucket:
+    """
+    Dakikalık kapasiteye sahip, sürekli dolan token kovası.
+
+    Kova en fazla 'rate_per_minute' token tutar ve saniyede rate/60 token dolar.
+    Kilit içermez; eş zamanlı erişim KeyRateLimiter tarafından korunur.
+    """
+
+    def __init__(self, rate_per_minute, clock=time.monotonic):
+        self.unlimited = not rate_per_minute or rate_per_minute <= 0
+        self.capacity = float(rate_per_minute or 0)
+        self.refill_per_sec = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_sec)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """
+        'amount' token harcayabilmek için beklenmesi gereken süreyi döndürür.
+
+        Kapasiteden büyük istekler kapasiteye indirilir (aksi halde hiç geçemezdi).
+
+        Returns:
+            float: Saniye cinsinden bekleme (0: hemen harcanabilir)
+        """
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_sec
+
+    def consume(self, amount):
+        """Token harcar. Negatif miktar iade anlamına gelir (kapasiteyi aşmaz)."""
+        if self.unlimited:
+            return
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - min(amount, self.capacity))
+
+
+class KeyRateLimiter:
+    """
+    Tek bir API anahtarının istek/token kovaları, eş zamanlı istek sayacı
+    ve sağlık durumu (kota hatası sonrası soğuma süresi, istatistikler).
+
+    Thread-safe'tir; aynı anahtar hem senkron hem asenkron yoldan kullanılabilir.
+    """
+
+    def __init__(self, rpm=None, tpm=None, max_inflight=None, clock=time.monotonic):
+        self.requests = TokenBucket(DEFAULT_RPM_PER_KEY if rpm is None else rpm, clock)
+        self.tokens = TokenBucket(DEFAULT_TPM_PER_KEY if tpm is None else tpm, clock)
+        self.max_inflight = max(1, DEFAULT_MAX_INFLIGHT_PER_KEY if max_inflight is None else max_inflight)
+        self.inflight = 0
+        self.clock = clock
+        # Sağlık durumu: Kota hatası alan anahtar 'cooldown_until' anına kadar kullanılmaz
+        self.cooldown_until = 0.0
+        self.consecutive_failures = 0
+        self.stats = {"requests": 0, "successes": 0, "quota_errors": 0, "errors": 0, "total_latency": 0.0}
+        self._lock = threading.Lock()
+
+    def cooldown_remaining(self):
+        """Soğuma süresinin bitmesine kalan süre (saniye, 0: kullanılabilir)."""
+        return max(0.0, self.cooldown_until - self.clock())
+
+    def health_rank(self):
+        """
+        Anahtar seçiminde kullanılan sıralama değeri (küçük olan daha sağlıklı):
+        önce art arda alınan hata sayısı, sonra doluluk oranı.
+        """
+        return self.consecutive_failures, self.inflight / self.max_inflight
+
+    def try_acquire(self, tokens):
+        """
+        Yer varsa bir istek ve 'tokens' kadar token ayırır.
+
+        Returns:
+            float: 0.0 ise ayrıldı; aksi halde tekrar denemeden önce beklenecek süre
+        """
+        with self._lock:
+            cooldown = self.cooldown_remaining()
+            if cooldown > 0:
+                return cooldown
+            if self.inflight >= self.max_inflight:
+                return INFLIGHT_POLL_INTERVAL
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if wait > 0:
+                return wait
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+            self.inflight += 1
+            self.stats["requests"] += 1
+            return 0.0
+
+    def release(self, reserved_tokens=0, used_tokens=None, outcome="ok", retry_after=None, latency=None):
+        """
+        İsteği tamamlar ve sonucunu anahtarın sağlık durumuna işler.
+
+        Gerçek token kullanımı biliniyorsa ayrılan miktarla arasındaki fark
+        kovadan düşülür (veya iade edilir). Kota hatasında anahtar soğumaya
+        alınır: Sunucu bir bekleme süresi önerdiyse (retry-after) o kadar,
+        aksi halde art arda hata sayısıyla katlanarak artan süre kadar.
+
+        Args:
+            reserved_tokens (int): try_acquire ile ayrılan token miktarı
+            used_tokens (int): Yanıttaki gerçek token kullanımı (bilinmiyorsa None)
+            outcome (str): "ok", "quota" (429) veya "error"
+            retry_after (float): Sunucunun önerdiği bekleme (saniye)
+            latency (float): İsteğin süresi (saniye)
+        """
+        with self._lock:
+            self.inflight = max(0, self.inflight - 1)
+            if used_tokens is not None:
+                self.tokens.consume(used_tokens - reserved_tokens)
+            if latency is not None:
+                self.stats["total_latency"] += latency
+
+            if outcome == "ok":
+                self.stats["successes"] += 1
+                self.consecutive_failures = 0
+            elif outcome == "quota":
+                self.stats["quota_errors"] += 1
+                self.consecutive_failures += 1
+                backoff = min(KEY_COOLDOWN_MAX, KEY_COOLDOWN_BASE * 2 ** (self.consecutive_failures - 1))
+                delay = min(KEY_COOLDOWN_MAX, retry_after) if retry_after else backoff
+                self.cooldown_until = max(self.cooldown_until, self.clock() + delay)
+            else:
+                self.stats["errors"] += 1
+
+    def snapshot(self):
+        """Anahtarın anlık istatistikleri (arayüz/log için)."""
+        with self._lock:
+            completed = self.stats["successes"] + self.stats["quota_errors"] + self.stats["errors"]
+            return {
+                **{k: v for k, v in self.stats.items() if k != "total_latency"},
+                "avg_latency": round(self.stats["total_latency"] / completed, 3) if completed else None,
+                "inflight": self.inflight,
+                "consecutive_failures": self.consecutive_failures,
+                "cooldown_remaining": round(self.cooldown_remaining(), 1),
+            }
+
+
+class KeyManager:
+    """
+    Süreç genelinde API anahtarlarının sınırlayıcılarını ve sağlık durumlarını tutar.
+
+    Tüm çağıranlar (ajan, GA, arayüz) aynı kotayı ve aynı "hangi anahtar
+    kotasını doldurdu" bilgisini paylaşır; ölü olduğu bilinen anahtar
+    soğuma süresi bitene kadar tekrar denenmez.
+    """
+
+    def __init__(self):
+        self._limiters = {}
+        self._lock = threading.Lock()
+        self._next_slot = 0
+
+    def limiter(self, api_key, limits=None):
+        """
+        Anahtarın sınırlayıcısını döndürür (ilk çağrıda oluşturulur).
+
+        Args:
+            limits (dict): İlk oluşturmada kullanılacak rpm/tpm/max_inflight (None ise varsayılanlar)
+        """
+        with self._lock:
+            limiter = self._limiters.get(api_key)
+            if limiter is None:
+                limiter = KeyRateLimiter(**(limits or {}))
+                self._limiters[api_key] = limiter
+            return limiter
+
+    def next_slot(self):
+        """Eşit sağlıktaki anahtarlar arasında sırayla dağıtmak için artan sayaç."""
+        with self._lock:
+            self._next_slot += 1
+            return self._next_slot
+
+    def stats(self):
+        """
+        Anahtar başına istatistikler. Anahtarlar maskelenir (sadece son 4 karakter).
+
+        Returns:
+            list: Her anahtar için istatistik sözlüğü (tanımlanma sırasıyla)
+        """
+        with self._lock:
+            items = list(self._limiters.items())
+        return [{"key": f"...{key[-4:]}", **limiter.snapshot()} for key, limiter in items]
+
+    def reset(self):
+        """Tüm anahtar durumlarını siler (ör. yeni anahtarlar yüklendiğinde)."""
+        with self._lock:
+            self._limiters.clear()
+
+
+_KEY_MANAGER = None
+_KEY_MANAGER_LOCK = threading.Lock()
+
+
+def get_key_manager():
+    """
+    Süreç genelindeki tekil KeyManager örneğini döndürür.
+    """
+    global _KEY_MANAGER
+    with _KEY_MANAGER_LOCK:
+        if _KEY_MANAGER is None:
+            _KEY_MANAGER = KeyManager()
+        return _KEY_MANAGER
+
+
+def parse_retry_after(message):
+    """
+    SDK hata mesajındaki önerilen bekleme süresini bulur
+    ("Please retry in 17.2s" veya "retry_delay { seconds: 17 }").
+
+    Returns:
+        float: Saniye cinsinden bekleme veya bulunamazsa None
+    """
+    match = re.search(r"retry in ([\d.]+)\s*s", message or "", re.IGNORECASE) or \
+        re.search(r"retry_delay\s*\{\s*seconds:\s*(\d+)", message or "")
+    return float(match.group(1)) if match else None
+
+
+class RateLimiterPool:
+    """
+    Bir anahtar listesinin sınırlayıcıları üzerinde, o an kullanılabilir
+    anahtarlar arasından en sağlıklısını seçen havuz.
+    """
+
+    def __init__(self, api_keys, limiters=None, limits=None):
+        self.api_keys = list(api_keys)
+        if limiters is None:
+            manager = get_key_manager()
+            limiters = [manager.limiter(k, limits) for k in self.api_keys]
+        self.limiters = list(limiters)
+
+    def try_acquire(self, tokens, start=0):
+        """
+        Kullanılabilir anahtarlar arasından en sağlıklısını ayırır. Sağlığı eşit
+        anahtarlar 'start' sırasından başlayarak denenir (yük anahtarlara yayılır).
+
+        Args:
+            tokens (int): Ayrılacak token miktarı
+            start (int): Eşitlik durumunda ilk denenecek anahtarın sırası
+
+        Returns:
+            tuple: (anahtar_indeksi, 0.0) veya yer yoksa (None, en_kısa_bekleme)
+        """
+        count = len(self.limiters)
+        order = sorted(range(count), key=lambda i: (self.limiters[i].health_rank(), (i - start) % count))
+        shortest = None
+        for index in order:
+            wait = self.limiters[index].try_acquire(tokens)
+            if wait == 0.0:
+                return index, 0.0
+            shortest = wait if shortest is None else min(shortest, wait)
+        return None, shortest
+
+    def acquire(self, tokens, start=0, max_wait=None):
+        """
+        Yer açılana kadar bekleyerek (bloklayarak) bir anahtar ayırır.
+
+        Args:
+            max_wait (float): En fazla bekleme (saniye, None ise MAX_QUOTA_WAIT).
+                Tüm anahtarlar bundan uzun süre soğumadaysa beklenmez.
+
+        Returns:
+            int: Anahtar indeksi veya süre içinde yer açılmayacaksa None
+        """
+        deadline = time.monotonic() + (MAX_QUOTA_WAIT if max_wait is None else max_wait)
+        while True:
+            index, wait = self.try_acquire(tokens, start)
+            if index is not None:
+                return index
+            if time.monotonic() + wait > deadline:
+                return None
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens, start=0, max_wait=None):
+        """acquire() ile aynı; bekleme event loop'u bloklamadan yapılır."""
+        deadline = time.monotonic() + (MAX_QUOTA_WAIT if max_wait is None else max_wait)
+        while True:
+            index, wait = self.try_acquire(tokens, start)
+            if index is not None:
+                return index
+            if time.monotonic() + wait > deadline:
+                return None
+            await asyncio.sleep(wait)
+
+    def release(self, index, reserved_tokens=0, used_tokens=None, outcome="ok", retry_after=None, latency=None):
+        self.limiters[index].release(reserved_tokens, used_tokens, outcome, retry_after, latency)
+
+
+def _retry_after_seconds(headers):
+    value = headers.get("Retry-After") if headers else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _gemini_request(api_key, prompt, safety_settings, base_url, model, stream):
+    method = "streamGenerateContent" if stream else "generateContent"
+    query = {"key": api_key, **({"alt": "sse"} if stream else {})}
+    url = (f"{(base_url or GEMINI_API_BASE).rstrip('/')}/v1beta/models/{model or GEMINI_MODEL}:{method}"
+           f"?{urllib.parse.urlencode(query)}")
+    body = {"contents": [{"parts": [{"text": prompt}]}]}
+    if safety_settings:
+        body["safetySettings"] = safety_settings
+    return urllib.request.Request(url, data=json.dumps(body).encode("utf-8"),
+                                  headers={"Content-Type": "application/json"}, method="POST")
+
+
+def _open(request, timeout):
+    try:
+        return urllib.request.urlopen(request, timeout=timeout or DEFAULT_HTTP_TIMEOUT)
+    except urllib.error.HTTPError as e:
+        detail = e.read().decode("utf-8", "replace")[:500]
+        raise LLMHTTPError(e.code, detail, _retry_after_seconds(e.headers)) from None
+
+
+def _payload_text(payload):
+    candidates = payload.get("candidates") or []
+    parts = ((candidates[0].get("content") or {}).get("parts") or []) if candidates else []
+    return "".join(part.get("text", "") for part in parts)
+
+
+def gemini_rest_generate(api_key, prompt, safety_settings=None, base_url=None, model=None, timeout=None):
+    """
+    Gemini REST API'sine tek bir generateContent isteği gönderir (bloklayan çağrı).
+
+    Args:
+        api_key (str): API anahtarı
+        prompt (str): Tam prompt
+        safety_settings (list): Güvenlik ayarları
+        base_url (str): API adresi (None ise GEMINI_API_BASE)
+        model (str): Model adı (None ise GEMINI_MODEL)
+        timeout (float): HTTP süre sınırı (None ise DEFAULT_HTTP_TIMEOUT)
+
+    Returns:
+        tuple: (metin, prompt_feedback, toplam_token) - Yanıt boşsa metin None olur
+
+    Raises:
+        LLMHTTPError: HTTP hata kodu döndüğünde
+    """
+    request = _gemini_request(api_key, prompt, safety_settings, base_url, model, stream=False)
+    with _open(request, timeout) as response:
+        payload = json.loads(response.read().decode("utf-8"))
+
+    total_tokens = (payload.get("usageMetadata") or {}).get("totalTokenCount")
+    return (_payload_text(payload) or None), payload.get("promptFeedback"), total_tokens
+
+
+def gemini_rest_stream(api_key, prompt, safety_settings=None, base_url=None, model=None, timeout=None):
+    """
+    Gemini REST API'sinden yanıtı akış halinde (Server-Sent Events) okur.
+
+    Üreteç (generator) kapatıldığında (ör. kapanış ``` satırı geldiğinde)
+    HTTP bağlantısı da kapatılır; yanıtın geri kalanı indirilmez.
+
+    Args:
+        gemini_rest_generate ile aynı
+
+    Yields:
+        tuple: (metin_parçası, prompt_feedback, toplam_token) - Token sayısı son parçalarda gelir
+
+    Raises:
+        LLMHTTPError: HTTP hata kodu döndüğünde
+    """
+    request = _gemini_request(api_key, prompt, safety_settings, base_url, model, stream=True)
+    with _open(request, timeout) as response:
+        for raw in response:
+            line = raw.decode("utf-8").strip()
+            if not line.startswith("data:"):
+                continue
+            payload = json.loads(line[len("data:"):].strip())
+            total_tokens = (payload.get("usageMetadata") or {}).get("totalTokenCount")
+            yield _payload_text(payload), payload.get("promptFeedback"), total_tokens
+
+
+def _openai_request(api_key, prompt, base_url, model, stream):
+    body = {"model": model, "messages": [{"role": "user", "content": prompt}], "stream": stream}
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"  # Yerel sunucular genelde anahtar istemez
+    return urllib.request.Request(f"{base_url.rstrip('/')}/chat/completions", data=json.dumps(body).encode("utf-8"),
+                                  headers=headers, method="POST")
+
+
+def openai_rest_generate(api_key, prompt, base_url, model, timeout=None):
+    """
+    OpenAI uyumlu bir uç noktaya (/chat/completions) tek istek gönderir.
+    vLLM, llama.cpp, Ollama gibi yerel sunucular veya sahte sunucular için.
+
+    Args:
+        api_key (str): API anahtarı (boşsa Authorization başlığı gönderilmez)
+        prompt (str): Tam prompt
+        base_url (str): API adresi (ör. http://localhost:8000/v1)
+        model (str): Model adı
+        timeout (float): HTTP süre sınırı (None ise DEFAULT_HTTP_TIMEOUT)
+
+    Returns:
+        tuple: (metin, None, toplam_token) - gemini_rest_generate ile aynı biçim
+
+    Raises:
+        LLMHTTPError: HTTP hata kodu döndüğünde
+    """
+    with _open(_openai_request(api_key, prompt, base_url, model, stream=False), timeout) as response:
+        payload = json.loads(response.read().decode("utf-8"))
+
+    choices = payload.get("choices") or []
+    text = ((choices[0].get("message") or {}).get("content") if choices else None) or None
+    return text, None, (payload.get("usage") or {}).get("total_tokens")
+
+
+def openai_rest_stream(api_key, prompt, base_url, model, timeout=None):
+    """
+    OpenAI uyumlu uç noktadan yanıtı akış halinde (Server-Sent Events) okur.
+
+    Yields:
+        tuple: (metin_parçası, None, toplam_token)
+
+    Raises:
+        LLMHTTPError: HTTP hata kodu döndüğünde
+    """
+    with _open(_openai_request(api_key, prompt, base_url, model, stream=True), timeout) as response:
+        for raw in response:
+            line = raw.decode("utf-8").strip()
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            payload = json.loads(data)
+            choices = payload.get("choices") or []
+            text = ((choices[0].get("delta") or {}).get("content") if choices else None) or ""
+            yield text, None, (payload.get("usage") or {}).get("total_tokens")
+
+
+def consume_stream(chunks, monitor):
+    """
+    Akış parçalarını izleyiciye (CodeStreamMonitor) verir; izleyici durdurmak
+    isterse akışı kapatır.
+
+    Args:
+        chunks: (metin, prompt_feedback, toplam_token) üreten üreteç
+        monitor: feed(metin) -> bool ve finish() metotları olan izleyici
+
+    Returns:
+        tuple: (metin, prompt_feedback, toplam_token)
+    """
+    feedback = total_tokens = None
+    try:
+        for text, chunk_feedback, chunk_tokens in chunks:
+            feedback = chunk_feedback or feedback
+            total_tokens = chunk_tokens or total_tokens
+            if not monitor.feed(text):
+                break
+        else:
+            monitor.finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+    return (monitor.text or None), feedback, total_tokens
+
+
+class AsyncLLMClient:
+    """
+    Birden fazla isteği tüm API anahtarlarına dağıtarak eş zamanlı gönderen istemci.
+
+    İstekler bir arka uca (llm_backends: Gemini, OpenAI uyumlu, sahte) gönderilir;
+    bekleme (rate limit) event loop üzerinde yapılır. Kota hatası (429) alan
+    anahtar soğumaya alınır ve istek en sağlıklı anahtarla tekrarlanır.
+    """
+
+    def __init__(self, api_keys, safety_settings=None, base_url=None, model=None, timeout=None, pool=None,
+                 backend=None):
+        """
+        Args:
+            backend (LLMBackend): İsteklerin gönderileceği arka uç. None ise verilen
+                safety_settings/base_url/model/timeout ile Gemini REST arka ucu kullanılır.
+        """
+        if backend is None:
+            from modules.llm_backends import GeminiBackend  # llm_backends bu modülü içe aktarır (döngüsel import)
+            backend = GeminiBackend(model=model, safety_settings=safety_settings, base_url=base_url, timeout=timeout)
+        self.backend = backend
+        self.api_keys = list(api_keys)
+        self.model = backend.model_id
+        self.pool = pool or RateLimiterPool(self.api_keys, limits=backend.rate_limits)
+
+    async def generate(self, prompt, slot=0, monitor=None, trace=None):
+        """
+        Tek bir prompt için yanıt üretir.
+
+        Args:
+            prompt (str): Tam prompt
+            slot (int): İlk denenecek anahtarın sırası (eş zamanlı istekleri anahtarlara yaymak için)
+            monitor (CodeStreamMonitor): Verilirse yanıt akış halinde okunur ve izleyici
+                durdurduğunda (kapanış ``` veya sözdizimi hatası) bağlantı kesilir
+            trace (LLMCallTrace): Verilirse bekleme ve deneme süreleri buna işlenir
+                (kaydı çağıran finish() ile yayınlar)
+
+        Returns:
+            tuple: (metin, prompt_feedback) - Yanıt boşsa metin None olur
+
+        Raises:
+            LLMHTTPError: Kota dışı HTTP hatası veya tüm denemelerde kota hatası
+        """
+        reserved = estimate_tokens(prompt) + OUTPUT_TOKEN_ESTIMATE
+        last_error = LLMHTTPError(429, "Tüm API anahtarları soğumada (kota dolu).")
+        # Toplam anahtar sayısının 3 katı kadar deneme (senkron yol ile aynı)
+        for attempt in range(len(self.api_keys) * 3):
+            waiting = time.perf_counter()
+            index = await self.pool.acquire_async(reserved, start=slot + attempt)
+            if trace is not None:
+                trace.waited(time.perf_counter() - waiting)
+            if index is None:
+                break
+            used, outcome, retry_after = None, "error", None
+            started = time.perf_counter()
+            if trace is not None:
+                trace.attempt(index)
+            try:
+                text, feedback, used = await self.backend.acomplete(self.api_keys[index], prompt, monitor)
+                outcome = "ok"
+                if trace is not None:
+                    trace.attempt_done(used, monitor)
+                return text, feedback
+            except LLMHTTPError as e:
+                if not e.is_quota:
+                    raise
+                last_error, outcome, retry_after = e, "quota", e.retry_after
+                print(f"⚠️ Anahtar {index + 1} kotası doldu! Soğumaya alındı, başka anahtara geçiliyor... (Hata: 429)")
+            finally:
+                self.pool.release(index, reserved, used, outcome, retry_after, time.perf_counter() - started)
+                if trace is not None:
+                    trace.attempt_done()
+        raise last_error
+
+    async def generate_many(self, prompts):
+        """
+        Tüm prompt'ları eş zamanlı gönderir; sonuçlar girdi sırasıyla döner.
+        Hata veren istekler için sonuç listesinde exception nesnesi bulunur.
+        """
+        return await asyncio.gather(*(self.generate(p, slot=i) for i, p in enumerate(prompts)),
+                                    return_exceptions=True)
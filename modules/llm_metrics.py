@@ -0,0 +1,434 @@
+"""
+LLM Çağrı Ölçüm (Instrumentation) Modülü
+Bu modül, her LLM çağrısının (generate_test_code_from_gemini, agenerate_test_code,
+generate_many) sürelerini ve sonucunu kaydeder:
+
+- queue_wait: Hız sınırı / kota soğuması nedeniyle anahtar beklenen toplam süre
+- ttfb: İsteğin gönderilmesinden ilk yanıt parçasının gelmesine kadar geçen süre
+  (akış kapalıysa yanıtın tamamının geldiği an)
+- latency: Son denemenin (yanıtı veren isteğin) süresi
+- llm_seconds: Tüm denemelerin (429 alanlar dahil) toplam süresi
+- total: Çağrının toplam süresi (bekleme + denemeler)
+- input_tokens / output_tokens: Tahmini token sayıları (estimate_tokens);
+  total_tokens: Sunucunun bildirdiği toplam (bilinmiyorsa None)
+- key_index, attempts, retries (kota nedeniyle tekrar sayısı) ve outcome
+
+Kayıtlar bir veya daha fazla hedefe (sink) yazılır:
+- RingBufferSink: Bellekteki son N kayıt (her zaman açık; arayüz için)
+- JSONLSink: Satır başına bir JSON kaydı (LLM_METRICS_PATH)
+- PrometheusSink: Prometheus metin formatında sayaç ve histogramlar;
+  LLM_METRICS_PORT verilirse /metrics adresinden sunulur
+
+capture_llm_calls() bloğu içindeki çağrıların kayıtları ayrıca bir listeye
+toplanır; ajan ve GA bunları adım/nesil başına özetler (summarize_llm_calls).
+"""
+
+import collections
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from modules.llm_client import estimate_tokens
+
+# Bellekte tutulacak son kayıt sayısı
+DEFAULT_BUFFER_SIZE = int(os.getenv("LLM_METRICS_BUFFER", "1000"))
+
+# Boş değilse kayıtlar bu JSONL dosyasına eklenir
+DEFAULT_METRICS_PATH = os.getenv("LLM_METRICS_PATH", "")
+
+# Boş değilse Prometheus metinleri bu porttan sunulur (ör. 9464)
+DEFAULT_METRICS_PORT = os.getenv("LLM_METRICS_PORT", "")
+
+# Prometheus histogram sınırları (saniye)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Kayıt sonuçları: ok, cached (prompt önbelleği), empty (boş/filtrelenmiş yanıt), aborted (akış
+# sözdizimi hatasıyla kesildi), quota (tüm denemeler kota hatası), error, no_keys
+OUTCOMES = ("ok", "cached", "empty", "aborted", "quota", "error", "no_keys")
+
+# Etkin capture_llm_calls() listeleri (asyncio görevleri ve to_thread bağlamı kopyalar)
+_ACTIVE_CAPTURES = contextvars.ContextVar("llm_call_captures", default=())
+
+
+class RingBufferSink:
+    """Son 'maxlen' kaydı bellekte tutan hedef."""
+
+    def __init__(self, maxlen=None):
+        self._records = collections.deque(maxlen=DEFAULT_BUFFER_SIZE if maxlen is None else maxlen)
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def records(self):
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+class JSONLSink:
+    """Kayıtları satır başına bir JSON nesnesi olarak dosyaya ekleyen hedef."""
+
+    def __init__(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+class PrometheusSink:
+    """
+    Kayıtları Prometheus sayaç ve histogramlarına dönüştüren hedef.
+
+    Metrikler:
+        llm_calls_total{backend,outcome}, llm_retries_total{backend},
+        llm_tokens_total{backend,direction}, llm_queue_wait_seconds{backend},
+        llm_ttfb_seconds{backend}, llm_latency_seconds{backend}
+    """
+
+    HISTOGRAMS = (("llm_queue_wait_seconds", "queue_wait", "Anahtar (hız sınırı/kota) bekleme süresi"),
+                  ("llm_ttfb_seconds", "ttfb", "İlk yanıt parçasına kadar geçen süre"),
+                  ("llm_latency_seconds", "latency", "Yanıtı veren isteğin süresi"))
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._calls = collections.Counter()    # (backend, outcome) -> adet
+        self._retries = collections.Counter()  # backend -> adet
+        self._tokens = collections.Counter()   # (backend, direction) -> adet
+        self._histograms = {}                  # (metrik, backend) -> _Histogram
+        self._server = None
+
+    def write(self, record):
+        backend = record.get("backend") or "unknown"
+        with self._lock:
+            self._calls[(backend, record.get("outcome"))] += 1
+            self._retries[backend] += record.get("retries") or 0
+            self._tokens[(backend, "input")] += record.get("input_tokens") or 0
+            self._tokens[(backend, "output")] += record.get("output_tokens") or 0
+            for metric, field, _ in self.HISTOGRAMS:
+                if record.get(field) is not None:
+                    key = (metric, backend)
+                    if key not in self._histograms:
+                        self._histograms[key] = _Histogram(self.buckets)
+                    self._histograms[key].observe(record[field])
+
+    def render(self):
+        """
+        Returns:
+            str: Prometheus metin formatı (text/plain; version=0.0.4)
+        """
+        with self._lock:
+            lines = ["# HELP llm_calls_total LLM çağrı sayısı (sonuca göre)", "# TYPE llm_calls_total counter"]
+            lines += [f"llm_calls_total{{{_labels(backend=b, outcome=o)}}} {n}"
+                      for (b, o), n in sorted(self._calls.items())]
+            lines += ["# HELP llm_retries_total Kota hatası nedeniyle tekrarlanan istek sayısı",
+                      "# TYPE llm_retries_total counter"]
+            lines += [f"llm_retries_total{{{_labels(backend=b)}}} {n}" for b, n in sorted(self._retries.items())]
+            lines += ["# HELP llm_tokens_total Tahmini token sayısı", "# TYPE llm_tokens_total counter"]
+            lines += [f"llm_tokens_total{{{_labels(backend=b, direction=d)}}} {n}"
+                      for (b, d), n in sorted(self._tokens.items())]
+            for metric, _, description in self.HISTOGRAMS:
+                lines += [f"# HELP {metric} {description}", f"# TYPE {metric} histogram"]
+                for (name, backend), histogram in sorted(self._histograms.items()):
+                    if name != metric:
+                        continue
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f"{metric}_bucket{{{_labels(backend=backend, le=bound)}}} {count}")
+                    lines.append(f"{metric}_bucket{{{_labels(backend=backend, le='+Inf')}}} {histogram.count}")
+                    lines.append(f"{metric}_sum{{{_labels(backend=backend)}}} {round(histogram.sum, 6)}")
+                    lines.append(f"{metric}_count{{{_labels(backend=backend)}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="0.0.0.0"):
+        """
+        Metinleri arka planda bir HTTP sunucusundan (/metrics) sunar.
+
+        Returns:
+            ThreadingHTTPServer: Çalışan sunucu (durdurmak için shutdown())
+
+        Raises:
+            OSError: Port kullanımdaysa
+        """
+        sink = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = sink.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # Her istek için konsola yazılmaz
+
+        self._server = ThreadingHTTPServer((host, int(port)), _Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+
+class LLMMetrics:
+    """
+    Kayıtları tüm hedeflere dağıtan merkez. Bir hedefin hatası LLM çağrısını
+    etkilemez (kayıt o hedefe yazılmadan geçilir).
+    """
+
+    def __init__(self, sinks=None, buffer_size=None):
+        self.buffer = RingBufferSink(buffer_size)
+        self._sinks = [self.buffer] + list(sinks or [])
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink):
+        with self._lock:
+            self._sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink):
+        with self._lock:
+            if sink in self._sinks:
+                self._sinks.remove(sink)
+
+    def emit(self, record):
+        with self._lock:
+            sinks = list(self._sinks)
+        for sink in sinks:
+            try:
+                sink.write(record)
+            except Exception:
+                pass
+        for captured in _ACTIVE_CAPTURES.get():
+            captured.append(record)
+
+    def recent(self, limit=None):
+        """Bellekteki son kayıtlar (eskiden yeniye)."""
+        records = self.buffer.records()
+        return records[-limit:] if limit else records
+
+    def summary(self):
+        """Bellekteki kayıtların özeti (summarize_llm_calls)."""
+        return summarize_llm_calls(self.buffer.records())
+
+
+_METRICS = None
+_METRICS_LOCK = threading.Lock()
+
+
+def get_llm_metrics():
+    """
+    Süreç genelindeki tekil LLMMetrics örneğini döndürür. İlk çağrıda
+    LLM_METRICS_PATH ve LLM_METRICS_PORT ayarlarına göre hedefler eklenir.
+    """
+    global _METRICS
+    with _METRICS_LOCK:
+        if _METRICS is None:
+            _METRICS = LLMMetrics()
+            if DEFAULT_METRICS_PATH:
+                try:
+                    _METRICS.add_sink(JSONLSink(DEFAULT_METRICS_PATH))
+                except OSError as e:
+                    print(f"⚠️ LLM ölçüm dosyası açılamadı ({DEFAULT_METRICS_PATH}): {e}")
+            if DEFAULT_METRICS_PORT:
+                prometheus = _METRICS.add_sink(PrometheusSink())
+                try:
+                    prometheus.serve(int(DEFAULT_METRICS_PORT))
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Prometheus ölçüm sunucusu başlatılamadı (port {DEFAULT_METRICS_PORT}): {e}")
+        return _METRICS
+
+
+@contextlib.contextmanager
+def capture_llm_calls():
+    """
+    Blok içinde (aynı thread'de veya bloktan başlatılan asyncio görevlerinde)
+    tamamlanan LLM çağrılarının kayıtlarını toplar.
+
+    Örnek:
+        with capture_llm_calls() as calls:
+            generate_test_code_from_gemini(prompt)
+        summarize_llm_calls(calls)
+
+    Yields:
+        list: Kayıtların ekleneceği liste
+    """
+    calls = []
+    token = _ACTIVE_CAPTURES.set(_ACTIVE_CAPTURES.get() + (calls,))
+    try:
+        yield calls
+    finally:
+        _ACTIVE_CAPTURES.reset(token)
+
+
+def summarize_llm_calls(records):
+    """
+    Kayıtları tek bir özet sözlüğe indirger (ajan adımı / GA nesli için).
+
+    Returns:
+        dict: calls, cached, failed, retries, queue_wait, llm_seconds, avg_ttfb,
+            max_latency, input_tokens, output_tokens (süreler saniye)
+    """
+    records = list(records)
+    ttfbs = [r["ttfb"] for r in records if r.get("ttfb") is not None]
+    latencies = [r["latency"] for r in records if r.get("latency") is not None]
+    return {
+        "calls": len(records),
+        "cached": sum(1 for r in records if r.get("outcome") == "cached"),
+        "failed": sum(1 for r in records if r.get("outcome") in ("quota", "error", "no_keys", "aborted")),
+        "retries": sum(r.get("retries") or 0 for r in records),
+        "queue_wait": round(sum(r.get("queue_wait") or 0.0 for r in records), 3),
+        "llm_seconds": round(sum(r.get("llm_seconds") or 0.0 for r in records), 3),
+        "avg_ttfb": round(sum(ttfbs) / len(ttfbs), 3) if ttfbs else None,
+        "max_latency": round(max(latencies), 3) if latencies else None,
+        "input_tokens": sum(r.get("input_tokens") or 0 for r in records),
+        "output_tokens": sum(r.get("output_tokens") or 0 for r in records),
+    }
+
+
+def _round(value):
+    return round(value, 4) if value is not None else None
+
+
+class LLMCallTrace:
+    """
+    Tek bir mantıksal LLM çağrısının (anahtar beklemeleri ve kota tekrarları dahil)
+    ölçümü. Çağıran, her denemede waited()/attempt()/attempt_done() ile süreleri
+    işler ve sonunda finish() ile kaydı yayınlar.
+    """
+
+    def __init__(self, backend, prompt, metrics=None):
+        """
+        Args:
+            backend (LLMBackend): İsteğin gönderildiği arka uç
+            prompt (str): Tam prompt (girdi token tahmini için)
+            metrics (LLMMetrics): Kaydın yayınlanacağı merkez (None ise get_llm_metrics())
+        """
+        self.metrics = metrics
+        self.backend = getattr(backend, "name", None)
+        self.model = getattr(backend, "model_id", None)
+        self.input_tokens = estimate_tokens(prompt)
+        self.started = time.perf_counter()
+        self.queue_wait = 0.0
+        self.llm_seconds = 0.0
+        self.attempts = 0
+        self.key_index = None
+        self.ttfb = None
+        self.latency = None
+        self.total_tokens = None
+        self.record = None
+        self._attempt_started = None
+
+    def waited(self, seconds):
+        """Anahtar ayırmak için beklenen süreyi ekler."""
+        self.queue_wait += seconds
+
+    def attempt(self, key_index):
+        """Seçilen anahtarla yeni bir isteğin başladığını işler."""
+        self.attempts += 1
+        self.key_index = key_index
+        self._attempt_started = time.perf_counter()
+
+    def attempt_done(self, total_tokens=None, monitor=None):
+        """
+        Açık denemeyi kapatır (zaten kapalıysa bir şey yapmaz).
+
+        Args:
+            total_tokens (int): Sunucunun bildirdiği toplam token
+            monitor (CodeStreamMonitor): Akış izleyicisi (ilk parçanın geldiği an için)
+        """
+        if self._attempt_started is None:
+            return
+        now = time.perf_counter()
+        self.latency = now - self._attempt_started
+        self.llm_seconds += self.latency
+        first_chunk = getattr(monitor, "first_chunk_at", None)
+        self.ttfb = first_chunk - self._attempt_started if first_chunk else self.latency
+        self.total_tokens = total_tokens if total_tokens is not None else self.total_tokens
+        self._attempt_started = None
+
+    def finish(self, outcome, text=None, total_tokens=None, monitor=None):
+        """
+        Çağrıyı sonlandırır ve kaydı yayınlar.
+
+        Args:
+            outcome (str): OUTCOMES değerlerinden biri
+            text (str): Yanıt metni (çıktı token tahmini için)
+
+        Returns:
+            dict: Yayınlanan kayıt
+        """
+        self.attempt_done(total_tokens, monitor)
+        self.record = {
+            "ts": round(time.time(), 3),
+            "backend": self.backend,
+            "model": self.model,
+            "outcome": outcome,
+            "key_index": self.key_index,
+            "attempts": self.attempts,
+            "retries": max(0, self.attempts - 1),
+            "queue_wait": _round(self.queue_wait),
+            "ttfb": _round(self.ttfb),
+            "latency": _round(self.latency),
+            "llm_seconds": _round(self.llm_seconds),
+            "total": _round(time.perf_counter() - self.started),
+            "input_tokens": self.input_tokens,
+            "output_tokens": estimate_tokens(text) if text else 0,
+            "total_tokens": self.total_tokens,
+        }
+        (self.metrics or get_llm_metrics()).emit(self.record)
+        return self.record
+
+
+def trace_outcome(text, monitor=None):
+    """Başarıyla dönen yanıtın kayıt sonucu: ok, empty veya aborted."""
+    if monitor is not None and monitor.status == "aborted":
+        return "aborted"
+    return "ok" if text else "empty"
@@ -0,0 +1,237 @@
+"""
+Ön Kontrol (Pre-flight) Modülü
+Bu modül, LLM'in ürettiği test kodunu coverage ölçümüne göndermeden önce
+statik olarak (çalıştırmadan) kontrol eder.
+
+LLM çıktılarının önemli bir kısmı hiç çalışamaz: "Hata: ..." mesajları,
+temizlenmemiş markdown blokları, sözdizimi hataları, hedef sınıfın test
+dosyasında yeniden tanımlanması veya tanımsız isimler. Bunları yakalamak
+için coverage sürecine gitmeye gerek yoktur; kontrol mikro saniyeler sürer.
+
+Kontroller (sırasıyla):
+1. Boş kod ve ai_generator'ın hata mesajları ("Hata: ...", "Beklenmeyen Hata: ...")
+2. ast.parse + compile (sözdizimi); ayrıştırılamayan kodda ``` ile başlayan satır
+   varsa temizlenmemiş markdown kalıntısı olarak bildirilir (string içindeki ``` serbesttir)
+3. En az bir test metodu (TestCase sınıfında 'test' ile başlayan metot)
+4. Kaynak koddaki (app.py) sınıf/fonksiyonların test dosyasında yeniden tanımlanması
+5. 'app' içinde olmayan isimlerin import edilmesi ve bulunamayan modüller
+6. Hiçbir yerde tanımlanmamış isimler (NameError); kaynak kodda veya testte app dışından
+   yıldız import (from x import *) varsa bu kontrol yapılmaz
+"""
+
+import ast
+import builtins
+import functools
+import importlib.util
+
+# Kaynak kodun modül adı (sandbox'ta app.py olarak yazılır)
+SOURCE_MODULE = "app"
+
+# unittest'in test metodu öneki
+TEST_METHOD_PREFIX = "test"
+
+# ai_generator.generate_test_code_from_gemini'nin kod yerine döndürdüğü mesajlar
+LLM_ERROR_PREFIXES = ("Hata:", "Beklenen Hata:", "Beklenmeyen Hata:", "AI cevap veremedi", "AI boş cevap")
+
+# Her modülde tanımlı olan özel isimler
+_MODULE_NAMES = {"__name__", "__file__", "__doc__", "__builtins__", "__spec__", "__loader__",
+                 "__package__", "__annotations__"}
+
+# Yerleşik (builtin) isimler
+_BUILTIN_NAMES = frozenset(dir(builtins))
+
+
+def _bound_names(tree):
+    """
+    Ağacın herhangi bir yerinde tanımlanan (bağlanan) tüm isimleri döndürür.
+
+    Kapsam (scope) ayrımı yapılmaz; amaç sadece kesin NameError'ları yakalamaktır.
+    """
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name != "*":
+                    names.add(alias.asname or alias.name.split(".")[0])
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.update(node.names)
+        elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+            names.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            names.add(node.rest)
+    return names
+
+
+def _module_level_statements(body):
+    """
+    Modül seviyesinde çalışan ifadeleri döndürür: if/try/with/for/while/match
+    bloklarının içine girilir, fonksiyon ve sınıf gövdelerine girilmez.
+    """
+    for node in body:
+        yield node
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        for field in ("body", "orelse", "finalbody"):
+            yield from _module_level_statements(getattr(node, field, None) or [])
+        for handler in getattr(node, "handlers", None) or []:
+            yield from _module_level_statements(handler.body)
+        for case in getattr(node, "cases", None) or []:
+            yield from _module_level_statements(case.body)
+
+
+@functools.lru_cache(maxsize=32)
+def source_exports(source_code):
+    """
+    Kaynak kodun 'from app import *' ile dışarı verdiği isimleri ve
+    yeniden tanımlanmaması gereken hedefleri (sınıf/fonksiyon) bulur.
+    Aynı kaynak kod (GA/ajan döngüsü boyunca) tekrar ayrıştırılmaz.
+
+    İsimler kaynak kodun tamamından toplanır (try/if blokları içindeki tanım ve
+    importlar dahil); fazladan bir isim sadece bir kontrolün atlanmasına yol açar,
+    eksik bir isim ise geçerli bir testin reddedilmesine.
+
+    Args:
+        source_code (str): Kaynak kod
+
+    Returns:
+        tuple: (tüm_isimler, yıldız_import_isimleri, hedefler, başka_modülden_yıldız_import_var_mı)
+            veya kaynak kod ayrıştırılamazsa None
+    """
+    try:
+        tree = ast.parse(source_code)
+    except (SyntaxError, ValueError):
+        return None
+
+    names = set()
+    foreign_star = False
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name == "*":
+                    foreign_star = True  # 'from math import *': Gelen isimler statik olarak bilinemez
+                else:
+                    names.add(alias.asname or alias.name.split(".")[0])
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.add(node.id)
+
+    targets = set()
+    explicit_all = None
+    for node in _module_level_statements(tree.body):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            targets.add(node.name)
+        elif (isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "__all__" for t in node.targets)
+                and isinstance(node.value, (ast.List, ast.Tuple))):
+            explicit_all = {elt.value for elt in node.value.elts
+                            if isinstance(elt, ast.Constant) and isinstance(elt.value, str)}
+
+    star_names = explicit_all if explicit_all is not None else {n for n in names if not n.startswith("_")}
+    return frozenset(names), frozenset(star_names), frozenset(targets), foreign_star
+
+
+def preflight_check(source_code, test_code):
+    """
+    Test kodunu çalıştırmadan, bariz şekilde çalışamayacak adayları eler.
+
+    Args:
+        source_code (str): Test edilecek kaynak kod (app.py)
+        test_code (str): Test kodu
+
+    Returns:
+        tuple: (geçti_mi, sebep) - Geçtiyse (True, None), aksi halde (False, "sebep")
+    """
+    # --- 1. BOŞ KOD VE LLM HATA MESAJLARI ---
+    stripped = (test_code or "").strip()
+    if not stripped:
+        return False, "Test kodu boş."
+    if stripped.startswith(LLM_ERROR_PREFIXES):
+        return False, f"LLM kod yerine hata mesajı döndürdü: {stripped.splitlines()[0][:200]}"
+
+    # --- 2. SÖZDİZİMİ VE MARKDOWN KALINTILARI ---
+    # String veya docstring içindeki ``` zararsızdır; ``` satırları sadece kod
+    # ayrıştırılamıyorsa temizlenmemiş markdown bloğu sayılır
+    try:
+        tree = ast.parse(test_code)
+        compile(tree, "test_app.py", "exec")
+    except SyntaxError as e:
+        if any(line.lstrip().startswith("```") for line in test_code.splitlines()):
+            return False, "Kodda temizlenmemiş markdown (```) blokları var."
+        return False, f"Yazım Hatası (Satır {e.lineno}): {e.msg}"
+    except ValueError as e:
+        return False, f"Derleme Hatası: {e}"
+
+    # --- 3. EN AZ BİR TEST METODU ---
+    has_test = any(
+        isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and item.name.startswith(TEST_METHOD_PREFIX)
+        for node in ast.walk(tree) if isinstance(node, ast.ClassDef)
+        for item in node.body
+    )
+    if not has_test:
+        return False, "Test dosyasında hiç test metodu yok (TestCase sınıfı içinde 'test_' ile başlayan metot olmalı)."
+
+    exports = source_exports(source_code)
+    if exports is None:
+        return True, None  # Kaynak kod ayrıştırılamadı; kalan kontroller ölçüme bırakılır
+    source_names, star_names, targets, source_foreign_star = exports
+
+    # --- 4. HEDEFİN YENİDEN TANIMLANMASI ---
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and node.name in targets:
+            return False, (f"'{node.name}' test dosyasında yeniden tanımlanmış (Satır {node.lineno}); "
+                           f"kaynak koddaki tanım test edilmez. 'from app import {node.name}' kullanılmalı.")
+
+    # --- 5. IMPORT KONTROLLERİ ---
+    imports_app = False
+    # Kaynak kodda veya testte app dışından yıldız import varsa gelen isimler bilinemez:
+    # Tanımsız isim kontrolleri yapılmaz
+    unknown_star = source_foreign_star
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.ImportFrom) and any(alias.name == "*" for alias in node.names)
+                and not (node.level == 0 and node.module == SOURCE_MODULE)):
+            unknown_star = True
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            top = node.module.split(".")[0]
+            if node.module == SOURCE_MODULE:
+                imports_app = True
+                for alias in node.names:
+                    if alias.name != "*" and alias.name not in source_names and not source_foreign_star:
+                        return False, f"'{alias.name}' kaynak kodda (app) tanımlı değil (Satır {node.lineno})."
+            elif top != SOURCE_MODULE:
+                if importlib.util.find_spec(top) is None:
+                    return False, f"'{node.module}' modülü bulunamadı (Satır {node.lineno})."
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                top = alias.name.split(".")[0]
+                if top == SOURCE_MODULE:
+                    imports_app = True
+                elif importlib.util.find_spec(top) is None:
+                    return False, f"'{alias.name}' modülü bulunamadı (Satır {node.lineno})."
+
+    # --- 6. TANIMSIZ İSİMLER ---
+    if unknown_star:
+        return True, None
+
+    available = _bound_names(tree) | _BUILTIN_NAMES | _MODULE_NAMES
+    # Test kodunda app importu yoksa coverage_tool başa 'from app import *' ekler
+    has_star_from_app = not imports_app or any(
+        isinstance(node, ast.ImportFrom) and node.module == SOURCE_MODULE and any(a.name == "*" for a in node.names)
+        for node in ast.walk(tree)
+    )
+    if has_star_from_app:
+        available |= star_names
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in available:
+            return False, f"'{node.id}' tanımlı değil (Satır {node.lineno}); NameError verecek."
+
+    return True, None
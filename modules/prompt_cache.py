@@ -0,0 +1,182 @@
+"""
+LLM Prompt → Yanıt Önbelleği (Cache) Modülü
+Bu modül, aynı prompt için Gemini'ye tekrar tekrar istek gönderilmesini önler.
+
+Modül 1 her Streamlit yeniden çalıştırmasında aynı isteği gönderir, ajan
+aynı kaynak kod için her oturumda aynı STRATEJI_STANDART prompt'uyla başlar,
+demo kaynak kodları da sürekli tekrarlanır. Yanıtlar diskte (SQLite) saklanır;
+böylece süreçler ve oturumlar arasında paylaşılır.
+
+Anahtar: (model adı, sistem talimatı, kullanıcı girdisi, mod, fix_for_streamlit) özeti
+Sınırlar:
+- TTL: Belirli süreden eski yanıtlar kullanılmaz ve silinir
+- LRU: Kayıt sayısı sınırı aşılınca en uzun süredir kullanılmayanlar silinir
+
+Bilerek rastgele olması istenen çağrılar (ör. GA mutasyonu) önbelleği
+kullanmamalıdır (use_cache=False).
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# Varsayılan ayarlar (ortam değişkenleri ile değiştirilebilir; LLM_CACHE_PATH boşsa önbellek kapalı)
+DEFAULT_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3")
+DEFAULT_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_HOURS", "168")) * 3600
+DEFAULT_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+
+
+def make_prompt_key(model, system_instruction, user_prompt, mode, fix_for_streamlit):
+    """
+    Yanıtı belirleyen tüm girdilerden önbellek anahtarı üretir.
+
+    Returns:
+        str: SHA-256 özeti (hex)
+    """
+    h = hashlib.sha256()
+    for part in (model, system_instruction, user_prompt, mode, str(bool(fix_for_streamlit))):
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\0")  # Parçalar arasında ayraç (birleşme belirsizliği olmasın)
+    return h.hexdigest()
+
+
+class PromptCache:
+    """
+    SQLite tabanlı, TTL ve LRU sınırlı prompt → yanıt önbelleği.
+
+    Thread-safe'tir; birden fazla süreç aynı dosyayı kullanabilir (SQLite kilitleri).
+    Veritabanı hataları önbelleği devre dışı bırakır ama üretimi asla bozmaz
+    (get ıskalama, put işlem yapmamış sayılır).
+    """
+
+    def __init__(self, path, ttl_seconds=None, max_entries=None, clock=time.time):
+        """
+        Args:
+            path (str): SQLite dosyasının yolu
+            ttl_seconds (float): Yanıtların geçerlilik süresi (saniye)
+            max_entries (int): Saklanacak en fazla yanıt sayısı
+            clock: Zaman kaynağı (testlerde sahte saat verilebilir)
+        """
+        self.path = path
+        self.ttl_seconds = DEFAULT_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_entries = max_entries or DEFAULT_MAX_ENTRIES
+        self.clock = clock
+        self._lock = threading.Lock()
+
+        # İstatistikler
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    def get(self, key):
+        """
+        Önbellekten yanıt okur. Süresi dolmuş yanıt silinir ve ıskalama sayılır.
+
+        Returns:
+            str: Saklanan yanıt veya bulunamazsa None
+        """
+        now = self.clock()
+        with self._lock:
+            try:
+                with self._conn:
+                    row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?",
+                                             (key,)).fetchone()
+                    if row and now - row[1] > self.ttl_seconds:
+                        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        row = None
+                    if row:
+                        self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            except sqlite3.Error:
+                row = None
+
+            if row:
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, response):
+        """Yanıtı saklar; süresi dolanları ve LRU sınırını aşanları temizler."""
+        now = self.clock()
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute("INSERT OR REPLACE INTO responses (key, response, created, accessed) "
+                                       "VALUES (?, ?, ?, ?)", (key, response, now, now))
+                    self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+                    # En uzun süredir kullanılmayanları at (LRU)
+                    self._conn.execute(
+                        "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed DESC "
+                        "LIMIT -1 OFFSET ?)", (self.max_entries,))
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        """
+        Önbellek istatistiklerini döndürür.
+
+        Returns:
+            dict: hits, misses, entries, hit_rate
+        """
+        with self._lock:
+            try:
+                entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            except sqlite3.Error:
+                entries = 0
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": entries,
+                "hit_rate": round(self.hits / total * 100, 2) if total else 0.0,
+            }
+
+    def clear(self):
+        """Tüm yanıtları siler ve istatistikleri sıfırlar."""
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute("DELETE FROM responses")
+            except sqlite3.Error:
+                pass
+            self.hits = self.misses = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Süreç genelinde paylaşılan önbellek (ilk kullanımda açılır)
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_prompt_cache():
+    """
+    Süreç genelinde paylaşılan prompt önbelleğini döndürür.
+
+    Returns:
+        PromptCache: Önbellek veya LLM_CACHE_PATH boşsa / dosya açılamazsa None
+    """
+    global _default_cache
+    if not DEFAULT_CACHE_PATH:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            try:
+                _default_cache = PromptCache(DEFAULT_CACHE_PATH)
+            except (sqlite3.Error, OSError):
+                return None
+        return _default_cache
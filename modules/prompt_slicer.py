@@ -0,0 +1,283 @@
+"""
+Prompt Kaynak Kod Dilimleme (AST Slicing) Modülü
+Bu modül, LLM prompt'larına eklenen kaynak kodu bir token bütçesine sığdırır.
+
+Ajan ve GA her prompt'a kaynak kodun tamamını ekler. Büyük modüllerde bu,
+prompt'ları (ve yanıt süresini) şişirir, anahtar başına kotayı hızla tüketir.
+Kaynak kod bütçeyi aşıyorsa AST ile parçalara ayrılır ve öncelik sırasıyla eklenir:
+
+1. Test edilmemiş satırları içeren fonksiyon/metotların tamamı (hedefler)
+2. Import'lar ve modül seviyesindeki sabitler
+3. Hedeflerin çağırdığı fonksiyon/sınıfların imzaları (gövdesiz: "...")
+4. Hedef yoksa diğer fonksiyonların tamamı, sonra kalanların imzaları
+
+Ayrıca test edilmemiş satırlar, içinde bulundukları fonksiyon ve çalışmaları
+için gereken dal koşullarıyla (if/while) birlikte açıklanır.
+"""
+
+import ast
+import os
+
+from modules.llm_client import estimate_tokens
+
+# Prompt'a eklenecek kaynak kodun token bütçesi (0: her zaman kaynak kodun tamamı)
+DEFAULT_TOKEN_BUDGET = int(os.getenv("PROMPT_SOURCE_TOKEN_BUDGET", "2000"))
+
+# Dilimlenmiş kodun sonuna eklenen not
+OMITTED_NOTE = "# ... ({count} tanım token bütçesi nedeniyle çıkarıldı)"
+
+# Açıklamaya eklenecek en fazla satır sayısı
+MAX_DESCRIBED_LINES = 30
+
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+def _start_line(node):
+    """Dekoratörler dahil düğümün ilk satırı."""
+    return min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+
+
+def _segment(lines, node):
+    return "\n".join(lines[_start_line(node) - 1:node.end_lineno])
+
+
+def _docstring_line(node):
+    doc = ast.get_docstring(node)
+    return doc.strip().splitlines()[0] if doc and doc.strip() else None
+
+
+def _stub(node, indent=""):
+    """Fonksiyonun gövdesiz imzası (dekoratörler ve docstring'in ilk satırı ile)."""
+    parts = [f"{indent}@{ast.unparse(d)}" for d in node.decorator_list]
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    parts.append(f"{indent}{prefix} {node.name}({ast.unparse(node.args)}){returns}:")
+    doc = _docstring_line(node)
+    if doc:
+        parts.append(f'{indent}    """{doc}"""')
+    parts.append(f"{indent}    ...")
+    return "\n".join(parts)
+
+
+def _class_header(node, lines, indent=""):
+    """
+    Sınıf satırı ve sınıf seviyesindeki (metot veya iç sınıf olmayan) ifadeler.
+    Metotlar ve iç sınıflar ayrı parçalar (_Unit) olarak eklenir.
+    """
+    parts = [f"{indent}@{ast.unparse(d)}" for d in node.decorator_list]
+    bases = [ast.unparse(b) for b in node.bases] + [ast.unparse(k) for k in node.keywords]
+    parts.append(f"{indent}class {node.name}({', '.join(bases)}):" if bases else f"{indent}class {node.name}:")
+    for item in node.body:
+        if not isinstance(item, FUNCTION_NODES + (ast.ClassDef,)):
+            parts.append(_segment(lines, item))
+    return "\n".join(parts)
+
+
+class _Unit:
+    """Dilimlemenin en küçük parçası: Üst seviye fonksiyon, metot, iç sınıf veya diğer üst seviye ifade."""
+
+    def __init__(self, node, owner=None):
+        self.node = node
+        self.owner = owner  # Metot veya iç sınıfsa, içinde bulunduğu sınıfın düğümü
+        self.start = _start_line(node)
+        self.end = node.end_lineno
+        self.name = getattr(node, "name", None)
+        self.mode = None  # None (çıkarıldı), "stub" veya "full"
+
+    @property
+    def is_function(self):
+        return isinstance(self.node, FUNCTION_NODES)
+
+    @property
+    def qualname(self):
+        return f"{self.owner.name}.{self.name}" if self.owner is not None else self.name
+
+    def render(self, lines, mode):
+        indent = "    " if self.owner is not None else ""
+        if mode == "stub" and self.is_function:
+            return _stub(self.node, indent)
+        if mode == "stub" and isinstance(self.node, ast.ClassDef):
+            return _class_header(self.node, lines, indent) + f"\n{indent}    ..."
+        return _segment(lines, self.node)
+
+
+def _collect_units(tree):
+    units = []
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            # Metotlar ve iç sınıflar ayrı parçalardır; sınıf başlığı bunları içermez
+            members = [item for item in node.body if isinstance(item, FUNCTION_NODES + (ast.ClassDef,))]
+            if members:
+                units.extend(_Unit(item, owner=node) for item in members)
+            else:
+                units.append(_Unit(node))
+        else:
+            units.append(_Unit(node))
+    return units
+
+
+def _called_names(node):
+    """Düğümde çağrılan veya kullanılan isimler (fonksiyon adları, self.metot ve sınıf adları)."""
+    names = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name):
+            names.add(child.id)
+        elif isinstance(child, ast.Attribute):
+            names.add(child.attr)
+    return names
+
+
+def build_source_context(source_code, focus_lines=None, token_budget=None):
+    """
+    Kaynak kodu prompt için token bütçesine sığdırır.
+
+    Args:
+        source_code (str): Kaynak kod
+        focus_lines (iterable): Öncelikli satırlar (ör. test edilmemiş satırlar)
+        token_budget (int): Token bütçesi (None ise PROMPT_SOURCE_TOKEN_BUDGET, 0 ise sınırsız)
+
+    Returns:
+        str: Kaynak kodun tamamı (bütçeye sığıyorsa) veya bütçeye sığan dilimleri.
+            Dilimlerde tam eklenen her parçanın önünde orijinal satır aralığı yazar.
+    """
+    budget = DEFAULT_TOKEN_BUDGET if token_budget is None else token_budget
+    if budget <= 0 or estimate_tokens(source_code) <= budget:
+        return source_code
+
+    try:
+        tree = ast.parse(source_code)
+    except (SyntaxError, ValueError):
+        # Ayrıştırılamayan kod dilimlenemez; baştan bütçe kadarı gönderilir
+        return source_code[:budget * 4] + "\n# ... (kısaltıldı)"
+
+    lines = source_code.splitlines()
+    units = _collect_units(tree)
+    focus = set(focus_lines or [])
+    targets = sorted((u for u in units if any(u.start <= line <= u.end for line in focus)),
+                     key=lambda u: -sum(1 for line in focus if u.start <= line <= u.end))
+    others = [u for u in units if u not in targets]
+    header = [u for u in others if isinstance(u.node, (ast.Import, ast.ImportFrom, ast.Assign, ast.AnnAssign))]
+
+    # Hedeflerin kullandığı tanımlar (fonksiyon, sınıf, aynı sınıftaki metotlar)
+    used = set()
+    for unit in targets:
+        used |= _called_names(unit.node)
+    dependencies = [u for u in others if u.name in used or (u.owner is not None and u.owner.name in used)]
+
+    # Öncelik sırası: (parça, mod)
+    plan = [(u, "full") for u in targets] + [(u, "full") for u in header] + [(u, "stub") for u in dependencies]
+    if not targets:
+        plan += [(u, "full") for u in others if u.is_function or isinstance(u.node, ast.ClassDef)]
+    plan += [(u, "stub") for u in others if u.is_function or isinstance(u.node, ast.ClassDef)]
+
+    def cost(unit, mode):
+        # Etiket ("# (satır a-b)") ve parçalar arası boş satır dahil
+        return estimate_tokens(unit.render(lines, mode)) + (6 if mode == "full" else 1)
+
+    # Çıkarılan tanımlar için eklenecek son not için pay ayrılır
+    remaining = budget - estimate_tokens(OMITTED_NOTE.format(count=len(units)))
+    counted_classes = set()
+    for unit, mode in plan:
+        if unit.mode == "full" or (unit.mode == "stub" and mode == "stub"):
+            continue
+        needed = cost(unit, mode)
+        if unit.mode == "stub":
+            needed -= cost(unit, "stub")  # İmzadan tam hale yükseltme
+        if unit.owner is not None and id(unit.owner) not in counted_classes:
+            needed += estimate_tokens(_class_header(unit.owner, lines))
+        if needed <= remaining:
+            remaining -= needed
+            unit.mode = mode
+            if unit.owner is not None:
+                counted_classes.add(id(unit.owner))
+
+    # Kaynak sırasıyla birleştir; metotlar sınıf başlığının altında toplanır
+    parts = []
+    emitted_classes = set()
+    omitted = 0
+    for unit in units:
+        if unit.mode is None:
+            omitted += 1
+            continue
+        if unit.owner is not None and id(unit.owner) not in emitted_classes:
+            emitted_classes.add(id(unit.owner))
+            parts.append(_class_header(unit.owner, lines))
+        if unit.mode == "full" and (unit.is_function or isinstance(unit.node, ast.ClassDef)):
+            indent = "    " if unit.owner is not None else ""
+            parts.append(f"{indent}# (satır {unit.start}-{unit.end})\n{unit.render(lines, 'full')}")
+        elif unit.mode == "full":
+            parts.append(unit.render(lines, "full"))
+        else:
+            parts.append(unit.render(lines, "stub"))
+    if omitted:
+        parts.append(OMITTED_NOTE.format(count=omitted))
+    return "\n\n".join(parts) + "\n"
+
+
+def _condition_for(tree, line):
+    """
+    Satırı içeren en içteki if/while koşulu ve satırın çalışması için koşulun
+    alması gereken değer.
+
+    Returns:
+        tuple: (koşul_metni, True/False) veya koşul yoksa None
+    """
+    found = None
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.If, ast.While)):
+            continue
+        for branch, value in ((node.body, True), (node.orelse, False)):
+            if branch and branch[0].lineno <= line <= branch[-1].end_lineno:
+                if found is None or node.lineno > found[0]:
+                    found = (node.lineno, ast.unparse(node.test), value)
+    return found[1:] if found else None
+
+
+def describe_missed_lines(source_code, missed_lines, missed_arcs=None):
+    """
+    Test edilmemiş satırları, içinde bulundukları fonksiyon ve çalışmaları için
+    gereken dal koşullarıyla açıklar.
+
+    Args:
+        source_code (str): Kaynak kod
+        missed_lines (list): Test edilmemiş satır numaraları
+        missed_arcs (list): Çalışmamış dallar ([kaynak_satır, hedef_satır])
+
+    Returns:
+        str: Her satırda "- fonksiyon: satır N `kod` (koşul: `x < 0` doğru olmalı)" (yoksa boş)
+    """
+    if not missed_lines and not missed_arcs:
+        return ""
+    try:
+        tree = ast.parse(source_code)
+    except (SyntaxError, ValueError):
+        return ""
+    lines = source_code.splitlines()
+    units = _collect_units(tree)
+
+    def owner_name(line):
+        unit = next((u for u in units if u.start <= line <= u.end), None)
+        return unit.qualname if unit is not None and unit.name else "modül seviyesi"
+
+    entries = []
+    for line in sorted(set(missed_lines or []))[:MAX_DESCRIBED_LINES]:
+        if not 1 <= line <= len(lines):
+            continue
+        entry = f"- {owner_name(line)}: satır {line} `{lines[line - 1].strip()}`"
+        condition = _condition_for(tree, line)
+        if condition:
+            entry += f" (koşul: `{condition[0]}` {'doğru' if condition[1] else 'yanlış'} olmalı)"
+        entries.append(entry)
+
+    for source, target in (missed_arcs or [])[:MAX_DESCRIBED_LINES]:
+        if not 1 <= source <= len(lines):
+            continue
+        if target < 0:
+            goal = "fonksiyondan çıkış"
+        elif 1 <= target <= len(lines):
+            goal = f"satır {target} `{lines[target - 1].strip()}`"
+        else:
+            continue
+        entries.append(f"- {owner_name(source)}: satır {source} `{lines[source - 1].strip()}` -> {goal} "
+                       f"dalı çalışmadı")
+    return "\n".join(entries)
@@ -0,0 +1,231 @@
+"""
+Coverage Sonuç Önbelleği (Cache) Modülü
+Bu modül, aynı (kaynak kod, test kodu) çifti için coverage analizinin
+tekrar tekrar çalıştırılmasını önler.
+
+Genetik algoritma sık sık ebeveyniyle birebir aynı (veya sadece satır sonu
+karakterleri farklı) çocuklar üretir; RL ajanı da aynı kodu tekrar deneyebilir.
+Sonuçlar, normalize edilmiş kodun özetine (hash) göre saklanır:
+- Bellek katmanı: LRU (en az kullanılan önce silinir)
+- Disk katmanı (opsiyonel): Boyut sınırlı, dolunca en eski dosyalar silinir
+"""
+
+import copy
+import hashlib
+import json
+import os
+import platform
+import threading
+from collections import OrderedDict
+
+# Varsayılan ayarlar (ortam değişkenleri ile değiştirilebilir)
+DEFAULT_MAX_ENTRIES = int(os.getenv("COVERAGE_CACHE_SIZE", "512"))
+DEFAULT_DISK_DIR = os.getenv("COVERAGE_CACHE_DIR") or None
+DEFAULT_DISK_MAX_BYTES = int(os.getenv("COVERAGE_CACHE_DISK_MB", "50")) * 1024 * 1024
+
+
+def _coverage_version():
+    """Kurulu coverage.py sürümünü döndürür (import etmeden, paket bilgisinden)."""
+    try:
+        from importlib.metadata import version
+        return version("coverage")
+    except Exception:
+        return "bilinmiyor"
+
+
+# Sonucu etkileyen ortam bilgisi: Farklı Python/coverage sürümleri farklı sonuç verebilir
+_ENVIRONMENT_TAG = f"{platform.python_version()}|{_coverage_version()}"
+
+
+def normalize_code(code):
+    """
+    Kodu anlamı değişmeyecek şekilde normalize eder.
+
+    Sadece satır sonları (\r\n, \r -> \n) birleştirilir. Boş satırlar ve satır
+    sonundaki boşluklar korunur: Baştaki boş satırları atmak satır numaralarını
+    (missed_lines, test bazlı bitset'ler) kaydırır, satır sonu boşlukları da çok
+    satırlı string'lerin içeriğidir (testin sonucunu değiştirebilir).
+
+    Args:
+        code (str): Ham kod
+
+    Returns:
+        str: Normalize edilmiş kod
+    """
+    return (code or "").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def make_cache_key(source_code, test_code, options=None):
+    """
+    (Kaynak kod, test kodu, Python/coverage sürümü, seçenekler) için anahtar üretir.
+
+    Args:
+        source_code (str): Kaynak kod
+        test_code (str): Test kodu
+        options (dict): Sonucu etkileyen ek seçenekler (ör. branch modu)
+
+    Returns:
+        str: SHA-256 özeti (hex)
+    """
+    h = hashlib.sha256()
+    for part in (_ENVIRONMENT_TAG, normalize_code(source_code), normalize_code(test_code),
+                 json.dumps(options or {}, sort_keys=True)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")  # Parçalar arasında ayraç (birleşme belirsizliği olmasın)
+    return h.hexdigest()
+
+
+class CoverageResultCache:
+    """
+    İki katmanlı (bellek + disk) coverage sonuç önbelleği.
+
+    İsabet (hit) ve ıskalama (miss) sayaçları tutulur; arayüz bu sayaçları
+    kullanarak kaç analizin tasarruf edildiğini gösterebilir.
+    """
+
+    def __init__(self, max_entries=None, disk_dir=None, disk_max_bytes=None):
+        """
+        Args:
+            max_entries (int): Bellekte tutulacak en fazla sonuç sayısı
+            disk_dir (str): Disk katmanının klasörü (None ise disk katmanı kapalı)
+            disk_max_bytes (int): Disk katmanının en fazla toplam boyutu (byte)
+        """
+        self.max_entries = max_entries or DEFAULT_MAX_ENTRIES
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes or DEFAULT_DISK_MAX_BYTES
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        # İstatistikler
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    # --- BELLEK KATMANI ---
+    def _memory_put(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)  # En az kullanılanı at (LRU)
+
+    # --- DİSK KATMANI ---
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _disk_get(self, key):
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # Erişim zamanını güncelle (eviction sırası için)
+            return value
+        except (OSError, ValueError):
+            return None
+
+    def _disk_put(self, key, value):
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)  # Atomik yazım (yarım dosya kalmasın)
+        except OSError:
+            return
+        self._disk_evict()
+
+    def _disk_evict(self):
+        """Disk katmanı boyut sınırını aşarsa en eski dosyaları siler."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        entries.sort()  # En eski önce
+        for _, size, path in entries:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    # --- GENEL ARAYÜZ ---
+    def get(self, key):
+        """
+        Önbellekten sonuç okur. Önce bellek, sonra disk katmanına bakar.
+
+        Returns:
+            Saklanan değerin kopyası veya bulunamazsa None
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return copy.deepcopy(self._memory[key])
+
+            if self.disk_dir:
+                value = self._disk_get(key)
+                if value is not None:
+                    self._memory_put(key, value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return copy.deepcopy(value)
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """Sonucu önbelleğe (bellek ve varsa disk) yazar."""
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._memory_put(key, value)
+            if self.disk_dir:
+                self._disk_put(key, value)
+
+    def stats(self):
+        """
+        Önbellek istatistiklerini döndürür.
+
+        Returns:
+            dict: hits, misses, memory_hits, disk_hits, entries, hit_rate
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "entries": len(self._memory),
+                "hit_rate": round(self.hits / total * 100, 2) if total else 0.0,
+            }
+
+    def clear(self):
+        """Bellek katmanını ve istatistikleri sıfırlar (disk dosyalarına dokunmaz)."""
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.misses = self.memory_hits = self.disk_hits = 0
+
+
+# Süreç genelinde paylaşılan önbellek
+_default_cache = CoverageResultCache(disk_dir=DEFAULT_DISK_DIR)
+
+
+def get_result_cache():
+    """Süreç genelinde paylaşılan coverage sonuç önbelleğini döndürür."""
+    return _default_cache
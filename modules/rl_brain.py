@@ -10,6 +10,7 @@ gelecek ödülü (Q-değeri) öğrenir ve bu bilgiyi Q-tablosunda saklar.
 import numpy as np
 import os
 import json
+import threading
 
 class QLearningBrain:
     """
@@ -20,7 +21,7 @@ class QLearningBrain:
     saklar ve epsilon-greedy stratejisi ile keşif-yararlanma dengesini kurar.
     """
     
-    def __init__(self, actions, learning_rate=0.1, reward_decay=0.9, e_greedy=0.9):
+    def __init__(self, actions, learning_rate=0.1, reward_decay=0.9, e_greedy=0.9, seed=None):
         """
         Q-Learning beyin yapılandırması.
         
@@ -29,11 +30,14 @@ class QLearningBrain:
             learning_rate: Öğrenme hızı (0.1 = %10, ne kadar hızlı öğreneceği)
             reward_decay: Ödül çürüme faktörü (0.9 = gelecek ödülleri %90 ağırlıkla dikkate al)
             e_greedy: Epsilon-greedy parametresi (0.9 = %90 ihtimalle en iyi eylemi seç, %10 keşfet)
+            seed: Eylem seçimindeki rastgelelik için tohum (None ise her çalıştırmada farklı)
         """
         self.actions = actions  # Yapılabilecek eylemler listesi
         self.lr = learning_rate  # Öğrenme hızı (alpha)
         self.gamma = reward_decay  # Gelecek ödül indirim faktörü (discount factor)
         self.epsilon = e_greedy  # Keşif-istismar dengesi parametresi
+        # Beyne özel rastgele sayı üreteci (global np.random durumunu etkilemez)
+        self.rng = np.random.RandomState(seed)
         
         # Q-Tablosunu dosyadan yükle veya yeni oluştur
         # Q-tablosu: {state: {action: Q_value}} formatında sözlük
@@ -64,9 +68,15 @@ class QLearningBrain:
         
         Bu sayede öğrenilen bilgiler kalıcı olur ve program yeniden başlatıldığında
         önceki deneyimler korunur.
+
+        Dosya önce geçici bir dosyaya yazılıp yerine taşınır: Aynı anda çalışan
+        süreçler (ör. toplu çalıştırma) ve thread'ler (ör. arka planda çalışan ajanlar)
+        yarım yazılmış bir tablo okumaz; geçici dosya adı süreç ve thread başına ayrıdır.
         """
-        with open(self.q_table_file, 'w') as f:
+        tmp_path = f"{self.q_table_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
             json.dump(self.q_table, f, indent=2)
+        os.replace(tmp_path, self.q_table_file)
 
     def check_state_exist(self, state):
         """
@@ -100,17 +110,17 @@ class QLearningBrain:
         
         # Epsilon-Greedy Stratejisi
         # Epsilon (örn: 0.9) ihtimalle en iyi bildiğini yap, (1-epsilon) ihtimalle keşfet
-        if np.random.uniform() < self.epsilon:
+        if self.rng.uniform() < self.epsilon:
             # İSTİSMAR: En yüksek Q-değerine sahip eylemi seç
             state_actions = self.q_table[state]
             # En yüksek değere sahip eylemi bul
             max_val = max(state_actions.values())
             # Eğer birden fazla eylem aynı maksimum değere sahipse, rastgele birini seç
             best_actions = [k for k, v in state_actions.items() if v == max_val]
-            action = np.random.choice(best_actions)
+            action = self.rng.choice(best_actions)
         else:
             # KEŞİF: Rastgele bir eylem seç (yeni stratejiler denemek için)
-            action = np.random.choice(self.actions)
+            action = self.rng.choice(self.actions)
         return action
 
     def learn(self, state, action, reward, next_state):
@@ -0,0 +1,90 @@
+"""
+Arayüz (Streamlit) Sonuç Önbelleği Modülü
+Streamlit her etkileşimde main.py'yi baştan çalıştırır. Bu modüldeki
+sarmalayıcılar, aynı girdilerle tekrar istenen metrik, coverage ve call
+graph sonuçlarını hesaplamadan döndürür (st.cache_data).
+
+- Anahtar: Argümanların içeriği (Streamlit argümanları özetler; kod metni
+  aynıysa sonuç aynıdır)
+- Boyut sınırı: Fonksiyon başına en fazla UI_CACHE_MAX_ENTRIES kayıt
+  (en eski silinir) ve UI_CACHE_TTL_SECONDS saniyelik geçerlilik süresi
+- Call graph canlı bir Figure olarak değil, çizilmiş PNG baytları olarak saklanır
+
+Coverage'da sadece tamamlanmış ölçümler ("ok") saklanır; zaman aşımı ve sistem
+hataları geçici olabileceğinden bir sonraki istekte tekrar ölçülür.
+Ölçülen modüller, gecikmeli içe aktarma için ilk çağrıda yüklenir.
+"""
+
+import os
+
+import streamlit as st
+
+# Fonksiyon başına en fazla kayıt sayısı ve geçerlilik süresi (saniye, 0: süresiz)
+UI_CACHE_MAX_ENTRIES = int(os.getenv("UI_CACHE_MAX_ENTRIES", "64"))
+UI_CACHE_TTL_SECONDS = float(os.getenv("UI_CACHE_TTL_SECONDS", "3600")) or None
+
+# Call graph görüntüsünün çözünürlüğü (16 inç x dpi piksel)
+CALL_GRAPH_DPI = int(os.getenv("CALL_GRAPH_DPI", "100"))
+
+
+class _Uncached(Exception):
+    """Sonucun önbelleğe alınmaması gerektiğini bildirir (st.cache_data istisnaları saklamaz)."""
+
+    def __init__(self, value):
+        super().__init__("önbelleğe alınmadı")
+        self.value = value
+
+
+@st.cache_data(max_entries=UI_CACHE_MAX_ENTRIES, ttl=UI_CACHE_TTL_SECONDS, show_spinner=False)
+def cached_metrics(code_string):
+    """
+    calculate_metrics'in önbellekli hali.
+
+    Returns:
+        tuple: (DataFrame, hata_mesajı) - calculate_metrics ile aynı
+    """
+    from modules.metrics import calculate_metrics
+    return calculate_metrics(code_string)
+
+
+@st.cache_data(max_entries=UI_CACHE_MAX_ENTRIES, ttl=UI_CACHE_TTL_SECONDS, show_spinner=False)
+def _cached_coverage(source_code, test_code, branch):
+    from modules.coverage_tool import run_coverage_analysis
+    result, error = run_coverage_analysis(source_code, test_code, branch=branch)
+    if error or result is None or result.get("status", "ok") != "ok":
+        raise _Uncached((result, error))
+    return result, error
+
+
+def cached_coverage(source_code, test_code, branch=False):
+    """
+    run_coverage_analysis'in önbellekli hali (sadece tamamlanmış ölçümler saklanır).
+
+    Returns:
+        tuple: (sonuç, hata_mesajı) - run_coverage_analysis ile aynı
+    """
+    try:
+        return _cached_coverage(source_code, test_code, branch)
+    except _Uncached as e:
+        return e.value
+
+
+@st.cache_data(max_entries=UI_CACHE_MAX_ENTRIES, ttl=UI_CACHE_TTL_SECONDS, show_spinner=False)
+def cached_call_graph_png(user_scenario, generated_code, metrics):
+    """
+    Call graph'ın önbellekli PNG görüntüsü.
+
+    Args:
+        metrics (tuple): Grafiğe verilen metrik satırları
+
+    Returns:
+        bytes: PNG görüntüsü
+    """
+    from modules.visualizer import render_call_graph_png
+    return render_call_graph_png(user_scenario, generated_code, list(metrics), dpi=CALL_GRAPH_DPI)
+
+
+def clear_ui_caches():
+    """Tüm arayüz önbelleklerini boşaltır."""
+    for cached in (cached_metrics, _cached_coverage, cached_call_graph_png):
+        cached.clear()
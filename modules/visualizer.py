@@ -1,6 +1,11 @@
-import networkx as nx
-import matplotlib.pyplot as plt
 import ast
+import io
+
+from modules.lazy_import import lazy_module
+
+# Grafik kütüphaneleri ağırdır; sadece create_call_graph çağrıldığında içe aktarılır
+nx = lazy_module("networkx")
+plt = lazy_module("matplotlib.pyplot")
 
 # --- AST ANALİZCİSİ ---
 class CallGraphVisitor(ast.NodeVisitor):
@@ -136,3 +141,25 @@ def create_call_graph(user_scenario, generated_code, metrics):
     fig.patch.set_alpha(0.0)
     
     return fig
+
+
+def render_call_graph_png(user_scenario, generated_code, metrics, dpi=100):
+    """
+    Call graph'ı PNG olarak çizer ve figürü kapatır.
+
+    Canlı bir Figure nesnesi yerine bayt döndürdüğü için sonuç önbellekte
+    saklanabilir; kapatılmayan 16x16 inçlik figürler bellekte birikmez.
+
+    Args:
+        dpi (int): Çözünürlük (16 inç x dpi piksel)
+
+    Returns:
+        bytes: PNG görüntüsü
+    """
+    fig = create_call_graph(user_scenario, generated_code, metrics)
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=dpi)
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
@@ -1,12 +1,79 @@
 ﻿import unittest
 from unittest.mock import MagicMock, patch
 import pandas as pd
+import os
+import sys
+import tempfile
+import time
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import urllib.request
+import subprocess
 
 # Projenin modüllerini import ediyoruz
 # Not: Dosya yollarının doğru olduğundan emin olun
 from modules.agent import AutoTestAgent
 from modules.genetic_brain import GeneticOptimizer
 from modules.metrics import calculate_metrics
+from modules.coverage_tool import run_coverage_analysis, evaluate_many, CoverageWorkerPool, bitset_to_lines, coverage_score
+from modules.result_cache import CoverageResultCache, make_cache_key
+from modules.incremental_coverage import IncrementalCoverageEvaluator
+from modules.preflight import preflight_check
+import modules.llm_backends as llm_backends
+from modules.ai_generator import generate_many, parse_candidates, generate_test_code_from_gemini, get_key_stats
+from modules.prompt_cache import PromptCache
+from modules.code_stream import CodeStreamMonitor
+from modules.llm_client import AsyncLLMClient, KeyRateLimiter, RateLimiterPool, get_key_manager
+from modules.llm_backends import FakeBackend, OpenAICompatibleBackend, GeminiBackend
+from modules.llm_cassette import use_cassette
+from modules.rl_brain import QLearningBrain
+from modules.prompt_slicer import build_source_context, describe_missed_lines
+from modules.llm_client import estimate_tokens, LLMHTTPError
+from modules.llm_metrics import get_llm_metrics, capture_llm_calls, JSONLSink, PrometheusSink
+from modules.lazy_import import lazy_module, is_loaded
+from modules.background import BackgroundRun
+from batch_runner import modulleri_bul, modul_adi, importlari_duzelt, _paylastir
+
+# Bir modülün (bağımlılıklarıyla) soğuk içe aktarma süresi bütçesi (milisaniye)
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "800"))
+
+
+def import_profile(kod):
+    """
+    Kodu yeni bir süreçte 'python -X importtime' ile çalıştırır.
+
+    Returns:
+        dict: modül_adı -> kümülatif içe aktarma süresi (ms)
+    """
+    cikti = subprocess.run([sys.executable, "-X", "importtime", "-c", kod], capture_output=True, text=True,
+                           cwd=os.path.dirname(os.path.abspath(__file__)), env={**os.environ, "MPLBACKEND": "Agg"},
+                           timeout=120)
+    profil = {}
+    for satir in cikti.stderr.splitlines():
+        if satir.startswith("import time:") and "|" in satir:
+            _, kumulatif, ad = satir.split("|")
+            if kumulatif.strip().isdigit():
+                profil[ad.strip()] = int(kumulatif) / 1000
+    return profil
+
+
+def imports_package(profil, paket):
+    """Profilde paketin kendisi veya herhangi bir alt modülü var mı."""
+    return any(ad == paket or ad.startswith(paket + ".") for ad in profil)
+
+
+def gemini_arka_ucunu_sabitle(test):
+    """
+    Test boyunca varsayılan arka ucu yeni bir GeminiBackend'e sabitler (test sonunda geri alınır).
+    Gemini SDK'sını/REST akışını taklit eden testler, ortamdaki LLM_BACKEND ve LLM_CASSETTE
+    ayarlarından etkilenmez.
+    """
+    onceki = llm_backends.set_backend_override(GeminiBackend())
+    test.addCleanup(llm_backends.set_backend_override, onceki)
 
 class ProjectWhiteBoxTests(unittest.TestCase):
     """
@@ -104,5 +171,1428 @@ def test_func():
         # Fonksiyon sayısı kontrolü (AST analizi testi)
         self.assertEqual(metrics_dict['Fonksiyon Sayısı'], 1, "Fonksiyon sayısı (AST) yanlış hesaplandı.")
 
+    # =========================================================================
+    # TEST CASE 4: Coverage Motorları Tutarlılığı (Integration Testing)
+    # Amaç: Kalıcı worker motorunun, eski 'coverage run' + 'coverage json'
+    # yöntemiyle aynı coverage yüzdesini, eksik satırları, test sayılarını ve
+    # test bazlı kayıtları döndürdüğünü doğrulamak.
+    # =========================================================================
+    def test_coverage_engines_agree(self):
+        print("[WhiteBox] Test 4: Coverage Motorları Karşılaştırılıyor...")
+
+        kaynak = "def notu_hesapla(puan):\n    if puan >= 50:\n        return 'Geçti'\n    return 'Kaldı'\n"
+        test = (
+            "import unittest\n"
+            "class TestNot(unittest.TestCase):\n"
+            "    def test_gecti(self):\n"
+            "        self.assertEqual(notu_hesapla(70), 'Geçti')\n"
+        )
+
+        cli_sonuc, cli_hata = run_coverage_analysis(kaynak, test, engine="cli", use_cache=False)
+        worker_sonuc, worker_hata = run_coverage_analysis(kaynak, test, engine="worker", use_cache=False)
+
+        self.assertIsNone(cli_hata)
+        self.assertIsNone(worker_hata)
+        self.assertEqual(worker_sonuc['coverage_percent'], cli_sonuc['coverage_percent'])
+        self.assertEqual(worker_sonuc['missed_lines'], [4], "Eksik satırlar yanlış hesaplandı.")
+        self.assertTrue(worker_sonuc['success'])
+        self.assertTrue(cli_sonuc['success'])
+
+        # Adı ve çıktısı "OK" içeren başarısız test: Başarı, metinden değil test sayılarından gelir
+        test_ok = test + (
+            "    def test_OK(self):\n"
+            "        print('OK')\n"
+            "        self.assertEqual(notu_hesapla(10), 'Geçti')\n"
+        )
+        cli_sonuc, cli_hata = run_coverage_analysis(kaynak, test_ok, engine="cli", use_cache=False)
+        worker_sonuc, worker_hata = run_coverage_analysis(kaynak, test_ok, engine="worker", use_cache=False)
+        self.assertIsNone(cli_hata)
+        for sonuc in (cli_sonuc, worker_sonuc):
+            self.assertFalse(sonuc['success'])
+            self.assertEqual((sonuc['total_tests'], sonuc['failures'], sonuc['errors']), (2, 1, 0))
+        sonuclari = lambda sonuc: sorted((t['id'], t['outcome'], t['exception_type']) for t in sonuc['tests'])
+        self.assertEqual(sonuclari(cli_sonuc), sonuclari(worker_sonuc))
+        self.assertIn(("test_app.TestNot.test_OK", "failed", "AssertionError"), sonuclari(cli_sonuc))
+
+    # =========================================================================
+    # TEST CASE 5: Eşzamanlı Coverage Analizleri (Concurrency Testing)
+    # Amaç: Aynı anda çalışan analizlerin her birinin kendi izole klasörünü
+    # kullandığını, birbirinin dosyalarını ezmediğini ve klasörlerin
+    # temizlendiğini doğrulamak.
+    # =========================================================================
+    def test_concurrent_coverage_sandboxes(self):
+        print("[WhiteBox] Test 5: Eşzamanlı Coverage Analizleri Kontrol Ediliyor...")
+
+        def is_tanimi(i):
+            # Her iş farklı bir eşik değeri kullanır; ezilme olursa sonuç karışır
+            kaynak = f"def esik_kontrol(x):\n    if x > {i}:\n        return True\n    return False\n"
+            test = (
+                "import unittest\n"
+                "class TestEsik(unittest.TestCase):\n"
+                "    def test_buyuk(self):\n"
+                f"        self.assertTrue(esik_kontrol({i} + 1))\n"
+            )
+            if i % 2:
+                # Tek numaralı işler alt dalı da test eder -> %100 coverage
+                test += f"    def test_kucuk(self):\n        self.assertFalse(esik_kontrol({i}))\n"
+            return kaynak, test
+
+        with tempfile.TemporaryDirectory() as kok:
+            with ThreadPoolExecutor(max_workers=8) as havuz:
+                gorevler = [
+                    havuz.submit(run_coverage_analysis, *is_tanimi(i), engine=("cli" if i % 3 == 0 else None), sandbox_root=kok)
+                    for i in range(12)
+                ]
+                sonuclar = [g.result() for g in gorevler]
+
+            # Tüm geçici klasörler silinmiş olmalı
+            self.assertEqual(os.listdir(kok), [], "Geçici analiz klasörleri temizlenmedi.")
+
+        for i, (sonuc, hata) in enumerate(sonuclar):
+            self.assertIsNone(hata)
+            self.assertTrue(sonuc['success'], f"{i}. iş başarısız oldu.")
+            beklenen = [] if i % 2 else [4]
+            self.assertEqual(sonuc['missed_lines'], beklenen, f"{i}. işin sonucu başka bir işle karıştı.")
+
+    # =========================================================================
+    # TEST CASE 6: Worker Havuzu Geri Dönüşümü ve İzolasyonu (Robustness Testing)
+    # Amaç: Havuzdaki worker'ların N işten sonra yenilendiğini ve süreci
+    # çökerten bir test kodunun sonraki ölçümleri bozmadığını doğrulamak.
+    # =========================================================================
+    def test_worker_pool_recycling_and_isolation(self):
+        print("[WhiteBox] Test 6: Worker Havuzu Kontrol Ediliyor...")
+
+        kaynak = "def kare(x):\n    return x * x\n"
+        test = (
+            "import unittest\n"
+            "class TestKare(unittest.TestCase):\n"
+            "    def test_kare(self):\n"
+            "        self.assertEqual(kare(3), 9)\n"
+        )
+        havuz = CoverageWorkerPool(size=1, max_jobs_per_worker=2)
+        self.addCleanup(havuz.close)
+
+        with patch('modules.coverage_tool.get_worker_pool', return_value=havuz):
+            run_coverage_analysis(kaynak, test, use_cache=False)
+            ilk_pid = havuz.workers[0].process.pid
+
+            # Süreci öldüren test kodu: hata dönmeli ama worker ayakta kalmalı (fork izolasyonu)
+            sonuc, hata = run_coverage_analysis(kaynak, "import os\nos._exit(3)")
+            self.assertIsNone(sonuc)
+            self.assertIn("beklenmedik", hata)
+
+            # 2 işten sonra worker yenilenmiş olmalı; yeni worker doğru sonuç vermeli
+            sonuc, hata = run_coverage_analysis(kaynak, test, use_cache=False)
+            self.assertIsNone(hata)
+            self.assertEqual(sonuc['coverage_percent'], 100.0)
+            self.assertNotEqual(havuz.workers[0].process.pid, ilk_pid, "Worker geri dönüştürülmedi.")
+
+    # =========================================================================
+    # TEST CASE 7: Coverage Sonuç Önbelleği (Cache Testing)
+    # Amaç: Sadece satır sonu (CRLF/LF) farkı olan kodların aynı anahtarı ürettiğini,
+    # satır numarasını veya string içeriğini değiştiren farkların ayrı anahtar ürettiğini,
+    # LRU sınırının ve disk katmanının boyut sınırının uygulandığını doğrulamak.
+    # =========================================================================
+    def test_result_cache_tiers(self):
+        print("[WhiteBox] Test 7: Coverage Sonuç Önbelleği Kontrol Ediliyor...")
+
+        # Satır sonu farkı aynı anahtarı, gerçek içerik farkı farklı anahtarı üretmeli
+        anahtar = make_cache_key("x = 1\n", "import unittest\n")
+        self.assertEqual(anahtar, make_cache_key("x = 1\r\n", "import unittest\r\n"))
+        self.assertNotEqual(anahtar, make_cache_key("x = 2\n", "import unittest\n"))
+        # Baştaki boş satırlar satır numaralarını, satır sonu boşlukları string içeriğini değiştirir
+        self.assertNotEqual(anahtar, make_cache_key("\n\nx = 1\n", "import unittest\n"))
+        self.assertNotEqual(make_cache_key('x = """a\n"""\n', ""), make_cache_key('x = """a  \n"""\n', ""))
+
+        # Kaydırılmış kaynak, önbellekteki (eski satır numaralı) sonucu almamalı
+        kaynak = "def f(x):\n    if x:\n        return 1\n    return 0\n"
+        test = "import unittest\nclass T(unittest.TestCase):\n    def test_a(self):\n        f(0)\n"
+        self.assertEqual(run_coverage_analysis(kaynak, test)[0]['missed_lines'], [3])
+        self.assertEqual(run_coverage_analysis("\n\n" + kaynak, test)[0]['missed_lines'], [5])
+
+        with tempfile.TemporaryDirectory() as disk:
+            # Bellekte 2 kayıt, diskte yaklaşık 2 kayıtlık yer
+            cache = CoverageResultCache(max_entries=2, disk_dir=disk, disk_max_bytes=150)
+            for i in range(4):
+                cache.put(f"k{i}", {"coverage_percent": i, "missed_lines": [i]})
+
+            self.assertLessEqual(len(os.listdir(disk)), 3, "Disk katmanı boyut sınırı uygulanmadı.")
+            self.assertEqual(cache.get("k3")["coverage_percent"], 3)  # Bellek isabeti
+            self.assertIsNone(cache.get("k0"))                         # LRU + diskten silinmiş
+
+            # Bellekten düşen kayıt diskten okunabilmeli
+            cache._memory.clear()
+            self.assertEqual(cache.get("k3")["missed_lines"], [3])
+
+            istatistik = cache.stats()
+            self.assertEqual((istatistik["hits"], istatistik["misses"]), (2, 1))
+            self.assertEqual(istatistik["disk_hits"], 1)
+
+    # =========================================================================
+    # TEST CASE 8: Zaman Aşımı ve Ceza Mekanizması (Robustness Testing)
+    # Amaç: Sonsuz bekleyen bir testin süre dolunca kesildiğini, 'timeout'
+    # durumuyla raporlandığını ve ajan/GA tarafından cezalandırıldığını doğrulamak.
+    # =========================================================================
+    def test_timeout_is_reported_and_penalized(self):
+        print("[WhiteBox] Test 8: Zaman Aşımı Mekanizması Kontrol Ediliyor...")
+
+        kaynak = "def bekle():\n    return True\n"
+        test = (
+            "import unittest, time\n"
+            "class TestBekle(unittest.TestCase):\n"
+            "    def test_sonsuz(self):\n"
+            "        time.sleep(60)\n"
+        )
+        sonuc, hata = run_coverage_analysis(kaynak, test, timeout=1, use_cache=False)
+
+        self.assertEqual(sonuc['status'], "timeout")
+        self.assertFalse(sonuc['success'])
+        self.assertIn("Zaman Aşımı", hata)
+
+        # Ajan bu durumu ayrı bir durum olarak görmeli (sözdizimi hatası değil)
+        agent = AutoTestAgent(source_code=kaynak)
+        self.assertEqual(agent._determine_state(sonuc, hata, 0), "DURUM_ZAMAN_ASIMI")
+
+        # GA, zaman aşımını çalışmayan koddan da ağır cezalandırmalı
+        optimizer = GeneticOptimizer(source_code=kaynak, initial_test_code="")
+        with patch('modules.genetic_brain.run_coverage_analysis', return_value=(sonuc, hata)):
+            _, skor = optimizer.evaluate(test)
+        self.assertLess(skor, -100)
+
+    # =========================================================================
+    # TEST CASE 9: Yapılandırılmış Test Sonuçları (Integration Testing)
+    # Amaç: Coverage sonucunun her test için sonuç/hata bilgisini taşıdığını ve
+    # ajanın başarısız testleri bir sonraki prompt'a aktardığını doğrulamak.
+    # =========================================================================
+    def test_structured_test_results(self):
+        print("[WhiteBox] Test 9: Yapılandırılmış Test Sonuçları Kontrol Ediliyor...")
+
+        kaynak = "def topla(a, b):\n    return a + b\n"
+        test = (
+            "import unittest\n"
+            "class TestTopla(unittest.TestCase):\n"
+            "    def test_dogru(self):\n"
+            "        self.assertEqual(topla(1, 2), 3)\n"
+            "    def test_yanlis(self):\n"
+            "        self.assertEqual(topla(1, 2), 4)\n"
+            "    def test_hata(self):\n"
+            "        topla(1, None)\n"
+        )
+        sonuc, hata = run_coverage_analysis(kaynak, test, use_cache=False)
+
+        self.assertIsNone(hata)
+        self.assertEqual((sonuc['total_tests'], sonuc['failures'], sonuc['errors']), (3, 1, 1))
+        kayitlar = {t['id'].rsplit('.', 1)[-1]: t for t in sonuc['tests']}
+        self.assertEqual(kayitlar['test_dogru']['outcome'], "passed")
+        self.assertEqual(kayitlar['test_yanlis']['exception_type'], "AssertionError")
+        self.assertEqual(kayitlar['test_hata']['exception_type'], "TypeError")
+        self.assertGreaterEqual(kayitlar['test_hata']['duration'], 0)
+
+        # Ajan, başarısız testlerin özetini prompt'a eklemeli
+        agent = AutoTestAgent(source_code=kaynak)
+        ozet = agent._summarize_failures(sonuc)
+        self.assertIn("test_yanlis: AssertionError", ozet)
+        self.assertNotIn("test_dogru", ozet)
+        prompt = agent._get_prompt_by_action("STRATEJI_STANDART", failing_tests=ozet)
+        self.assertIn("test_hata: TypeError", prompt)
+
+        # Bir testin kendi MemoryError'ı veya mesajında "MemoryError" geçen başarısızlık
+        # tüm ölçümü bellek aşımı (oom) yapmaz; sadece o test hatalı sayılır
+        bellek_testi = (
+            "import unittest\n"
+            "class TestBellek(unittest.TestCase):\n"
+            "    def test_dogru(self):\n"
+            "        self.assertEqual(topla(1, 2), 3)\n"
+            "    def test_bellek(self):\n"
+            "        raise MemoryError('yapay')\n"
+            "    def test_mesaj(self):\n"
+            "        self.assertEqual('MemoryError', 'ok')\n"
+        )
+        sonuc, hata = run_coverage_analysis(kaynak, bellek_testi, use_cache=False)
+        self.assertIsNone(hata)
+        self.assertEqual(sonuc['status'], "ok")
+        self.assertEqual((sonuc['total_tests'], sonuc['failures'], sonuc['errors']), (3, 1, 1))
+        kayitlar = {t['id'].rsplit('.', 1)[-1]: t for t in sonuc['tests']}
+        self.assertEqual(kayitlar['test_bellek']['exception_type'], "MemoryError")
+        self.assertEqual(kayitlar['test_mesaj']['exception_type'], "AssertionError")
+        self.assertEqual(sonuc['coverage_percent'], 100.0)
+
+        # Test modülü yüklenirken MemoryError: Hiçbir test çalışmadığı için oom
+        sonuc, hata = run_coverage_analysis(kaynak, "raise MemoryError()\n", use_cache=False)
+        self.assertEqual(sonuc['status'], "oom")
+        self.assertIn("Bellek Aşımı", hata)
+
+    # =========================================================================
+    # TEST CASE 10: Test Bazlı Coverage Haritası (Coverage Context Testing)
+    # Amaç: Her test metodunun çalıştırdığı satırların ayrı ölçüldüğünü ve
+    # iki motorun (worker/cli) aynı haritayı ürettiğini doğrulamak.
+    # =========================================================================
+    def test_per_test_coverage_map(self):
+        print("[WhiteBox] Test 10: Test Bazlı Coverage Haritası Kontrol Ediliyor...")
+
+        kaynak = "def isaret(x):\n    if x > 0:\n        return 1\n    return -1\n"
+        test = (
+            "import unittest\n"
+            "class TestIsaret(unittest.TestCase):\n"
+            "    def test_pozitif(self):\n"
+            "        self.assertEqual(isaret(5), 1)\n"
+            "    def test_negatif(self):\n"
+            "        self.assertEqual(isaret(-5), -1)\n"
+        )
+        haritalar = []
+        for motor in ("worker", "cli"):
+            sonuc, hata = run_coverage_analysis(kaynak, test, engine=motor, use_cache=False, per_test=True)
+            self.assertIsNone(hata)
+            haritalar.append({k: bitset_to_lines(v) for k, v in sonuc['test_coverage_map'].items()})
+
+        harita = haritalar[0]
+        self.assertEqual(harita['test_app.TestIsaret.test_pozitif'], [2, 3])
+        self.assertEqual(harita['test_app.TestIsaret.test_negatif'], [2, 4])
+        self.assertEqual(harita['<import>'], [1])
+        self.assertEqual(haritalar[0], haritalar[1])
+        self.assertEqual(bitset_to_lines(sonuc['statements']), [1, 2, 3, 4])
+
+    # =========================================================================
+    # TEST CASE 11: Artımlı Coverage Değerlendirmesi (Regression Testing)
+    # Amaç: Sadece yeni/değişmiş test metotlarının çalıştırıldığını ve
+    # birleştirilmiş sonucun tüm paketi çalıştırmakla aynı olduğunu doğrulamak.
+    # =========================================================================
+    def test_incremental_coverage(self):
+        print("[WhiteBox] Test 11: Artımlı Coverage Değerlendirmesi Kontrol Ediliyor...")
+
+        kaynak = (
+            "def not_hesapla(puan):\n"
+            "    if puan >= 50:\n"
+            "        return 'Gecti'\n"
+            "    if puan < 0:\n"
+            "        raise ValueError('negatif')\n"
+            "    return 'Kaldi'\n"
+        )
+        ebeveyn = (
+            "import unittest\n"
+            "class TestNot(unittest.TestCase):\n"
+            "    def test_gecti(self):\n"
+            "        self.assertEqual(not_hesapla(70), 'Gecti')\n"
+            "    def test_kaldi(self):\n"
+            "        self.assertEqual(not_hesapla(10), 'Kaldi')\n"
+        )
+        # Çocuk: Ebeveynin metotları (yerleri değişmiş) + bir yeni metot
+        cocuk = (
+            "import unittest\n"
+            "class TestNot(unittest.TestCase):\n"
+            "    def test_negatif(self):\n"
+            "        with self.assertRaises(ValueError):\n"
+            "            not_hesapla(-1)\n"
+            "    def test_kaldi(self):\n"
+            "        self.assertEqual(not_hesapla(10), 'Kaldi')\n"
+            "\n"
+            "    def test_gecti(self):\n"
+            "        self.assertEqual(not_hesapla(70), 'Gecti')\n"
+        )
+        degerlendirici = IncrementalCoverageEvaluator()
+
+        sonuc, hata = degerlendirici.evaluate(kaynak, ebeveyn)
+        self.assertIsNone(hata)
+        self.assertEqual(sonuc['incremental'], {"executed": 2, "reused": 0})
+        self.assertEqual(sonuc['missed_lines'], [5])
+
+        sonuc, hata = degerlendirici.evaluate(kaynak, cocuk)
+        self.assertIsNone(hata)
+        self.assertEqual(sonuc['incremental'], {"executed": 1, "reused": 2})
+
+        # Birleştirilmiş sonuç, paketi baştan çalıştırmakla aynı olmalı
+        tam, _ = run_coverage_analysis(kaynak, cocuk, use_cache=False)
+        for anahtar in ('total_tests', 'failures', 'errors', 'coverage_percent', 'missed_lines', 'success'):
+            self.assertEqual(sonuc[anahtar], tam[anahtar], anahtar)
+
+        # Sınıf bağlamı (setUp) değişirse metotlar yeniden çalıştırılmalı
+        degisik = cocuk.replace("class TestNot(unittest.TestCase):\n",
+                                "class TestNot(unittest.TestCase):\n    def setUp(self):\n        self.x = 1\n")
+        sonuc, _ = degerlendirici.evaluate(kaynak, degisik)
+        self.assertEqual(sonuc['incremental'], {"executed": 3, "reused": 0})
+
+        # Baştaki boş satırlarla kaydırılmış kaynak: Eski bitset'ler birleştirilmemeli
+        sonuc, _ = degerlendirici.evaluate("\n\n" + kaynak, ebeveyn)
+        self.assertEqual(sonuc['incremental'], {"executed": 2, "reused": 0})
+        self.assertEqual(sonuc['missed_lines'], [7])
+
+        # Önbellekten gelecek metotlar ölçüm sürerken (başka bir thread'in LRU kırpmasıyla)
+        # silinse de adım 1'de alınan sonuçlar birleştirilmeli (KeyError olmamalı)
+        degerlendirici = IncrementalCoverageEvaluator()
+        degerlendirici.evaluate(kaynak, ebeveyn)
+
+        def silerek_olc(*args, **kwargs):
+            for kayit in degerlendirici._sources.values():
+                kayit["methods"].clear()
+            return run_coverage_analysis(*args, **kwargs)
+
+        with patch('modules.incremental_coverage.run_coverage_analysis', side_effect=silerek_olc):
+            sonuc, hata = degerlendirici.evaluate(kaynak, cocuk)
+        self.assertIsNone(hata)
+        self.assertEqual(sonuc['incremental'], {"executed": 1, "reused": 2})
+        self.assertEqual(sonuc['missed_lines'], tam['missed_lines'])
+
+    # =========================================================================
+    # TEST CASE 12: Dal (Branch) Coverage Modu (Branch Testing)
+    # Amaç: Satır coverage'ı %100 iken çalışmamış dalların raporlandığını ve
+    # ajan/GA'nın bu durumu "mükemmel" saymadığını doğrulamak.
+    # =========================================================================
+    def test_branch_coverage_mode(self):
+        print("[WhiteBox] Test 12: Dal (Branch) Coverage Modu Kontrol Ediliyor...")
+
+        kaynak = (
+            "def indirim(tutar, vip):\n"
+            "    oran = 0\n"
+            "    if vip:\n"
+            "        oran = 10\n"
+            "    return tutar - tutar * oran / 100\n"
+        )
+        test = (
+            "import unittest\n"
+            "class TestIndirim(unittest.TestCase):\n"
+            "    def test_vip(self):\n"
+            "        self.assertEqual(indirim(100, True), 90)\n"
+        )
+        for motor in ("worker", "cli"):
+            sonuc, hata = run_coverage_analysis(kaynak, test, engine=motor, use_cache=False, branch=True)
+            self.assertIsNone(hata)
+            self.assertEqual(sonuc['coverage_percent'], 100.0)
+            self.assertEqual(sonuc['branch_percent'], 50.0)
+            self.assertEqual(sonuc['missed_arcs'], [[3, 5]])
+
+        # Satırlar %100 olsa da dallar eksikse puan 100'ün altında kalmalı
+        self.assertEqual(coverage_score(sonuc, branch_weight=0.5), 75.0)
+        agent = AutoTestAgent(source_code=kaynak, branch=True)
+        self.assertEqual(agent._determine_state(sonuc, None, 0), "DURUM_COV_ORTA")
+
+        # Branch modu kapalıyken eski davranış (sadece satır) korunmalı
+        sonuc, _ = run_coverage_analysis(kaynak, test, use_cache=False)
+        self.assertNotIn('branch_percent', sonuc)
+        self.assertEqual(agent._determine_state(sonuc, None, 0), "DURUM_MUKEMMEL")
+
+    # =========================================================================
+    # TEST CASE 13: Toplu Değerlendirme (Batch Evaluation Testing)
+    # Amaç: evaluate_many'nin adayları paralel ölçtüğünü, sonuçları girdi
+    # sırasıyla döndürdüğünü ve her adayın durumunu ayrı raporladığını doğrulamak.
+    # =========================================================================
+    def test_evaluate_many(self):
+        print("[WhiteBox] Test 13: Toplu Değerlendirme Kontrol Ediliyor...")
+
+        kaynak = "def kare(x):\n    return x * x\n"
+        yavas = (
+            "import time, unittest\n"
+            "class TestKare(unittest.TestCase):\n"
+            "    def test_kare(self):\n"
+            "        time.sleep(0.5)\n"
+            "        self.assertEqual(kare({0}), {1})\n"
+        )
+        adaylar = [
+            yavas.format(2, 4),
+            yavas.format(3, 9),
+            "import unittest\nclass T(unittest.TestCase):\n    def test_sonsuz(self):\n        while True:\n            pass\n",
+            yavas.format(2, 4),  # Tekrarlanan aday (bir kez ölçülmeli)
+            yavas.format(2, 5),  # Başarısız aday
+        ]
+        havuz = CoverageWorkerPool(size=4)
+        self.addCleanup(havuz.close)
+        havuz.warm_up()
+
+        with patch('modules.coverage_tool.get_worker_pool', return_value=havuz):
+            baslangic = time.perf_counter()
+            sonuclar = evaluate_many(kaynak, adaylar, use_cache=False, timeout=1.5)
+            sure = time.perf_counter() - baslangic
+
+        self.assertEqual(len(sonuclar), len(adaylar))
+        self.assertEqual([s['status'] for s, _ in sonuclar], ["ok", "ok", "timeout", "ok", "ok"])
+        self.assertEqual([s['success'] for s, _ in sonuclar], [True, True, False, True, False])
+        self.assertIn("Zaman Aşımı", sonuclar[2][1])
+        self.assertIsNot(sonuclar[0][0], sonuclar[3][0], "Tekrarlanan adaylar aynı sözlüğü paylaşmamalı.")
+        # Sıralı çalışsaydı ~3.5 sn sürerdi; paralelde en yavaş aday (zaman aşımı) belirler
+        self.assertLess(sure, 3.0)
+
+    # =========================================================================
+    # TEST CASE 14: Veri Toplayıcı Tutarlılığı (Integration Testing)
+    # Amaç: sys.monitoring toplayıcısı (3.12+) ile coverage.py'nin aynı satır
+    # ve test bazlı sonuçları ürettiğini doğrulamak.
+    # =========================================================================
+    def test_collector_consistency(self):
+        print("[WhiteBox] Test 14: Veri Toplayıcı Tutarlılığı Kontrol Ediliyor...")
+
+        kaynak = (
+            "def topla(a,\n"
+            "          b):\n"
+            "    toplam = (a +\n"
+            "              b)\n"
+            "    if toplam > 100:  # pragma: no cover\n"
+            "        return 100\n"
+            "    for _ in range(3):\n"
+            "        toplam += 0\n"
+            "    return toplam\n"
+            "def kullanilmayan():\n"
+            "    return None\n"
+        )
+        test = (
+            "import unittest\n"
+            "class TestTopla(unittest.TestCase):\n"
+            "    def test_tablo(self):\n"
+            "        for a, b in [(1, 2), (3, 4), (0, 0)]:\n"
+            "            self.assertEqual(topla(a, b), a + b)\n"
+        )
+        varsayilan, hata = run_coverage_analysis(kaynak, test, use_cache=False, per_test=True)
+        self.assertIsNone(hata)
+        eski, _ = run_coverage_analysis(kaynak, test, use_cache=False, per_test=True, collector="coverage")
+
+        beklenen = "monitoring" if hasattr(sys, "monitoring") else "coverage"
+        self.assertEqual(varsayilan['collector'], beklenen)
+        self.assertEqual(eski['collector'], "coverage")
+        self.assertEqual(varsayilan['missed_lines'], [11])
+        for anahtar in ('coverage_percent', 'missed_lines', 'statements', 'test_coverage_map'):
+            self.assertEqual(varsayilan[anahtar], eski[anahtar], anahtar)
+
+    # =========================================================================
+    # TEST CASE 15: Ön Kontrol ile Hızlı Eleme (Static Analysis Testing)
+    # Amaç: Çalışamayacağı belli olan LLM çıktılarının coverage süreci
+    # başlatılmadan, sebebiyle birlikte reddedildiğini doğrulamak.
+    # =========================================================================
+    def test_preflight_rejection(self):
+        print("[WhiteBox] Test 15: Ön Kontrol (Preflight) Kontrol Ediliyor...")
+
+        kaynak = "class Hesap:\n    def bakiye(self):\n        return 0\n\ndef faiz(x):\n    return x * 2\n"
+        gecerli = (
+            "import unittest\n"
+            "class TestHesap(unittest.TestCase):\n"
+            "    def test_bakiye(self):\n"
+            "        self.assertEqual(Hesap().bakiye(), 0)\n"
+        )
+        self.assertEqual(preflight_check(kaynak, gecerli), (True, None))
+
+        bozuklar = {
+            "Hata: Tüm API anahtarlarının kotası dolu!": "hata mesajı",
+            "```python\n" + gecerli + "```": "markdown",
+            gecerli.replace("def test_bakiye(self):", "def test_bakiye(self)"): "Yazım Hatası",
+            "import unittest\nclass TestHesap(unittest.TestCase):\n    pass\n": "test metodu yok",
+            "class Hesap:\n    pass\n" + gecerli: "yeniden tanımlanmış",
+            "from app import Banka\n" + gecerli: "'Banka' kaynak kodda",
+            gecerli.replace("Hesap().bakiye()", "hesapla(1)"): "'hesapla' tanımlı değil",
+        }
+        for kod, beklenen in bozuklar.items():
+            gecti, sebep = preflight_check(kaynak, kod)
+            self.assertFalse(gecti, kod)
+            self.assertIn(beklenen, sebep)
+
+        # Reddedilen kod için süreç hiç başlatılmamalı; GA cezayı, ajan sebebi almalı
+        with patch('modules.coverage_tool._run_in_sandbox', side_effect=AssertionError("çalıştırılmamalıydı")):
+            sonuc, hata = run_coverage_analysis(kaynak, "Hata: kota", preflight=True)
+            self.assertEqual(sonuc['status'], "rejected")
+            self.assertIn("hata mesajı", sonuc['reason'])
+            self.assertIn("Ön Kontrol", hata)
+
+            optimizer = GeneticOptimizer(source_code=kaynak, initial_test_code="")
+            self.assertEqual(optimizer.evaluate("Hata: kota")[1], -100)
+            self.assertEqual(optimizer.preflight_rejections, 1)
+
+            agent = AutoTestAgent(source_code=kaynak, max_retries=1)
+            with patch('modules.agent.generate_test_code_from_gemini', return_value="from app import Banka\n" + gecerli), \
+                 patch.object(agent.brain, 'save_q_table'):  # Depodaki q_table.json değişmesin
+                son_adim, _ = agent.run()
+            self.assertEqual(son_adim['status'], "Hata")
+            self.assertIn("'Banka' kaynak kodda", son_adim['details'])
+
+        # String ve docstring içindeki ``` işaretleri markdown kalıntısı sayılmaz
+        ters_tirnakli = gecerli.replace(
+            "    def test_bakiye(self):\n",
+            "    def test_bakiye(self):\n"
+            "        \"\"\"Örnek:\n```python\nHesap().bakiye()\n```\n\"\"\"\n"
+            "        self.assertNotIn('```', 'kod')\n")
+        self.assertEqual(preflight_check(kaynak, ters_tirnakli), (True, None))
+        self.assertIn("markdown", preflight_check(kaynak, "Kod:\n  ```python\n" + gecerli + "  ```\n")[1])
+
+        # Geçerli testler reddedilmemeli: try/if bloklarındaki tanımlar ve yıldız importlar
+        def test_kodu(govde, importlar="from app import *\n"):
+            return (importlar + "import unittest\nclass T(unittest.TestCase):\n"
+                    "    def test_a(self):\n        " + govde + "\n")
+
+        blokta_tanim = "try:\n    def g():\n        return 1\nexcept ImportError:\n    pass\n"
+        yildizli_kaynak = "from math import *\ndef alan(r):\n    return pi * r * r\n"
+        gecerliler = [
+            (blokta_tanim, test_kodu("self.assertEqual(g(), 1)")),
+            (blokta_tanim, test_kodu("self.assertEqual(g(), 1)", "from app import g\n")),
+            (yildizli_kaynak, test_kodu("self.assertEqual(sqrt(4), 2)")),
+            (yildizli_kaynak, test_kodu("self.assertEqual(sqrt(4), 2)", "from app import sqrt\n")),
+            (kaynak, test_kodu("self.assertEqual(join('a', 'b'), 'a/b')", "from posixpath import *\n")),
+        ]
+        for kaynak_kodu, kod in gecerliler:
+            self.assertEqual(preflight_check(kaynak_kodu, kod), (True, None), kod)
+        sonuc, hata = run_coverage_analysis(blokta_tanim, gecerliler[0][1], preflight=True, use_cache=False)
+        self.assertIsNone(hata)
+        self.assertTrue(sonuc['success'])
+
+    # ---------------------------------------------------------
+    # TEST CASE 16: Asenkron LLM İstemcisi ve Anahtar Başına Hız Sınırı
+    # Amaç: generate_many'nin istekleri tüm anahtarlara dağıttığını, anahtar başına
+    # eş zamanlı istek sınırına uyduğunu, 429 alan isteği başka anahtarla tekrarladığını
+    # ve token kovasının dakikalık kotayı uyguladığını yerel bir sahte sunucuyla doğrulamak.
+    # ---------------------------------------------------------
+    def test_async_llm_client_rate_limit(self):
+        print("\n[WhiteBox] Test 16: Asenkron LLM istemcisi ve hız sınırı kontrol ediliyor...")
+
+        kilit = threading.Lock()
+        aktif, en_fazla, istek_sayisi = {}, {}, {}
+
+        class SahteGemini(BaseHTTPRequestHandler):
+            def do_POST(self):
+                anahtar = parse_qs(urlparse(self.path).query)["key"][0]
+                self.rfile.read(int(self.headers["Content-Length"]))
+                if anahtar == "dolu":
+                    self.send_response(429)
+                    self.send_header("Retry-After", "60")
+                    self.end_headers()
+                    self.wfile.write(b'{"error": {"status": "RESOURCE_EXHAUSTED"}}')
+                    return
+                with kilit:
+                    aktif[anahtar] = aktif.get(anahtar, 0) + 1
+                    en_fazla[anahtar] = max(en_fazla.get(anahtar, 0), aktif[anahtar])
+                    istek_sayisi[anahtar] = istek_sayisi.get(anahtar, 0) + 1
+                time.sleep(0.3)
+                with kilit:
+                    aktif[anahtar] -= 1
+                cevap = {"candidates": [{"content": {"parts": [{"text": f"```python\nimport unittest  # {anahtar}\n```"}]}}],
+                         "usageMetadata": {"totalTokenCount": 10}}
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(json.dumps(cevap).encode("utf-8"))
+
+            def log_message(self, *args):
+                pass
+
+        sunucu = ThreadingHTTPServer(("127.0.0.1", 0), SahteGemini)
+        threading.Thread(target=sunucu.serve_forever, daemon=True).start()
+        try:
+            anahtarlar = ["a1", "a2", "dolu"]
+            havuz = RateLimiterPool(anahtarlar, [KeyRateLimiter(rpm=0, tpm=0, max_inflight=1) for _ in anahtarlar])
+            istemci = AsyncLLMClient(anahtarlar, base_url=f"http://127.0.0.1:{sunucu.server_port}", pool=havuz)
+
+            baslangic = time.perf_counter()
+            sonuclar = generate_many([f"prompt {i}" for i in range(6)], client=istemci, use_cache=False, stream=False)
+            sure = time.perf_counter() - baslangic
+        finally:
+            sunucu.shutdown()
+            sunucu.server_close()
+
+        # Tüm yanıtlar temizlenmiş kod olarak, girdi sırasıyla döner
+        self.assertEqual(len(sonuclar), 6)
+        for kod in sonuclar:
+            self.assertTrue(kod.startswith("import unittest"), kod)
+        # İşler iki sağlam anahtara dağıtıldı; hiçbir anahtarda aynı anda 1'den fazla istek olmadı
+        self.assertEqual(sum(istek_sayisi.values()), 6)
+        self.assertEqual(set(istek_sayisi), {"a1", "a2"})
+        self.assertEqual(max(en_fazla.values()), 1)
+        # Sıralı çalışma 6 x 0.3 = 1.8 sn sürerdi; iki anahtarla yaklaşık yarısı
+        self.assertLess(sure, 1.5)
+
+        # Token kovası: Dakikada 2 istek; üçüncü istek 30 sn beklemeli, süre geçince açılmalı
+        saat = [0.0]
+        sinirlayici = KeyRateLimiter(rpm=2, tpm=0, max_inflight=10, clock=lambda: saat[0])
+        self.assertEqual(sinirlayici.try_acquire(100), 0.0)
+        self.assertEqual(sinirlayici.try_acquire(100), 0.0)
+        self.assertAlmostEqual(sinirlayici.try_acquire(100), 30.0)
+        saat[0] = 30.0
+        self.assertEqual(sinirlayici.try_acquire(100), 0.0)
+
+    # ---------------------------------------------------------
+    # TEST CASE 17: Anahtar Sağlığı ve Soğuma (Cooldown) Süreleri
+    # Amaç: Kotası dolan anahtarın soğumaya alındığını (retry-after önerisi veya katlanarak
+    # artan süre), bu sürede tekrar denenmediğini, her isteğin kendi anahtarıyla
+    # gönderildiğini ve anahtar istatistiklerinin tutulduğunu doğrulamak.
+    # ---------------------------------------------------------
+    def test_key_health_cooldown(self):
+        print("\n[WhiteBox] Test 17: Anahtar sağlığı ve soğuma süreleri kontrol ediliyor...")
+        gemini_arka_ucunu_sabitle(self)
+
+        # 1. Sınırlayıcı seviyesi: Sahte saat ile soğuma süreleri
+        saat = [0.0]
+        sinirlayicilar = [KeyRateLimiter(rpm=0, tpm=0, max_inflight=5, clock=lambda: saat[0]) for _ in range(2)]
+        havuz = RateLimiterPool(["k0", "k1"], sinirlayicilar)
+
+        self.assertEqual(havuz.try_acquire(10, start=0), (0, 0.0))
+        havuz.release(0, 10, outcome="quota")  # Önerilen süre yok: 5 sn
+        self.assertAlmostEqual(sinirlayicilar[0].cooldown_remaining(), 5.0)
+        # Soğumadaki anahtar 'start' onu gösterse bile seçilmez
+        self.assertEqual(havuz.try_acquire(10, start=0)[0], 1)
+        havuz.release(1, 10, outcome="ok")
+
+        saat[0] = 5.0
+        self.assertEqual(havuz.try_acquire(10, start=0)[0], 1)  # k0 hatalı geçmişi yüzünden sonra gelir
+        havuz.release(1, 10, outcome="ok")
+        sinirlayicilar[1].inflight = 5  # k1'in eş zamanlı istek sınırı dolu: k0 kullanılmalı
+        self.assertEqual(havuz.try_acquire(10)[0], 0)
+        havuz.release(0, 10, outcome="quota")  # Art arda 2. hata: 10 sn
+        self.assertAlmostEqual(sinirlayicilar[0].cooldown_remaining(), 10.0)
+        sinirlayicilar[0].consecutive_failures = 0
+        sinirlayicilar[0].cooldown_until = 0.0
+        self.assertEqual(havuz.try_acquire(10)[0], 0)
+        havuz.release(0, 10, outcome="quota", retry_after=30)  # Sunucu önerisi öncelikli
+        self.assertAlmostEqual(sinirlayicilar[0].cooldown_remaining(), 30.0)
+
+        # 2. generate_test_code_from_gemini: Ölü anahtar süreç genelinde hatırlanır
+        get_key_manager().reset()
+        denemeler = []
+
+        def uret(api_key, prompt, *args):
+            denemeler.append(api_key)
+            if api_key == "anahtar-olu1":
+                raise Exception("429 You exceeded your current quota. Please retry in 12.5s.")
+            return "```python\nimport unittest\n```", None, 50
+
+        try:
+            with patch('modules.llm_backends.gemini_rest_generate', side_effect=uret), \
+                 patch('modules.ai_generator.get_prompt_cache', return_value=None), \
+                 patch('modules.ai_generator.get_all_api_keys', return_value=["anahtar-olu1", "anahtar-cnl2"]):
+                kodlar = [generate_test_code_from_gemini("test yaz", stream=False) for _ in range(4)]
+
+            self.assertEqual(kodlar, ["import unittest"] * 4)
+            # Ölü anahtar sadece bir kez denendi; sonraki çağrılar onu atladı
+            self.assertEqual(denemeler.count("anahtar-olu1"), 1)
+            self.assertEqual(denemeler.count("anahtar-cnl2"), 4)
+
+            # İstatistikler maskelenmiş anahtarla tutulur; önerilen 12.5 sn soğuma uygulandı
+            istatistik = {s["key"]: s for s in get_key_stats()}
+            self.assertEqual(istatistik["...olu1"]["requests"], 1)
+            self.assertEqual(istatistik["...olu1"]["quota_errors"], 1)
+            self.assertGreater(istatistik["...olu1"]["cooldown_remaining"], 10)
+            self.assertEqual(istatistik["...cnl2"]["successes"], 4)
+        finally:
+            get_key_manager().reset()
+
+        # 3. Eş zamanlı senkron çağrılar: Her istek, anahtar yöneticisinin verdiği anahtarla gider
+        # (global SDK yapılandırması olsaydı bir thread diğerinin anahtarıyla istek gönderebilirdi)
+        kullanilan = []
+        kilit = threading.Lock()
+
+        def kaydet(api_key, prompt, *args):
+            time.sleep(0.01)
+            with kilit:
+                kullanilan.append((api_key, prompt))
+            return f"```python\n# {api_key}\n```", None, 10
+
+        try:
+            with patch('modules.llm_backends.gemini_rest_generate', side_effect=kaydet), \
+                 patch('modules.ai_generator.get_prompt_cache', return_value=None), \
+                 patch('modules.ai_generator.get_all_api_keys', return_value=["anahtar-aaa1", "anahtar-bbb2"]):
+                with ThreadPoolExecutor(max_workers=6) as havuz:
+                    kodlar = list(havuz.map(lambda i: generate_test_code_from_gemini(f"test {i}", stream=False),
+                                            range(12)))
+        finally:
+            get_key_manager().reset()
+        self.assertEqual(len(kullanilan), 12)
+        self.assertEqual({anahtar for anahtar, _ in kullanilan}, {"anahtar-aaa1", "anahtar-bbb2"})
+        # Yanıt, isteği gönderen anahtarın yanıtıdır
+        self.assertTrue(all(kod in ("# anahtar-aaa1", "# anahtar-bbb2") for kod in kodlar), kodlar)
+
+    # ---------------------------------------------------------
+    # TEST CASE 18: Kalıcı Prompt Önbelleği (SQLite, TTL, LRU)
+    # Amaç: Aynı girdilerle yapılan ikinci çağrının API'ye gitmeden önbellekten döndüğünü,
+    # use_cache=False ile önbelleğin atlandığını, yanıtların süreçler/örnekler arasında
+    # kalıcı olduğunu ve TTL ile LRU sınırlarının uygulandığını doğrulamak.
+    # ---------------------------------------------------------
+    def test_prompt_cache(self):
+        print("\n[WhiteBox] Test 18: Kalıcı prompt önbelleği kontrol ediliyor...")
+        gemini_arka_ucunu_sabitle(self)
+
+        with tempfile.TemporaryDirectory() as klasor:
+            yol = os.path.join(klasor, "llm.sqlite3")
+            saat = [1000.0]
+            onbellek = PromptCache(yol, ttl_seconds=60, max_entries=2, clock=lambda: saat[0])
+
+            try:
+                with patch('modules.llm_backends.gemini_rest_generate',
+                           return_value=("```python\nimport unittest\n```", None, 20)) as uretim, \
+                     patch('modules.ai_generator.get_prompt_cache', return_value=onbellek), \
+                     patch('modules.ai_generator.get_all_api_keys', return_value=["anahtar-0001"]):
+                    ilk = generate_test_code_from_gemini("Banka testi", mode="test_case", stream=False)
+                    ikinci = generate_test_code_from_gemini("Banka testi", mode="test_case", stream=False)
+                    self.assertEqual(ilk, ikinci)
+                    self.assertEqual(uretim.call_count, 1)  # İkincisi önbellekten
+
+                    # Mod farklıysa anahtar farklıdır; use_cache=False önbelleği atlar
+                    generate_test_code_from_gemini("Banka testi", mode="general", stream=False)
+                    generate_test_code_from_gemini("Banka testi", mode="test_case", use_cache=False, stream=False)
+                    self.assertEqual(uretim.call_count, 3)
+
+                    # Hata mesajları saklanmaz
+                    with patch('modules.ai_generator.get_all_api_keys', return_value=[]):
+                        self.assertTrue(generate_test_code_from_gemini("Anahtarsız", stream=False).startswith("Hata:"))
+                    self.assertEqual(onbellek.stats()["entries"], 2)
+            finally:
+                get_key_manager().reset()
+
+            # Kalıcılık: Aynı dosyayı açan yeni örnek yanıtı görür
+            saat[0] += 10
+            ikinci_ornek = PromptCache(yol, ttl_seconds=60, max_entries=2, clock=lambda: saat[0])
+            self.assertEqual(onbellek.stats()["hits"], 1)
+            self.assertEqual(ikinci_ornek.stats()["entries"], 2)
+
+            # LRU: 'a' kullanıldı, 'b' kullanılmadı; 'c' eklenince 'b' atılır
+            onbellek.clear()
+            onbellek.put("a", "A")
+            saat[0] += 1
+            onbellek.put("b", "B")
+            saat[0] += 1
+            self.assertEqual(onbellek.get("a"), "A")
+            saat[0] += 1
+            onbellek.put("c", "C")
+            self.assertIsNone(onbellek.get("b"))
+            self.assertEqual(onbellek.get("c"), "C")
+
+            # TTL: 60 sn'den eski yanıt kullanılmaz
+            saat[0] += 61
+            self.assertIsNone(onbellek.get("a"))
+            onbellek.close()
+            ikinci_ornek.close()
+
+    # ---------------------------------------------------------
+    # TEST CASE 19: Akış (Streaming) ile Erken Bitiş ve Erken İptal
+    # Amaç: Yanıt akış halinde okunurken kod bloğu kapanınca açıklama metninin
+    # beklenmediğini, tamamlanmış ifadelerde sözdizimi hatası görülünce akışın
+    # kesildiğini ve çok satırlı string'lerin yanlışlıkla hata sayılmadığını doğrulamak.
+    # ---------------------------------------------------------
+    def test_streaming_early_stop(self):
+        print("\n[WhiteBox] Test 19: Akış ile erken bitiş ve iptal kontrol ediliyor...")
+        gemini_arka_ucunu_sabitle(self)
+
+        kod = "import unittest\nfrom app import *\n\nclass T(unittest.TestCase):\n    def test_a(self):\n        pass\n"
+        senaryolar = {
+            "temiz": ["Tabii, kod:\n```python\n", kod, "```\n"] + ["Bu test sınıfı şunları yapar...\n"] * 8,
+            "bozuk": ["```python\nimport unittest\nx = = 1\n", "class A:\n    pass\n"] + ["y = 2\n"] * 8,
+        }
+
+        class SahteAkis(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                istek = urlparse(self.path)
+                self.server.yollar.append(istek.path)
+                try:
+                    for parca in senaryolar[self.server.senaryo]:
+                        olay = {"candidates": [{"content": {"parts": [{"text": parca}]}}]}
+                        self.wfile.write(f"data: {json.dumps(olay)}\r\n\r\n".encode("utf-8"))
+                        self.wfile.flush()
+                        time.sleep(0.25)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # İstemci akışı kesti
+
+            def log_message(self, *args):
+                pass
+
+        sunucu = ThreadingHTTPServer(("127.0.0.1", 0), SahteAkis)
+        sunucu.yollar = []
+        threading.Thread(target=sunucu.serve_forever, daemon=True).start()
+        try:
+            istemci = AsyncLLMClient(["a1"], base_url=f"http://127.0.0.1:{sunucu.server_port}",
+                                     pool=RateLimiterPool(["a1"], [KeyRateLimiter(rpm=0, tpm=0, max_inflight=2)]))
+            sonuclar = {}
+            for senaryo in ("temiz", "bozuk"):
+                sunucu.senaryo = senaryo
+                baslangic = time.perf_counter()
+                sonuclar[senaryo] = (generate_many(["test"], client=istemci, use_cache=False, stream=True)[0],
+                                     time.perf_counter() - baslangic)
+        finally:
+            sunucu.shutdown()
+            sunucu.server_close()
+
+        # SSE uç noktası kullanıldı; tam akış 11 x 0.25 sn sürerdi
+        self.assertTrue(all(yol.endswith(":streamGenerateContent") for yol in sunucu.yollar))
+        temiz_kod, temiz_sure = sonuclar["temiz"]
+        self.assertIn("class T(unittest.TestCase):", temiz_kod)
+        self.assertNotIn("Bu test sınıfı", temiz_kod)  # Kapanıştan sonraki açıklama beklenmedi
+        self.assertLess(temiz_sure, 1.5)
+        bozuk_kod, bozuk_sure = sonuclar["bozuk"]
+        self.assertTrue(bozuk_kod.startswith("Hata: Yanıt akışı erken kesildi"), bozuk_kod)
+        self.assertIn("Satır 2", bozuk_kod)
+        self.assertLess(bozuk_sure, 1.5)
+
+        # Senkron yol: Kapanış ``` satırından sonra parça okunmaz
+        okunan = []
+
+        def akis(api_key, prompt, *args):
+            for parca in senaryolar["temiz"]:
+                okunan.append(parca)
+                yield parca, None, 0
+
+        try:
+            with patch('modules.llm_backends.gemini_rest_stream', side_effect=akis), \
+                 patch('modules.ai_generator.get_prompt_cache', return_value=None), \
+                 patch('modules.ai_generator.get_all_api_keys', return_value=["anahtar-0001"]):
+                sonuc = generate_test_code_from_gemini("test yaz", stream=True)
+        finally:
+            get_key_manager().reset()
+        self.assertEqual(sonuc, "Tabii, kod:\n\n" + kod.strip())
+        self.assertEqual(len(okunan), 3)
+
+        # Sütun 0'da devam eden çok satırlı string ve dekoratörler hata sayılmaz
+        izleyici = CodeStreamMonitor()
+        metin = "```python\nimport unittest\nKAYNAK = \"\"\"\nclass Kopya:\n\"\"\"\n@staticmethod\ndef f():\n    pass\nx = 1\n```\n"
+        for i in range(0, len(metin), 4):
+            if not izleyici.feed(metin[i:i + 4]):
+                break
+        self.assertEqual(izleyici.status, "early_stop")
+
+    # ---------------------------------------------------------
+    # TEST CASE 20: Tek İstekte Çoklu Aday Üretimi
+    # Amaç: Toplu yanıttaki (JSON dizisi veya "# --- ADAY n ---" ayraçlı) adayların
+    # ayrıştırıldığını, eksik/bozuk adayların tekil isteklerle tamamlandığını doğrulamak.
+    # ---------------------------------------------------------
+    def test_batched_candidates(self):
+        print("\n[WhiteBox] Test 20: Tek istekte çoklu aday üretimi kontrol ediliyor...")
+
+        kod1 = "import unittest\nclass T(unittest.TestCase):\n    def test_a(self):\n        self.assertEqual([1], [1])\n"
+        kod2 = "import unittest\nclass T(unittest.TestCase):\n    def test_b(self):\n        pass\n"
+
+        # JSON dizisi (kod içindeki liste, aday listesi sanılmamalı) ve ayraçlı bloklar
+        self.assertEqual(parse_candidates("İşte:\n" + json.dumps([kod1, kod2]), 2), [kod1.strip(), kod2.strip()])
+        ayracli = f"# --- ADAY 2 ---\n```python\n{kod2}```\n# --- ADAY 1 ---\n{kod1}"
+        self.assertEqual(parse_candidates(ayracli, 2), [kod1.strip(), kod2.strip()])
+        # Eksik, sözdizimi hatalı ve hata mesajı olan yanıtlar
+        self.assertEqual(parse_candidates(json.dumps([kod1, "def (:"]), 3), [kod1.strip(), None, None])
+        self.assertEqual(parse_candidates("Hata: Kota doldu.", 2), [None, None])
+
+        # GA: 3 görev tek istekte istenir; ayrıştırılamayan 2. aday tekil istekle üretilir
+        cagrilar = []
+
+        def sahte_uretim(prompts, fix_for_streamlit=False, use_cache=True, stream=None):
+            cagrilar.append(list(prompts))
+            if len(cagrilar) == 1:
+                return [json.dumps([kod1, "def (:", kod2])]
+            return ["# tekil"] * len(prompts)
+
+        ga = GeneticOptimizer("def f():\n    return 1\n", kod1, batch_size=4)
+        gorevler = [("MUTATION", kod1, "LOGIC_FLIP"), ("CROSSOVER", kod1, kod2), ("MUTATION", kod2, "REMOVE_LINE")]
+        with patch('modules.genetic_brain.generate_many', side_effect=sahte_uretim):
+            cocuklar = ga.generate_children(gorevler)
+
+        self.assertEqual(cocuklar, [kod1.strip(), "# tekil", kod2.strip()])
+        self.assertEqual(len(cagrilar[0]), 1)
+        # Kaynak kod ve ebeveynler toplu prompt'ta yalnızca bir kez geçer
+        self.assertEqual(cagrilar[0][0].count(kod1), 1)
+        self.assertIn("ÇAPRAZLAMA (EBEVEYN 1 + EBEVEYN 2)", cagrilar[0][0])
+        self.assertEqual(len(cagrilar[1]), 1)
+        self.assertEqual(ga.batch_fallbacks, 1)
+
+    # ---------------------------------------------------------
+    # TEST CASE 21: Değiştirilebilir LLM Arka Uçları
+    # Amaç: Ağ kullanmayan sahte arka ucun deterministik ve çalıştırılabilir testler
+    # ürettiğini, OpenAI uyumlu uç noktanın (düz ve akış) kullanılabildiğini ve
+    # bilinmeyen arka uç adının hata mesajı olarak döndüğünü doğrulamak.
+    # ---------------------------------------------------------
+    def test_llm_backends(self):
+        print("\n[WhiteBox] Test 21: LLM arka uçları (sahte, OpenAI uyumlu) kontrol ediliyor...")
+
+        kaynak = "def kare(x):\n    if x < 0:\n        raise ValueError('negatif')\n    return x * x\n"
+        sahte = FakeBackend(latency=0)
+        try:
+            kod1 = generate_test_code_from_gemini(kaynak, fix_for_streamlit=True, use_cache=False, stream=True,
+                                                  backend=sahte)
+            kod2 = generate_many([kaynak], fix_for_streamlit=True, use_cache=False, stream=False, backend=sahte)[0]
+
+            # Sahte yanıtlar deterministiktir ve ön kontrolden geçip gerçek coverage üretir
+            self.assertEqual(kod1, kod2)
+            self.assertIn("self._call('kare', -1)", kod1)
+            self.assertEqual(preflight_check(kaynak, kod1), (True, None))
+            sonuc, hata = run_coverage_analysis(kaynak, kod1, use_cache=False)
+            self.assertIsNone(hata)
+            self.assertEqual(sonuc["coverage_percent"], 100)
+
+            # Hazır yanıtlar: Prompt'ta geçen ilk anahtar metnin yanıtı kullanılır
+            hazir = FakeBackend(responses={"ÖZEL": "```python\nimport unittest\n```"}, latency=0)
+            self.assertEqual(generate_test_code_from_gemini("ÖZEL senaryo", use_cache=False, backend=hazir),
+                             "import unittest")
+        finally:
+            get_key_manager().reset()
+
+        # OpenAI uyumlu uç nokta (ör. yerel model sunucusu)
+        istekler = []
+
+        class SahteOpenAI(BaseHTTPRequestHandler):
+            def do_POST(self):
+                govde = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                istekler.append((self.path, govde["model"], govde["stream"], self.headers.get("Authorization")))
+                metin = "```python\nimport unittest\n```\nAçıklama..."
+                self.send_response(200)
+                if govde["stream"]:
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.end_headers()
+                    for i in range(0, len(metin), 5):
+                        parca = {"choices": [{"delta": {"content": metin[i:i + 5]}}]}
+                        self.wfile.write(f"data: {json.dumps(parca)}\n\n".encode("utf-8"))
+                    self.wfile.write(b"data: [DONE]\n\n")
+                else:
+                    cevap = {"choices": [{"message": {"content": metin}}], "usage": {"total_tokens": 12}}
+                    self.send_header("Content-Type", "application/json")
+                    self.end_headers()
+                    self.wfile.write(json.dumps(cevap).encode("utf-8"))
+
+            def log_message(self, *args):
+                pass
+
+        sunucu = ThreadingHTTPServer(("127.0.0.1", 0), SahteOpenAI)
+        threading.Thread(target=sunucu.serve_forever, daemon=True).start()
+        yerel = OpenAICompatibleBackend(model="yerel-model", base_url=f"http://127.0.0.1:{sunucu.server_port}/v1")
+        try:
+            with patch.dict(os.environ, {"OPENAI_API_KEY": ""}):
+                duz = generate_test_code_from_gemini("test yaz", use_cache=False, stream=False, backend=yerel)
+                akis = generate_many(["test yaz"], use_cache=False, stream=True, backend=yerel)[0]
+        finally:
+            sunucu.shutdown()
+            sunucu.server_close()
+            get_key_manager().reset()
+
+        self.assertEqual(duz, "import unittest\n\nAçıklama...")
+        self.assertEqual(akis, "import unittest")  # Kapanış ``` satırında durulur
+        self.assertEqual(istekler, [("/v1/chat/completions", "yerel-model", False, None),
+                                    ("/v1/chat/completions", "yerel-model", True, None)])
+
+        # Bilinmeyen arka uç adı istisna değil, hata mesajı olarak döner
+        with patch('modules.llm_backends.LLM_BACKEND', "yok"):
+            self.assertTrue(generate_test_code_from_gemini("test yaz", use_cache=False).startswith("Hata:"))
+
+    # ---------------------------------------------------------
+    # TEST CASE 22: LLM Kayıt/Tekrar (Cassette) ve Tohumlama (Seed)
+    # Amaç: Bir GA oturumunun LLM yanıtlarının kaydedilip ağa gitmeden aynı sonuçla
+    # tekrar oynatıldığını, kayıtta olmayan prompt'un hata mesajı döndürdüğünü,
+    # kaydedilen gecikmelerin istenirse uygulandığını ve tohumun seçimleri sabitlediğini doğrulamak.
+    # ---------------------------------------------------------
+    def test_llm_cassette_replay(self):
+        print("\n[WhiteBox] Test 22: LLM kayıt/tekrar ve tohumlama kontrol ediliyor...")
+
+        kaynak = "def bolme(a, b):\n    if b == 0:\n        return None\n    return a / b\n"
+        baslangic = "import unittest\nfrom app import *\n\nclass T(unittest.TestCase):\n    def test_a(self):\n        pass\n"
+
+        with tempfile.TemporaryDirectory() as klasor:
+            yol = os.path.join(klasor, "oturum.jsonl.gz")
+            try:
+                with use_cassette(yol, mode="record", backend=FakeBackend(latency=0.05)) as kayit:
+                    sonuc1 = GeneticOptimizer(kaynak, baslangic, population_size=3, generations=2, seed=11).evolve()
+                    tekil1 = generate_test_code_from_gemini("tekil senaryo", stream=True)
+                self.assertGreater(kayit.cassette.stats()["recorded"], 0)
+
+                # Tekrar: Sarılan arka uç yok; tüm yanıtlar kayıttan gelir
+                with use_cassette(yol, mode="replay") as tekrar:
+                    sonuc2 = GeneticOptimizer(kaynak, baslangic, population_size=3, generations=2, seed=11).evolve()
+                    tekil2 = generate_test_code_from_gemini("tekil senaryo", stream=True)
+                    eksik = generate_test_code_from_gemini("kayıtta olmayan senaryo")
+                    self.assertEqual(llm_backends.get_backend(), tekrar)
+                self.assertNotEqual(llm_backends.get_backend(), tekrar)  # Blok bitince eski arka uca dönülür
+
+                # Kaydedilen gecikmeler istenirse uygulanır
+                with use_cassette(yol, mode="replay", latency_scale=1.0):
+                    basla = time.perf_counter()
+                    generate_test_code_from_gemini("tekil senaryo", stream=False)
+                    self.assertGreaterEqual(time.perf_counter() - basla, 0.05)
+            finally:
+                get_key_manager().reset()
+
+        # Nesil kayıtlarındaki süre ölçümleri (llm, eval_seconds) çalıştırmadan çalıştırmaya değişir
+        sureler = ("llm", "eval_seconds")
+        self.assertEqual(sonuc1[0], sonuc2[0])
+        self.assertEqual([{k: v for k, v in h.items() if k not in sureler} for h in sonuc1[1]],
+                         [{k: v for k, v in h.items() if k not in sureler} for h in sonuc2[1]])
+        self.assertEqual(tekil1, tekil2)
+        self.assertTrue(eksik.startswith("Beklenmeyen Hata:") and "Kayıtta" in eksik, eksik)
+        istatistik = tekrar.cassette.stats()
+        self.assertEqual(istatistik["served"], kayit.cassette.stats()["recorded"])
+        self.assertEqual(istatistik["misses"], 1)
+
+        # Tohum: Aynı tohumla eylem ve mutasyon seçimleri aynıdır
+        beyinler = [QLearningBrain(actions=["A", "B", "C"], e_greedy=0.5, seed=3) for _ in range(2)]
+        secimler = [[beyin.choose_action("DURUM_TEST") for _ in range(20)] for beyin in beyinler]
+        self.assertEqual(secimler[0], secimler[1])
+        ga = [GeneticOptimizer(kaynak, baslangic, seed=5) for _ in range(2)]
+        self.assertEqual([ga[0]._mutation_prompt("x") for _ in range(10)], [ga[1]._mutation_prompt("x") for _ in range(10)])
+
+    # ---------------------------------------------------------
+    # TEST CASE 23: AST ile Dilimlenmiş, Coverage Hedefli Prompt'lar
+    # Amaç: Token bütçesini aşan kaynak kodda sadece test edilmemiş satırları içeren
+    # fonksiyonların tamamının, bağımlılıklarının imzalarının gönderildiğini; eksik
+    # satırların fonksiyon ve dal koşuluyla açıklandığını ve küçük kodların değişmediğini doğrulamak.
+    # ---------------------------------------------------------
+    def test_sliced_prompts(self):
+        print("\n[WhiteBox] Test 23: AST ile dilimlenmiş prompt'lar kontrol ediliyor...")
+
+        kaynak = (
+            "import math\n\n\n"
+            "def yardimci(x):\n    \"\"\"İki katı.\"\"\"\n    return x * 2\n\n\n"
+            "class Hesap:\n    oran = 0.18\n\n"
+            "    def kdv(self, tutar):\n"
+            "        if tutar < 0:\n            raise ValueError('negatif')\n"
+            "        return yardimci(tutar) * self.oran\n\n\n"
+        ) + "".join(f"def dolgu_{i}(a, b=1):\n    x = a + b\n    y = x * {i}\n    return y - {i}\n\n\n"
+                    for i in range(80))
+        hedef_satir = kaynak.splitlines().index("            raise ValueError('negatif')") + 1
+
+        # Küçük kod (bütçeye sığan) aynen gönderilir
+        self.assertEqual(build_source_context("def f():\n    return 1\n", [2], token_budget=100),
+                         "def f():\n    return 1\n")
+
+        dilim = build_source_context(kaynak, [hedef_satir], token_budget=200)
+        self.assertIn("raise ValueError('negatif')", dilim)                  # Hedef fonksiyonun tamamı
+        self.assertIn('def yardimci(x):\n    """İki katı."""\n    ...', dilim)  # Bağımlılığın sadece imzası
+        self.assertNotIn("return x * 2", dilim)
+        self.assertIn("import math", dilim)
+        self.assertIn("token bütçesi nedeniyle çıkarıldı", dilim)
+        self.assertLessEqual(estimate_tokens(dilim), 200)
+        self.assertLess(estimate_tokens(dilim), estimate_tokens(kaynak) / 5)
+
+        aciklama = describe_missed_lines(kaynak, [hedef_satir])
+        self.assertIn("Hesap.kdv", aciklama)
+        self.assertIn("koşul: `tutar < 0` doğru olmalı", aciklama)
+
+        # İç sınıflar kendi parçalarıdır: Hedefse tamamı gönderilir, gönderilmezse çıkarılanlar notunda sayılır
+        ic_kaynak = (
+            "class Dis:\n    class Ic:\n        def f(self):\n            return 1\n\n"
+            "    def g(self):\n        return 2\n\n\n"
+        ) + "".join(f"def dolgu_{i}(a, b=1):\n    x = a + b\n    y = x * {i}\n    return y - {i}\n\n\n"
+                    for i in range(80))
+        dilim = build_source_context(ic_kaynak, [4], token_budget=200)
+        self.assertIn("class Dis:\n\n    # (satır 2-4)\n    class Ic:\n        def f(self):\n            return 1", dilim)
+        self.assertIn("Dis.Ic: satır 4", describe_missed_lines(ic_kaynak, [4]))
+        dilim = build_source_context(ic_kaynak, [7], token_budget=30)
+        self.assertIn("def g(self):", dilim)
+        self.assertNotIn("class Ic", dilim)
+        cikarilan = int(re.search(r"\((\d+) tanım token bütçesi", dilim).group(1))
+        eksik = [ad for ad in ["class Ic"] + [f"def dolgu_{i}(" for i in range(80)] if ad not in dilim]
+        self.assertEqual(cikarilan, len(eksik))
+
+        # Ajan (STRATEJI_GENISLET) ve GA prompt'ları dilimlenmiş kodu kullanır
+        ajan = AutoTestAgent(kaynak, prompt_token_budget=200)
+        prompt = ajan._get_prompt_by_action("STRATEJI_GENISLET", coverage_info=str([hedef_satir]),
+                                            missed_lines=[hedef_satir])
+        self.assertIn("raise ValueError('negatif')", prompt)
+        self.assertIn("`tutar < 0` doğru olmalı", prompt)
+        self.assertNotIn("dolgu_79", prompt)
+        ga = GeneticOptimizer(kaynak, "", prompt_token_budget=200)
+        self.assertLess(len(ga._mutation_prompt("x")), len(kaynak) / 3)
+        # Bütçe 0: Kaynak kodun tamamı
+        self.assertIn(kaynak, AutoTestAgent(kaynak, prompt_token_budget=0)._get_prompt_by_action("STRATEJI_STANDART"))
+
+    # ---------------------------------------------------------
+    # TEST CASE 24: LLM Çağrı Ölçümleri (Instrumentation)
+    # Amaç: Her çağrının bekleme, ilk parça ve toplam sürelerinin, token sayılarının,
+    # anahtar indeksinin, kota tekrarlarının ve sonucunun kaydedildiğini; kayıtların
+    # JSONL ve Prometheus hedeflerine yazıldığını ve ajan/GA geçmişinin adım başına özet taşıdığını doğrulamak.
+    # ---------------------------------------------------------
+    def test_llm_call_instrumentation(self):
+        print("\n[WhiteBox] Test 24: LLM çağrı ölçümleri kontrol ediliyor...")
+
+        class KotaliArkaUc(FakeBackend):
+            """İlk isteğe 429 döner, sonrakilere şablon yanıt verir."""
+            def __init__(self):
+                super().__init__(latency=0.02, chunk_size=8)
+                self.istek = 0
+                self.anahtarlar = []
+
+            def api_keys(self):
+                return ["kota-a", "kota-b"]
+
+            def complete(self, api_key, prompt, monitor=None):
+                self.istek += 1
+                self.anahtarlar.append(api_key)
+                if self.istek == 1:
+                    raise LLMHTTPError(429, "RESOURCE_EXHAUSTED", retry_after=0.01)
+                return super().complete(api_key, prompt, monitor)
+
+        kaynak = "def kare(x):\n    if x < 0:\n        return 0\n    return x * x\n"
+        metrikler = get_llm_metrics()
+        prometheus = metrikler.add_sink(PrometheusSink())
+        with tempfile.TemporaryDirectory() as klasor:
+            jsonl = metrikler.add_sink(JSONLSink(os.path.join(klasor, "llm.jsonl")))
+            onceki = llm_backends.set_backend_override(FakeBackend(latency=0.02, chunk_size=8))
+            sunucu = prometheus.serve(0, host="127.0.0.1")
+            try:
+                with patch('modules.ai_generator.get_prompt_cache', return_value=None):
+                    with capture_llm_calls() as cagrilar:
+                        generate_test_code_from_gemini(kaynak, use_cache=False, stream=True)
+                        kotali_arka_uc = KotaliArkaUc()
+                        generate_test_code_from_gemini(kaynak, use_cache=False, backend=kotali_arka_uc)
+                        generate_many([kaynak, kaynak + "\n"], use_cache=False, stream=False)
+
+                    ajan = AutoTestAgent(kaynak, max_retries=1, seed=1)
+                    with patch.object(ajan.brain, 'save_q_table'):  # Depodaki q_table.json değişmesin
+                        _, ajan_gecmisi = ajan.run()
+                    _, ga_gecmisi = GeneticOptimizer(kaynak, "", population_size=3, generations=2, batch_size=1,
+                                                     seed=2).evolve()
+                with urllib.request.urlopen(f"http://127.0.0.1:{sunucu.server_port}/metrics") as yanit:
+                    prometheus_metni = yanit.read().decode("utf-8")
+            finally:
+                llm_backends.set_backend_override(onceki)
+                sunucu.shutdown()
+                sunucu.server_close()
+                metrikler.remove_sink(jsonl)
+                metrikler.remove_sink(prometheus)
+                jsonl.close()
+                get_key_manager().reset()
+            with open(jsonl.path, encoding="utf-8") as f:
+                jsonl_kayitlari = [json.loads(satir) for satir in f]
+
+        # Akışlı çağrı: İlk parça toplam süreden önce gelir; anahtar ve tokenlar kaydedilir
+        akisli, kotali = cagrilar[0], cagrilar[1]
+        self.assertEqual(len(cagrilar), 4)
+        self.assertEqual((akisli["backend"], akisli["outcome"], akisli["key_index"], akisli["retries"]),
+                         ("fake", "ok", 0, 0))
+        self.assertGreaterEqual(akisli["latency"], 0.02)
+        self.assertLessEqual(akisli["ttfb"], akisli["latency"])
+        self.assertGreater(akisli["input_tokens"], 0)
+        self.assertGreater(akisli["output_tokens"], 0)
+        # Kota hatası: Diğer anahtarla tekrarlanır ve kayıtta tekrar olarak görünür
+        self.assertEqual((kotali["outcome"], kotali["attempts"], kotali["retries"]), ("ok", 2, 1))
+        self.assertNotEqual(kotali_arka_uc.anahtarlar[0], kotali_arka_uc.anahtarlar[1])
+        self.assertEqual(kotali["key_index"], kotali_arka_uc.api_keys().index(kotali_arka_uc.anahtarlar[1]))
+        self.assertGreaterEqual(kotali["llm_seconds"], kotali["latency"])
+        self.assertTrue(all(c["outcome"] == "ok" for c in cagrilar[2:]))
+
+        # Hedefler: JSONL dosyası ve Prometheus metinleri
+        self.assertGreaterEqual(len(jsonl_kayitlari), 4 + 1 + 2)  # + ajan + GA başlangıcı
+        self.assertEqual(jsonl_kayitlari[:4], cagrilar)
+        self.assertIn('llm_calls_total{backend="fake",outcome="ok"}', prometheus_metni)
+        self.assertIn('llm_retries_total{backend="fake"} 1', prometheus_metni)
+        self.assertIn('llm_latency_seconds_bucket{backend="fake",le="+Inf"}', prometheus_metni)
+        self.assertEqual(metrikler.recent(1)[0], jsonl_kayitlari[-1])
+
+        # Ajan adımları ve GA nesilleri LLM özeti ve değerlendirme süresi taşır
+        self.assertEqual(ajan_gecmisi[0]["llm"]["calls"], 1)
+        self.assertGreater(ajan_gecmisi[0]["llm"]["llm_seconds"], 0)
+        self.assertIn("eval_seconds", ajan_gecmisi[0])
+        self.assertEqual(ga_gecmisi[0]["llm"]["calls"], 2)  # Başlangıç popülasyonunun 2 mutantı
+        self.assertTrue(all("eval_seconds" in h and h["llm"]["failed"] == 0 for h in ga_gecmisi))
+
+    # ---------------------------------------------------------
+    # TEST CASE 25: Gecikmeli İçe Aktarma ve İçe Aktarma Süresi Bütçesi
+    # Amaç: Modüllerin ağır kütüphaneleri (Gemini SDK, networkx, matplotlib, pandas) ilk
+    # kullanıma kadar içe aktarmadığını, soğuk içe aktarma süresinin bütçe içinde kaldığını
+    # ve vekil modüllerin ilk erişimde gerçek modüle dönüştüğünü doğrulamak.
+    # ---------------------------------------------------------
+    def test_lazy_imports_and_import_budget(self):
+        print("\n[WhiteBox] Test 25: Gecikmeli içe aktarma ve süre bütçesi kontrol ediliyor...")
+
+        agir = ("google.generativeai", "networkx", "matplotlib", "pandas")
+        beklenen = {
+            "modules.ai_generator": agir,
+            "modules.coverage_tool": agir,
+            "modules.agent": agir,
+            "modules.genetic_brain": agir,
+            "modules.visualizer": agir,
+        }
+        for modul, yasakli in beklenen.items():
+            profil = import_profile(f"import {modul}")
+            self.assertIn(modul, profil)
+            for kutuphane in yasakli:
+                self.assertFalse(imports_package(profil, kutuphane), f"{modul} içe aktarılırken {kutuphane} yüklendi")
+            self.assertLess(profil[modul], IMPORT_TIME_BUDGET_MS,
+                            f"{modul} içe aktarma süresi {profil[modul]:.0f} ms (bütçe: {IMPORT_TIME_BUDGET_MS:.0f} ms)")
+
+        # Ağır kütüphane sadece onu kullanan fonksiyon çağrılınca yüklenir
+        profil = import_profile("import modules.visualizer as v\n"
+                                "v.create_call_graph('Senaryo', 'def test_a():\\n    f()\\n', [])")
+        self.assertTrue(imports_package(profil, "networkx"))
+
+        # Vekil: İlk erişimde içe aktarılır; zaten yüklü modüller aynen döner
+        vekil = lazy_module("json.tool")
+        self.assertEqual(lazy_module("json"), json)
+        if "json.tool" not in sys.modules:
+            self.assertFalse(is_loaded(vekil))
+        self.assertTrue(callable(vekil.main))
+        self.assertTrue(is_loaded(vekil))
+
+    # ---------------------------------------------------------
+    # TEST CASE 26: Arayüz Sonuç Önbelleği (Metrik, Coverage, Call Graph)
+    # Amaç: Aynı girdilerle tekrar istenen metrik ve coverage sonuçlarının yeniden
+    # hesaplanmadığını, tamamlanmamış (zaman aşımı) ölçümlerin saklanmadığını ve
+    # call graph'ın kapatılmış figürden üretilen PNG baytları olarak saklandığını doğrulamak.
+    # ---------------------------------------------------------
+    def test_ui_result_cache(self):
+        print("\n[WhiteBox] Test 26: Arayüz sonuç önbelleği kontrol ediliyor...")
+        from modules.ui_cache import cached_metrics, cached_coverage, cached_call_graph_png, clear_ui_caches
+        import matplotlib.pyplot as plt
+
+        clear_ui_caches()
+        try:
+            with patch('modules.metrics.calculate_metrics', return_value=(pd.DataFrame(), None)) as hesapla:
+                cached_metrics("x = 1\n")
+                cached_metrics("x = 1\n")
+                cached_metrics("x = 2\n")
+            self.assertEqual(hesapla.call_count, 2)
+
+            tamam = ({"status": "ok", "coverage_percent": 100.0}, None)
+            with patch('modules.coverage_tool.run_coverage_analysis', return_value=tamam) as olc:
+                self.assertEqual(cached_coverage("a = 1", "import unittest"), tamam)
+                self.assertEqual(cached_coverage("a = 1", "import unittest"), tamam)
+                cached_coverage("a = 1", "import unittest", branch=True)
+            self.assertEqual(olc.call_count, 2)  # branch farklı: ayrı kayıt
+
+            zaman_asimi = ({"status": "timeout"}, "⏱️ Zaman Aşımı")
+            with patch('modules.coverage_tool.run_coverage_analysis', return_value=zaman_asimi) as olc:
+                self.assertEqual(cached_coverage("b = 1", "import unittest"), zaman_asimi)
+                cached_coverage("b = 1", "import unittest")
+            self.assertEqual(olc.call_count, 2)  # Geçici sonuç saklanmaz
+
+            kod = "def test_a():\n    hesapla()\n"
+            basla = time.perf_counter()
+            png = cached_call_graph_png("Senaryo", kod, ("LOC: 2",))
+            ilk_sure = time.perf_counter() - basla
+            self.assertTrue(png.startswith(b"\x89PNG"))
+            self.assertEqual(plt.get_fignums(), [])  # Figür kapatıldı
+            basla = time.perf_counter()
+            self.assertEqual(cached_call_graph_png("Senaryo", kod, ("LOC: 2",)), png)
+            self.assertLess(time.perf_counter() - basla, ilk_sure)
+        finally:
+            clear_ui_caches()
+
+    # ---------------------------------------------------------
+    # TEST CASE 27: İlerleme Bildirimi, İptal ve Arka Planda Çalıştırma
+    # Amaç: Ajanın her adımda, GA'nın her nesilde ilerleme bildirdiğini; iptal isteğinde
+    # yeni adım/nesle geçmeden o ana kadarki sonucu döndürdüklerini ve arka plan işinin
+    # olayları, sonucu, hatayı ve iptali doğru aktardığını doğrulamak.
+    # ---------------------------------------------------------
+    def test_progress_cancel_and_background_run(self):
+        print("\n[WhiteBox] Test 27: İlerleme, iptal ve arka plan işi kontrol ediliyor...")
+
+        kaynak = "def isaret(x):\n    if x > 0:\n        return 1\n    return 0\n"
+        yarim_test = ("import unittest\nfrom app import *\nclass T(unittest.TestCase):\n"
+                      "    def test_pozitif(self):\n        self.assertEqual(isaret(5), 1)\n")
+
+        # Ajan: 2. adımdan sonra iptal -> 3. adıma geçilmez
+        ajan = AutoTestAgent(kaynak, max_retries=5, seed=1)
+        adimlar = []
+        iptal = threading.Event()
+
+        def adim_geldi(adim):
+            adimlar.append(adim)
+            if len(adimlar) == 2:
+                iptal.set()
+
+        with patch('modules.agent.generate_test_code_from_gemini', return_value=yarim_test), \
+                patch.object(ajan.brain, 'save_q_table'):
+            son_adim, gecmis = ajan.run(on_progress=adim_geldi, cancel_event=iptal)
+            self.assertTrue(ajan.cancelled)
+            self.assertEqual(len(gecmis), 2)
+            self.assertEqual(adimlar, gecmis)
+            self.assertIs(son_adim, gecmis[-1])
+
+            # Başlamadan iptal: Hiç adım yok
+            bos_ajan = AutoTestAgent(kaynak, max_retries=5, seed=1)
+            with patch.object(bos_ajan.brain, 'save_q_table'):
+                self.assertEqual(bos_ajan.run(cancel_event=iptal), (None, []))
+
+        # GA: 2. nesil bildiriminde iptal -> evrim orada durur
+        nesiller = []
+        iptal = threading.Event()
+
+        def nesil_geldi(nesil):
+            nesiller.append(nesil)
+            if len(nesiller) == 2:
+                iptal.set()
+
+        optimizer = GeneticOptimizer(kaynak, yarim_test, population_size=2, generations=5, batch_size=1, seed=2)
+        with patch('modules.genetic_brain.generate_many',
+                   side_effect=lambda prompts, **kwargs: [yarim_test] * len(prompts)):
+            (en_iyi_kod, en_iyi_skor), ga_gecmisi = optimizer.evolve(on_progress=nesil_geldi, cancel_event=iptal)
+        self.assertTrue(optimizer.cancelled)
+        self.assertEqual([h["generation"] for h in ga_gecmisi], [1, 2])
+        self.assertEqual(nesiller, ga_gecmisi)
+        self.assertEqual(en_iyi_skor, 75.0)
+
+        # Arka plan işi: Olaylar geldikçe okunur, iptal edilene kadar iş sürer
+        def uzun_is(on_progress, cancel_event):
+            on_progress("basladi")
+            cancel_event.wait(10)
+            on_progress("durdu")
+            return "bitti"
+
+        is_ = BackgroundRun(uzun_is).start()
+        self.assertEqual(is_.wait_for_events(0, timeout=5), ["basladi"])
+        self.assertTrue(is_.running)
+        self.assertEqual(is_.wait_for_events(1, timeout=0.05), [])  # Yeni olay yok
+        is_.cancel()
+        self.assertTrue(is_.join(timeout=5))
+        self.assertFalse(is_.running)
+        self.assertEqual((is_.events, is_.result, is_.error), (["basladi", "durdu"], "bitti", None))
+        self.assertLess(is_.elapsed, 10)
+
+        def hatali_is(on_progress, cancel_event):
+            raise ValueError("bozuk")
+
+        is_ = BackgroundRun(hatali_is).start()
+        self.assertTrue(is_.join(timeout=5))
+        self.assertEqual(is_.wait_for_events(0, timeout=5), [])  # İş bittiyse beklemez
+        self.assertEqual((is_.result, is_.error), (None, "Hata: bozuk"))
+
+    # ---------------------------------------------------------
+    # TEST CASE 28: Komut Satırından Toplu Test Üretimi (Batch Runner)
+    # Amaç: Dizindeki modüllerin bulunduğunu (testler ve gizli dizinler hariç), her modülün
+    # ayrı süreçte işlenip test dosyasının gerçek modül adıyla yazıldığını ve ozet.jsonl'e
+    # coverage, deneme, süre ve LLM çağrı özetinin kaydedildiğini doğrulamak.
+    # ---------------------------------------------------------
+    def test_batch_runner_cli(self):
+        print("\n[WhiteBox] Test 28: Toplu test üretimi (CLI) kontrol ediliyor...")
+
+        betik = os.path.join(os.path.dirname(os.path.abspath(__file__)), "batch_runner.py")
+        with tempfile.TemporaryDirectory() as klasor:
+            paket = os.path.join(klasor, "pkg")
+            os.makedirs(os.path.join(paket, "alt"))
+            os.makedirs(os.path.join(paket, ".gizli"))
+            dosyalar = {
+                "__init__.py": "",
+                "hesap.py": "def isaret(x):\n    if x > 0:\n        return 1\n    return 0\n",
+                os.path.join("alt", "kare.py"): "def kare(x):\n    return x * x\n",
+                "test_hesap.py": "def test_x():\n    pass\n",
+                os.path.join(".gizli", "gizli.py"): "def g():\n    pass\n",
+            }
+            for ad, icerik in dosyalar.items():
+                with open(os.path.join(paket, ad), "w", encoding="utf-8") as f:
+                    f.write(icerik)
+
+            self.assertEqual(modulleri_bul(paket), ["__init__.py", "hesap.py", os.path.join("alt", "kare.py")])
+            self.assertEqual(modul_adi(paket, os.path.join("alt", "kare.py")), "pkg.alt.kare")
+            self.assertEqual(importlari_duzelt("from app import *\nimport app\nimport app as m\nimport apps\n",
+                                               "pkg.hesap"),
+                             "from pkg.hesap import *\nimport pkg.hesap as app\nimport pkg.hesap as m\nimport apps\n")
+            # Kota süreçlere bölünür; 0 (sınırsız) sınırsız kalır
+            self.assertEqual([_paylastir(15, 4), _paylastir(3, 4), _paylastir(0, 4)], [3, 1, 0])
+
+            # Sahte LLM arka ucuyla iki işçi süreçte çalıştır (q_table.json geçici dizine yazılır)
+            ortam = {**os.environ, "LLM_BACKEND": "fake", "LLM_CACHE_PATH": "", "LLM_METRICS_PATH": ""}
+            cikti = subprocess.run([sys.executable, betik, paket, "--cikti", "sonuc", "--paralel", "2",
+                                    "--deneme", "2"], cwd=klasor, env=ortam, capture_output=True, text=True,
+                                   timeout=300)
+            self.assertEqual(cikti.returncode, 0, cikti.stdout + cikti.stderr)
+
+            with open(os.path.join(klasor, "sonuc", "ozet.jsonl"), encoding="utf-8") as f:
+                kayitlar = {k["module"]: k for k in map(json.loads, f)}
+            self.assertEqual(set(kayitlar), {"__init__.py", "hesap.py", "alt/kare.py"})
+            self.assertEqual(kayitlar["__init__.py"]["status"], "atlandi")
+            for modul, test_dosyasi, ad in (("hesap.py", "test_hesap.py", "pkg.hesap"),
+                                            ("alt/kare.py", "alt/test_kare.py", "pkg.alt.kare")):
+                kayit = kayitlar[modul]
+                self.assertEqual((kayit["status"], kayit["test_file"]), ("ok", test_dosyasi))
+                self.assertGreater(kayit["coverage"], 0)
+                self.assertGreaterEqual(kayit["attempts"], 1)
+                self.assertGreater(kayit["wall_seconds"], 0)
+                self.assertGreaterEqual(kayit["llm"]["calls"], 1)
+                with open(os.path.join(klasor, "sonuc", test_dosyasi), encoding="utf-8") as f:
+                    test_kodu = f.read()
+                self.assertIn(ad, test_kodu)
+                self.assertNotIn("from app import", test_kodu)
+
+            # Aynı süreçteki thread'ler (arka plan ajanları) Q-tablosunu aynı anda kaydedebilmeli
+            beyin = QLearningBrain(actions=["A", "B"])
+            beyin.q_table_file = os.path.join(klasor, "q_table.json")
+            beyin.q_table = {f"DURUM_{i}": {"A": i, "B": -i} for i in range(200)}
+            with ThreadPoolExecutor(max_workers=8) as havuz:
+                list(havuz.map(lambda _: beyin.save_q_table(), range(64)))  # Hata fırlatırsa burada görünür
+            self.assertEqual(beyin.load_q_table(), beyin.q_table)
+            self.assertEqual([ad for ad in os.listdir(klasor) if ad.endswith(".tmp")], [])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file